@@ -6,9 +6,10 @@ from django.utils import timezone
 from datetime import timedelta
 from .decorators import admin_required
 from users.models import CustomUser, ProfessionalProfile
-from requests.models import Request
+from requests.models import Request, RequestFile
+from requests.search import search_requests
 from transactions.models import Transaction, Dispute, WithdrawalRequest
-from analytics.models import Review, Notification
+from analytics.models import Review, Notification, FunnelMetric
 from messaging.models import Conversation, Message
 
 
@@ -109,6 +110,12 @@ def admin_dashboard(request):
         total_amount=Sum('amount')
     ).order_by('-count')
     
+    # Funnel & SLA metrics (precomputed by the compute_funnel_metrics command)
+    funnel_metrics = FunnelMetric.stages(scope=FunnelMetric.SCOPE_OVERALL)
+    specialization_funnel = FunnelMetric.objects.filter(
+        scope=FunnelMetric.SCOPE_SPECIALIZATION, stage='total'
+    ).select_related('specialization').order_by('-entered')[:10]
+    
     context = {
         'user': request.user,
         'display_name': request.user.get_full_name() or request.user.username,
@@ -152,6 +159,11 @@ def admin_dashboard(request):
         'recent_disputes': recent_disputes,
         'open_disputes_count': open_disputes_count,
         'pending_count': get_pending_withdrawals_count(),
+        
+        # Funnel Stats
+        'funnel_metrics': funnel_metrics,
+        'funnel_computed_at': funnel_metrics[0].computed_at if funnel_metrics else None,
+        'specialization_funnel': specialization_funnel,
     }
     
     return render(request, 'admin_dashboard/dashboard.html', context)
@@ -218,16 +230,14 @@ def admin_requests(request):
         requests = requests.filter(status=status_filter)
     
     if search_query:
-        requests = requests.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(client__icontains=search_query) |
-            Q(professional__icontains=search_query)
-        )
+        # Full-text search, best matches first
+        requests = search_requests(requests, search_query).order_by('-search_rank', '-id')
+    else:
+        requests = requests.order_by('-created_at')
     
     # Pagination
     from django.core.paginator import Paginator
-    paginator = Paginator(requests.order_by('-created_at'), 25)
+    paginator = Paginator(requests, 25)
     page_number = request.GET.get('page')
     requests_page = paginator.get_page(page_number)
     
@@ -324,9 +334,7 @@ def admin_dispute_detail(request, dispute_id):
             
             # Update request status
             request_obj = transaction.request
-            request_obj.status = 'completed'
-            if not request_obj.completed_at:
-                request_obj.completed_at = timezone.now()
+            request_obj.mark_completed()
             request_obj.save()
             
             # Notify both client and professional about resolution
@@ -383,40 +391,14 @@ def admin_dispute_detail(request, dispute_id):
             messages.success(request, f'Dispute resolved successfully. Status: {dispute.get_status_display()}. Both parties have been notified.')
             return redirect('admin_dashboard:disputes')
     
-    # Parse file attachments
-    import json
     request_obj = dispute.transaction.request
     
-    # Parse original request attachments
-    attached_files = []
-    if request_obj.attached_files:
-        try:
-            attached_files = json.loads(request_obj.attached_files)
-        except json.JSONDecodeError:
-            attached_files = []
-    
-    # Parse deliverable files (work submitted by professional)
-    deliverable_files = []
-    if hasattr(request_obj, 'deliverable_files') and request_obj.deliverable_files:
-        try:
-            deliverable_files = json.loads(request_obj.deliverable_files)
-        except json.JSONDecodeError:
-            deliverable_files = []
-    
-    # Parse dispute evidence files
-    client_evidence_files = []
-    if dispute.client_files:
-        try:
-            client_evidence_files = json.loads(dispute.client_files)
-        except json.JSONDecodeError:
-            client_evidence_files = []
-    
-    professional_evidence_files = []
-    if dispute.professional_files:
-        try:
-            professional_evidence_files = json.loads(dispute.professional_files)
-        except json.JSONDecodeError:
-            professional_evidence_files = []
+    # Request attachments, deliverables and dispute evidence in one query
+    files = list(request_obj.files.all())
+    attached_files = [file for file in files if file.kind == RequestFile.KIND_ATTACHMENT]
+    deliverable_files = [file for file in files if file.kind == RequestFile.KIND_DELIVERABLE]
+    client_evidence_files = [file for file in files if file.kind == RequestFile.KIND_CLIENT_EVIDENCE]
+    professional_evidence_files = [file for file in files if file.kind == RequestFile.KIND_PROFESSIONAL_EVIDENCE]
     
     context = {
         'dispute': dispute,
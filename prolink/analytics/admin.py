@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Review, ActivityLog, Notification
+from .models import Review, ActivityLog, Notification, FunnelMetric
 
 
 @admin.register(Review)
@@ -60,3 +60,18 @@ class NotificationAdmin(admin.ModelAdmin):
 
 # Transaction and Dispute admin moved to transactions app
 
+
+@admin.register(FunnelMetric)
+class FunnelMetricAdmin(admin.ModelAdmin):
+    list_display = ('scope', 'professional', 'specialization', 'stage', 'entered', 'converted',
+                    'conversion_rate', 'p50_display', 'p90_display', 'p99_display', 'computed_at')
+    list_filter = ('scope', 'stage')
+    search_fields = ('professional__email', 'specialization__name')
+    raw_id_fields = ('professional', 'specialization')
+    
+    # Rebuilt by the compute_funnel_metrics command
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
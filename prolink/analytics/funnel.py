@@ -0,0 +1,203 @@
+"""
+Marketplace funnel and SLA metrics
+
+Computed in batch from the request status history (RequestStatusEvent) and
+stored as FunnelMetric rows, so pages read a handful of precomputed numbers
+instead of aggregating over every request.
+
+The history of the requests created in the window is loaded once into a
+(requests x funnel statuses) matrix holding the first time each request
+reached each status. Every stage is then a pair of matrix columns:
+- entered: requests with a time in the start column
+- converted: entered requests with a time in the end column
+- durations: end - start, summarized as p50/p90/p99
+The same arrays are grouped platform-wide, per professional and per
+specialization (a request counts for each specialization of its
+professional) with bincount and one sort per stage, never per group.
+"""
+import numpy as np
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from requests.models import Request, RequestStatusEvent
+from users.models import CustomUser, ProfessionalProfile
+
+from .models import FunnelMetric
+
+
+# Funnel statuses, in lifecycle order (matrix columns)
+FUNNEL_STATUSES = ('pending', 'awaiting_payment', 'in_progress', 'under_review', 'completed')
+
+# FunnelMetric stage: (start status, end status)
+STAGES = {
+    'accept': ('pending', 'awaiting_payment'),
+    'pay': ('awaiting_payment', 'in_progress'),
+    'deliver': ('in_progress', 'under_review'),
+    'approve': ('under_review', 'completed'),
+    'total': ('pending', 'completed'),
+}
+
+PERCENTILES = np.array([0.50, 0.90, 0.99])
+
+DEFAULT_WINDOW_DAYS = 90
+
+
+def first_reached(window_start):
+    """
+    For requests created since window_start, returns (professional emails,
+    matrix) where matrix[i, j] is the epoch time request i first reached
+    FUNNEL_STATUSES[j], NaN if it never did.
+    """
+    rows = list(
+        Request.objects.filter(created_at__gte=window_start).order_by('id').values_list('id', 'professional')
+    )
+    request_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    emails = [row[1] for row in rows]
+
+    events = list(
+        RequestStatusEvent.objects.filter(
+            request__created_at__gte=window_start,
+            status__in=FUNNEL_STATUSES
+        ).values_list('request_id', 'status', 'at')
+    )
+    column = {status: index for index, status in enumerate(FUNNEL_STATUSES)}
+    event_requests = np.fromiter((event[0] for event in events), dtype=np.int64, count=len(events))
+    event_columns = np.fromiter((column[event[1]] for event in events), dtype=np.int64, count=len(events))
+    event_times = np.fromiter((event[2].timestamp() for event in events), dtype=np.float64, count=len(events))
+
+    matrix = np.full((len(rows), len(FUNNEL_STATUSES)), np.inf)
+    if len(events) and len(rows):
+        # request_ids is sorted, so each event's row is a binary search away;
+        # drop events of requests created after the id list was read
+        event_rows = np.searchsorted(request_ids, event_requests)
+        known = (event_rows < len(rows)) & (request_ids[np.minimum(event_rows, len(rows) - 1)] == event_requests)
+        np.minimum.at(matrix, (event_rows[known], event_columns[known]), event_times[known])
+    matrix[np.isinf(matrix)] = np.nan
+    return emails, matrix
+
+
+def grouped_percentiles(groups, values, group_count, quantiles=PERCENTILES):
+    """
+    Quantiles of `values` within each group, linearly interpolated like
+    numpy.percentile. Returns a (group_count x len(quantiles)) array with
+    NaN rows for groups without values.
+    """
+    result = np.full((group_count, len(quantiles)), np.nan)
+    if not len(values):
+        return result
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    present, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    positions = starts[:, None] + quantiles[None, :] * (counts[:, None] - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    result[present] = values[lower] + (values[upper] - values[lower]) * (positions - lower)
+    return result
+
+
+def stage_metrics(matrix, groups, group_count):
+    """
+    Entered/converted counts and duration percentiles of every stage per
+    group. `groups` holds the group of each matrix row.
+    Yields (stage, entered, converted, percentiles) with one entry per group.
+    """
+    for stage, (start, end) in STAGES.items():
+        started = matrix[:, FUNNEL_STATUSES.index(start)]
+        ended = matrix[:, FUNNEL_STATUSES.index(end)]
+        entered = ~np.isnan(started)
+        converted = entered & ~np.isnan(ended)
+
+        durations = ended[converted] - started[converted]
+        converted_groups = groups[converted]
+        # Out-of-order history (e.g. reconstructed by the backfill) has no duration
+        ordered = durations >= 0
+
+        yield (
+            stage,
+            np.bincount(groups[entered], minlength=group_count),
+            np.bincount(converted_groups, minlength=group_count),
+            grouped_percentiles(converted_groups[ordered], durations[ordered], group_count),
+        )
+
+
+def _metric_rows(matrix, groups, group_count, window_start, computed_at, **scope_for_group):
+    """Unsaved FunnelMetric rows; scope_for_group maps field -> per-group values"""
+    scope = scope_for_group.pop('scope')
+    metrics = []
+    for stage, entered, converted, percentiles in stage_metrics(matrix, groups, group_count):
+        for group in np.flatnonzero(entered):
+            p50, p90, p99 = (None if np.isnan(value) else float(value) for value in percentiles[group])
+            metrics.append(FunnelMetric(
+                scope=scope,
+                stage=stage,
+                entered=int(entered[group]),
+                converted=int(converted[group]),
+                p50_seconds=p50,
+                p90_seconds=p90,
+                p99_seconds=p99,
+                window_start=window_start,
+                computed_at=computed_at,
+                **{field: values[group] for field, values in scope_for_group.items()}
+            ))
+    return metrics
+
+
+def compute_funnel_metrics(window_days=DEFAULT_WINDOW_DAYS, now=None):
+    """
+    Funnel metrics over requests created in the last `window_days`, for the
+    platform, every professional and every specialization (unsaved rows)
+    """
+    computed_at = now or timezone.now()
+    window_start = computed_at - timedelta(days=window_days)
+    emails, matrix = first_reached(window_start)
+    request_count = len(emails)
+
+    # Platform-wide
+    metrics = _metric_rows(
+        matrix, np.zeros(request_count, dtype=np.int64), 1, window_start, computed_at,
+        scope=FunnelMetric.SCOPE_OVERALL
+    )
+
+    # Per professional (requests store professionals by email)
+    user_ids = dict(CustomUser.objects.filter(email__in=set(emails) - {''}).values_list('email', 'id'))
+    professional_of = np.fromiter((user_ids.get(email, -1) for email in emails), dtype=np.int64, count=request_count)
+    assigned = np.flatnonzero(professional_of >= 0)
+    professionals, professional_groups = np.unique(professional_of[assigned], return_inverse=True)
+    metrics += _metric_rows(
+        matrix[assigned], professional_groups, len(professionals), window_start, computed_at,
+        scope=FunnelMetric.SCOPE_PROFESSIONAL, professional_id=professionals.tolist()
+    )
+
+    # Per specialization: repeat each request once per specialization of
+    # its professional
+    pairs = np.array(
+        list(ProfessionalProfile.specializations.through.objects.filter(
+            professionalprofile__user_id__in=professionals.tolist()
+        ).values_list('professionalprofile__user_id', 'specialization_id')),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+    request_users = professional_of[assigned]
+    first_pair = np.searchsorted(pairs[:, 0], request_users, side='left')
+    pair_counts = np.searchsorted(pairs[:, 0], request_users, side='right') - first_pair
+    expanded = np.repeat(assigned, pair_counts)
+    pair_index = np.repeat(first_pair, pair_counts) + (
+        np.arange(pair_counts.sum()) - np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+    )
+    specializations, specialization_groups = np.unique(pairs[pair_index, 1], return_inverse=True)
+    metrics += _metric_rows(
+        matrix[expanded], specialization_groups, len(specializations), window_start, computed_at,
+        scope=FunnelMetric.SCOPE_SPECIALIZATION, specialization_id=specializations.tolist()
+    )
+    return metrics
+
+
+def refresh_funnel_metrics(window_days=DEFAULT_WINDOW_DAYS, now=None):
+    """Recompute and replace the stored funnel metrics. Returns the row count."""
+    metrics = compute_funnel_metrics(window_days=window_days, now=now)
+    with transaction.atomic():
+        FunnelMetric.objects.all().delete()
+        FunnelMetric.objects.bulk_create(metrics, batch_size=1000)
+    return len(metrics)
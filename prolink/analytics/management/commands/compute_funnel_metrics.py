@@ -0,0 +1,26 @@
+"""
+Management command to recompute the marketplace funnel and SLA metrics
+Usage: python manage.py compute_funnel_metrics [--days 90]
+
+Run it periodically (e.g. nightly from cron); the admin dashboard and
+professional profiles only read the stored FunnelMetric rows.
+"""
+from django.core.management.base import BaseCommand
+
+from analytics.funnel import DEFAULT_WINDOW_DAYS, refresh_funnel_metrics
+
+
+class Command(BaseCommand):
+    help = 'Recompute funnel conversion and stage duration metrics from the request status history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=DEFAULT_WINDOW_DAYS,
+            help=f'Only count requests created in the last N days (default: {DEFAULT_WINDOW_DAYS})',
+        )
+
+    def handle(self, *args, **options):
+        count = refresh_funnel_metrics(window_days=max(1, options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} funnel metrics'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_notification'),
+        ('requests', '0006_alter_request_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='collapse_key',
+            field=models.CharField(blank=True, max_length=150, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1, help_text='Number of events collapsed into this notification'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('collapse_key__isnull', False), ('is_read', False)), fields=('user', 'collapse_key'), name='unique_unread_notification_collapse_key'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_notification_collapse_key'),
+        ('users', '0008_migrate_experience_data'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FunnelMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('overall', 'Overall'), ('professional', 'Professional'), ('specialization', 'Specialization')], max_length=20)),
+                ('stage', models.CharField(choices=[('accept', 'Pending → Accepted'), ('pay', 'Accepted → Paid'), ('deliver', 'Paid → Submitted'), ('approve', 'Submitted → Completed'), ('total', 'Pending → Completed')], max_length=20)),
+                ('entered', models.PositiveIntegerField(help_text="Requests that reached the stage's start status")),
+                ('converted', models.PositiveIntegerField(help_text='Of those, requests that went on to reach its end status')),
+                ('p50_seconds', models.FloatField(blank=True, null=True)),
+                ('p90_seconds', models.FloatField(blank=True, null=True)),
+                ('p99_seconds', models.FloatField(blank=True, null=True)),
+                ('window_start', models.DateTimeField(help_text='Only requests created since then are counted')),
+                ('computed_at', models.DateTimeField()),
+                ('professional', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='funnel_metrics', to=settings.AUTH_USER_MODEL)),
+                ('specialization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='funnel_metrics', to='users.specialization')),
+            ],
+            options={
+                'verbose_name': 'Funnel Metric',
+                'verbose_name_plural': 'Funnel Metrics',
+                'indexes': [models.Index(fields=['scope', 'stage'], name='analytics_f_scope_dd62e6_idx'), models.Index(fields=['professional', 'stage'], name='analytics_f_profess_d566e1_idx'), models.Index(fields=['specialization', 'stage'], name='analytics_f_special_30ea12_idx')],
+            },
+        ),
+    ]
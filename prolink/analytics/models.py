@@ -1,6 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
-from users.models import CustomUser, ProfessionalProfile
+from users.models import CustomUser, ProfessionalProfile, Specialization
 from requests.models import Request
 
 
@@ -63,7 +63,9 @@ class Review(models.Model):
             self.update_professional_rating()
     
     def update_professional_rating(self):
-        """Update the professional's average rating and total reviews"""
+        """Update the professional's average rating, total reviews and ranking score"""
+        from users.ranking import update_ranking_score
+        
         professional = self.reviewee.professional_profile
         reviews = Review.objects.filter(
             reviewee=self.reviewee,
@@ -77,7 +79,8 @@ class Review(models.Model):
         else:
             professional.average_rating = 0.00
         
-        professional.save()
+        update_ranking_score(professional, save=False)
+        professional.save(update_fields=['total_reviews', 'average_rating', 'ranking_score'])
 
 
 class ActivityLog(models.Model):
@@ -191,6 +194,11 @@ class Notification(models.Model):
     # Optional link URL
     link_url = models.CharField(max_length=500, blank=True, null=True)
     
+    # Collapsing: unread notifications sharing a collapse key are updated in
+    # place instead of inserting a new row, e.g. one row per conversation
+    collapse_key = models.CharField(max_length=150, blank=True, null=True)
+    count = models.PositiveIntegerField(default=1, help_text="Number of events collapsed into this notification")
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Notification'
@@ -199,6 +207,15 @@ class Notification(models.Model):
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['user', 'is_read', '-created_at']),
         ]
+        constraints = [
+            # At most one unread notification per collapse key; also serves
+            # as the lookup index when collapsing
+            models.UniqueConstraint(
+                fields=['user', 'collapse_key'],
+                condition=models.Q(is_read=False, collapse_key__isnull=False),
+                name='unique_unread_notification_collapse_key',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.get_notification_type_display()} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -211,20 +228,158 @@ class Notification(models.Model):
             self.read_at = timezone.now()
             self.save(update_fields=['is_read', 'read_at'])
     
+    @staticmethod
+    def build_collapse_key(notification_type, scope, scope_id):
+        """
+        Build a collapse key such as 'message_received:conversation:12'
+        """
+        return f"{notification_type}:{scope}:{scope_id}"
+    
     @classmethod
-    def create_notification(cls, user, notification_type, title, message, request=None, related_user=None, link_url=None):
+    def create_notification(cls, user, notification_type, title, message, request=None, related_user=None, link_url=None, collapse_key=None):
         """
         Helper method to create notifications
+        
+        If collapse_key is given and the user already has an unread
+        notification with that key, it is updated in place (count bumped,
+        content and timestamp refreshed) instead of inserting a new row.
         """
-        return cls.objects.create(
-            user=user,
-            notification_type=notification_type,
-            title=title,
-            message=message,
-            request=request,
-            related_user=related_user,
-            link_url=link_url
-        )
+        from django.db import IntegrityError, transaction
+        from django.utils import timezone
+        
+        fields = {
+            'notification_type': notification_type,
+            'title': title,
+            'message': message,
+            'request': request,
+            'related_user': related_user,
+            'link_url': link_url,
+        }
+        
+        if not collapse_key:
+            return cls.objects.create(user=user, **fields)
+        
+        # Two attempts: if a concurrent insert wins the unique constraint,
+        # the second pass finds its row and collapses into it
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    existing = cls.objects.select_for_update().filter(
+                        user=user,
+                        collapse_key=collapse_key,
+                        is_read=False
+                    ).first()
+                    
+                    if existing is None:
+                        return cls.objects.create(user=user, collapse_key=collapse_key, **fields)
+                    
+                    for field, value in fields.items():
+                        setattr(existing, field, value)
+                    existing.count += 1
+                    # Bump the timestamp so the collapsed row sorts as the newest
+                    existing.created_at = timezone.now()
+                    existing.save(update_fields=list(fields) + ['count', 'created_at'])
+                    return existing
+            except IntegrityError:
+                if attempt:
+                    raise
+
 
 
+def format_duration(seconds):
+    """Compact duration for dashboards: '45m', '5h 20m', '3d 4h'"""
+    if seconds is None:
+        return '—'
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{max(minutes, 1)}m" if seconds >= 30 else '<1m'
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m" if minutes else f"{hours}h"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h" if hours else f"{days}d"
+
+
+class FunnelMetric(models.Model):
+    """
+    Precomputed funnel and SLA numbers for one stage of the request
+    lifecycle, platform-wide or for one professional or specialization.
+    Rebuilt in batch from the request status history by
+    `python manage.py compute_funnel_metrics` (see analytics/funnel.py).
+    """
+    SCOPE_OVERALL = 'overall'
+    SCOPE_PROFESSIONAL = 'professional'
+    SCOPE_SPECIALIZATION = 'specialization'
+    SCOPE_CHOICES = (
+        (SCOPE_OVERALL, 'Overall'),
+        (SCOPE_PROFESSIONAL, 'Professional'),
+        (SCOPE_SPECIALIZATION, 'Specialization'),
+    )
+    
+    # In lifecycle order
+    STAGE_CHOICES = (
+        ('accept', 'Pending → Accepted'),
+        ('pay', 'Accepted → Paid'),
+        ('deliver', 'Paid → Submitted'),
+        ('approve', 'Submitted → Completed'),
+        ('total', 'Pending → Completed'),
+    )
+    
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    professional = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True,
+                                     related_name='funnel_metrics')
+    specialization = models.ForeignKey(Specialization, on_delete=models.CASCADE, null=True, blank=True,
+                                       related_name='funnel_metrics')
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    
+    entered = models.PositiveIntegerField(help_text="Requests that reached the stage's start status")
+    converted = models.PositiveIntegerField(help_text="Of those, requests that went on to reach its end status")
+    p50_seconds = models.FloatField(null=True, blank=True)
+    p90_seconds = models.FloatField(null=True, blank=True)
+    p99_seconds = models.FloatField(null=True, blank=True)
+    
+    window_start = models.DateTimeField(help_text="Only requests created since then are counted")
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Funnel Metric'
+        verbose_name_plural = 'Funnel Metrics'
+        indexes = [
+            models.Index(fields=['scope', 'stage']),
+            models.Index(fields=['professional', 'stage']),
+            models.Index(fields=['specialization', 'stage']),
+        ]
+    
+    def __str__(self):
+        subject = self.professional or self.specialization or 'All'
+        return f"{subject} - {self.get_stage_display()}: {self.converted}/{self.entered}"
+    
+    @classmethod
+    def stages(cls, **scope):
+        """
+        A scope's metrics in lifecycle order, e.g.
+        FunnelMetric.stages(scope='overall') or FunnelMetric.stages(professional=user)
+        """
+        order = [stage for stage, _ in cls.STAGE_CHOICES]
+        return sorted(cls.objects.filter(**scope), key=lambda metric: order.index(metric.stage))
+    
+    @property
+    def conversion_rate(self):
+        """Percentage of entered requests that converted, or None if none entered"""
+        if not self.entered:
+            return None
+        return round(self.converted * 100 / self.entered, 1)
+    
+    @property
+    def p50_display(self):
+        return format_duration(self.p50_seconds)
+    
+    @property
+    def p90_display(self):
+        return format_duration(self.p90_seconds)
+    
+    @property
+    def p99_display(self):
+        return format_duration(self.p99_seconds)
+
 # Transaction and Dispute models have been moved to the transactions app
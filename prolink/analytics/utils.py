@@ -143,11 +143,11 @@ def get_recommended_professionals(user, limit=3):
         is_available=True
     ).select_related('user').prefetch_related('specializations')
     
-    # Filter by minimum rating and sort by rating and reviews
+    # Filter by minimum rating and sort by ranking score
     professionals = professionals.filter(
         average_rating__gte=4.0,
         total_reviews__gte=1
-    ).order_by('-average_rating', '-total_reviews')[:limit * 2]
+    ).order_by('-ranking_score')[:limit * 2]
     
     # If user has request history, prioritize related specializations
     # For now, just return top-rated professionals
@@ -3,7 +3,8 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_http_methods
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Q, Count, Max
+import hashlib
 from .models import Notification
 
 
@@ -82,6 +83,7 @@ def get_notifications(request):
             'time_ago': time_ago,
             'icon': icon,
             'link_url': notif.link_url,
+            'count': notif.count,
             'created_at': notif.created_at.isoformat(),
             'from_user': from_user,
             'request_title': request_title,
@@ -111,3 +113,54 @@ def mark_all_notifications_read(request):
         read_at=timezone.now()
     )
     return JsonResponse({'success': True, 'updated_count': updated})
+
+
+@login_required
+def poll_state(request):
+    """
+    Combined navbar/dashboard poll endpoint.
+    Returns unread messages, unread notifications and (for admins) pending
+    moderation counts in one response, plus a version token the client can
+    send back as ``?version=`` to skip re-rendering when nothing changed.
+    """
+    from messaging.models import Conversation, Message
+
+    user = request.user
+
+    # One aggregate per table: the count plus the newest id so that a new
+    # event changes the version even if another one was read in between
+    message_stats = Message.objects.filter(
+        conversation__in=Conversation.objects.filter(
+            Q(client=user) | Q(professional=user),
+            is_active=True
+        ).values('id'),
+        is_read=False
+    ).exclude(sender=user).aggregate(count=Count('id'), latest=Max('id'))
+
+    notification_stats = Notification.objects.filter(
+        user=user,
+        is_read=False
+    ).aggregate(count=Count('id'), latest=Max('id'))
+
+    data = {
+        'unread_messages': message_stats['count'] or 0,
+        'unread_notifications': notification_stats['count'] or 0,
+    }
+    version_parts = [
+        data['unread_messages'], message_stats['latest'] or 0,
+        data['unread_notifications'], notification_stats['latest'] or 0,
+    ]
+
+    if user.user_role == 'admin':
+        from transactions.models import Dispute, WithdrawalRequest
+        data['admin'] = {
+            'open_disputes': Dispute.objects.filter(status__in=['open', 'under_review']).count(),
+            'pending_withdrawals': WithdrawalRequest.objects.filter(status='pending').count(),
+        }
+        version_parts += [data['admin']['open_disputes'], data['admin']['pending_withdrawals']]
+
+    version = hashlib.md5(':'.join(str(part) for part in version_parts).encode()).hexdigest()[:16]
+    data['version'] = version
+    data['changed'] = request.GET.get('version') != version
+
+    return JsonResponse(data)
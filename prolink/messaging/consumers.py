@@ -0,0 +1,174 @@
+"""
+WebSocket transport for conversations
+
+Served directly from prolink/asgi.py at /ws/messages/<conversation_id>/.
+One connection per open conversation carries:
+- client -> server: {"type": "send", "content": "..."}
+                    {"type": "read", "last_message_id": 123}
+- server -> client: {"type": "message", "message": {...}}
+                    {"type": "read", "reader_id": 1, "last_read_id": 123}
+                    {"type": "error", "error": "..."}
+Access checks are the same as the HTTP views (Conversation.has_participant).
+"""
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import realtime
+
+CONVERSATION_PATH = re.compile(r'^/ws/messages/(?P<conversation_id>\d+)/$')
+
+# Application-defined close codes (4000-4999)
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+class _SessionRequest:
+    """Minimal request object for django.contrib.auth.get_user"""
+
+    def __init__(self, session):
+        self.session = session
+
+
+def _get_header(scope, name):
+    for key, value in scope.get('headers', []):
+        if key.decode('latin1').lower() == name:
+            return value.decode('latin1')
+    return None
+
+
+def _origin_allowed(scope):
+    """Reject cross-site WebSocket handshakes (browsers always send Origin)"""
+    origin = _get_header(scope, 'origin')
+    if origin is None:
+        return True
+    return urlparse(origin).netloc == _get_header(scope, 'host')
+
+
+def _authenticate(scope):
+    """Load the Django user from the session cookie"""
+    from django.contrib.auth import get_user
+
+    cookie = SimpleCookie()
+    cookie.load(_get_header(scope, 'cookie') or '')
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(morsel.value if morsel else None)
+    return get_user(_SessionRequest(session))
+
+
+def _load_conversation(conversation_id, user):
+    """Return the conversation if the user may access it, else None"""
+    from .models import Conversation
+
+    if not user.is_authenticated:
+        return None
+    try:
+        conversation = Conversation.objects.select_related('client', 'professional', 'request').get(
+            id=conversation_id,
+            is_active=True
+        )
+    except Conversation.DoesNotExist:
+        return None
+    return conversation if conversation.has_participant(user) else None
+
+
+def _handle_send(conversation, user, content):
+    from .views import deliver_message, validate_message_content
+
+    content = (content or '').strip()
+    error = validate_message_content(content)
+    if error:
+        return error
+    deliver_message(conversation, user, content)
+    return None
+
+
+def _handle_read(conversation, user, last_message_id):
+    from .views import mark_conversation_read
+
+    mark_conversation_read(conversation, user, up_to_id=last_message_id)
+
+
+async def _send_json(send, data):
+    await send({'type': 'websocket.send', 'text': json.dumps(data)})
+
+
+async def _forward_events(queue, send):
+    """Relay channel layer events for the conversation to this socket"""
+    while True:
+        event = await queue.get()
+        await _send_json(send, event)
+
+
+async def conversation_socket(scope, receive, send, conversation_id):
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    if not _origin_allowed(scope):
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+
+    user = await sync_to_async(_authenticate)(scope)
+    conversation = await sync_to_async(_load_conversation)(conversation_id, user)
+    if conversation is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+
+    layer = realtime.get_channel_layer()
+    group = realtime.conversation_group(conversation.id)
+    queue = layer.new_queue()
+    await layer.group_add(group, queue)
+    await send({'type': 'websocket.accept'})
+
+    forwarder = asyncio.create_task(_forward_events(queue, send))
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            if event['type'] != 'websocket.receive':
+                continue
+
+            try:
+                data = json.loads(event.get('text') or '')
+            except ValueError:
+                await _send_json(send, {'type': 'error', 'error': 'Invalid JSON'})
+                continue
+            if not isinstance(data, dict):
+                await _send_json(send, {'type': 'error', 'error': 'Invalid payload'})
+                continue
+
+            if data.get('type') == 'send':
+                error = await sync_to_async(_handle_send)(conversation, user, data.get('content'))
+                if error:
+                    await _send_json(send, {'type': 'error', 'error': error})
+            elif data.get('type') == 'read':
+                try:
+                    last_message_id = int(data.get('last_message_id'))
+                except (TypeError, ValueError):
+                    last_message_id = None
+                await sync_to_async(_handle_read)(conversation, user, last_message_id)
+            else:
+                await _send_json(send, {'type': 'error', 'error': 'Unknown event type'})
+    finally:
+        forwarder.cancel()
+        await layer.group_discard(group, queue)
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI entry point for all WebSocket connections"""
+    match = CONVERSATION_PATH.match(scope.get('path', ''))
+    if match is None:
+        # Must consume the connect event before closing
+        await receive()
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    await conversation_socket(scope, receive, send, int(match.group('conversation_id')))
@@ -0,0 +1,90 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messaging_message_fts USING fts5(
+        content,
+        content='messaging_message',
+        content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messaging_message_fts_insert
+    AFTER INSERT ON messaging_message BEGIN
+        INSERT INTO messaging_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messaging_message_fts_delete
+    AFTER DELETE ON messaging_message BEGIN
+        INSERT INTO messaging_message_fts(messaging_message_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messaging_message_fts_update
+    AFTER UPDATE OF content ON messaging_message BEGIN
+        INSERT INTO messaging_message_fts(messaging_message_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO messaging_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    # Index messages that existed before the table was created
+    "INSERT INTO messaging_message_fts(messaging_message_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS messaging_message_fts_update',
+    'DROP TRIGGER IF EXISTS messaging_message_fts_delete',
+    'DROP TRIGGER IF EXISTS messaging_message_fts_insert',
+    'DROP TABLE IF EXISTS messaging_message_fts',
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE INDEX IF NOT EXISTS messaging_message_content_fts
+    ON messaging_message USING GIN (to_tsvector('simple', content))
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    'DROP INDEX IF EXISTS messaging_message_content_fts',
+]
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the full-text index for message search.
+    PostgreSQL maintains the expression index itself; on SQLite the FTS5
+    table is kept current by triggers on messaging_message.
+    """
+    statements = {
+        'postgresql': POSTGRESQL_FORWARD,
+        'sqlite': SQLITE_FORWARD,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    """
+    Reverse migration: drop the full-text index
+    """
+    statements = {
+        'postgresql': POSTGRESQL_REVERSE,
+        'sqlite': SQLITE_REVERSE,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_message_messaging_m_convers_c07ce8_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -25,6 +25,10 @@ class Conversation(models.Model):
     def __str__(self):
         return f"Conversation: {self.client.email} & {self.professional.email} - {self.request.title}"
     
+    def has_participant(self, user):
+        """Check whether the user is the client or professional of this conversation"""
+        return user.id in (self.client_id, self.professional_id)
+    
     def get_unread_count(self, user):
         """Get unread message count for a specific user"""
         return self.messages.filter(is_read=False).exclude(sender=user).count()
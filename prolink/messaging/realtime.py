@@ -0,0 +1,97 @@
+"""
+Realtime delivery for conversation events (new messages, read receipts)
+
+Events are fanned out through a channel layer selected by the
+MESSAGING_CHANNEL_LAYER setting (dotted path to a class). The default
+InMemoryChannelLayer only reaches WebSocket clients connected to the same
+process; multi-node deployments should point the setting at a backend built
+on a shared broker that implements the same three coroutines.
+"""
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL_LAYER = 'messaging.realtime.InMemoryChannelLayer'
+
+_channel_layer = None
+
+
+def conversation_group(conversation_id):
+    """Group name for all sockets attached to a conversation"""
+    return f'conversation.{conversation_id}'
+
+
+class BaseChannelLayer:
+    """
+    Interface for channel layer backends.
+    A subscriber is an asyncio.Queue owned by one WebSocket connection;
+    group_send must deliver the event to every subscriber of the group,
+    on every node.
+    """
+
+    # Slow consumers drop events instead of growing memory without bound
+    QUEUE_SIZE = 100
+
+    def new_queue(self):
+        return asyncio.Queue(maxsize=self.QUEUE_SIZE)
+
+    async def group_add(self, group, queue):
+        raise NotImplementedError
+
+    async def group_discard(self, group, queue):
+        raise NotImplementedError
+
+    async def group_send(self, group, event):
+        raise NotImplementedError
+
+
+class InMemoryChannelLayer(BaseChannelLayer):
+    """
+    Single-process channel layer: groups are sets of local queues
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    async def group_add(self, group, queue):
+        self.groups.setdefault(group, set()).add(queue)
+
+    async def group_discard(self, group, queue):
+        members = self.groups.get(group)
+        if members is None:
+            return
+        members.discard(queue)
+        if not members:
+            del self.groups[group]
+
+    async def group_send(self, group, event):
+        for queue in list(self.groups.get(group, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Dropping realtime event for slow subscriber in %s", group)
+
+
+def get_channel_layer():
+    """Return the process-wide channel layer configured in settings"""
+    global _channel_layer
+    if _channel_layer is None:
+        backend = getattr(settings, 'MESSAGING_CHANNEL_LAYER', DEFAULT_CHANNEL_LAYER)
+        _channel_layer = import_string(backend)()
+    return _channel_layer
+
+
+def publish(conversation_id, event):
+    """
+    Publish an event to a conversation from synchronous code (views).
+    Failures are logged and never break the request that triggered them.
+    """
+    try:
+        async_to_sync(get_channel_layer().group_send)(conversation_group(conversation_id), event)
+    except Exception:
+        logger.exception("Failed to publish realtime event for conversation %s", conversation_id)
@@ -0,0 +1,191 @@
+"""
+Full-text search over conversation messages
+
+The index lives in the database and is maintained there on insert:
+- PostgreSQL: GIN expression index on to_tsvector('simple', content)
+- SQLite: FTS5 table messaging_message_fts kept in sync by triggers
+Other backends fall back to a plain icontains scan.
+"""
+import base64
+import html
+import json
+import re
+
+from django.db import connection
+
+from .models import Message
+
+
+FTS_TABLE = 'messaging_message_fts'
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def parse_terms(query):
+    """Split a raw search string into lowercase word terms"""
+    return [term.lower() for term in _TERM_RE.findall(query or '')][:MAX_TERMS]
+
+
+def encode_cursor(rank, message_id):
+    """Encode a (rank, id) keyset position as an opaque URL-safe token"""
+    raw = json.dumps([rank, message_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor token, returning (rank, id) or None if it is invalid"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, message_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(rank), int(message_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def highlight(content, terms):
+    """
+    HTML-escape message content and wrap matched terms in <mark>.
+    Terms are matched as word prefixes, mirroring the prefix queries below.
+    """
+    if not terms:
+        return html.escape(content)
+    pattern = re.compile(
+        r'\b(' + '|'.join(re.escape(term) for term in terms) + r')',
+        re.IGNORECASE | re.UNICODE
+    )
+    # Escape the pieces around each match separately so a term can never
+    # match inside an HTML entity produced by escaping
+    parts = []
+    position = 0
+    for match in pattern.finditer(content):
+        parts.append(html.escape(content[position:match.start()]))
+        parts.append(f'<mark>{html.escape(match.group(1))}</mark>')
+        position = match.end()
+    parts.append(html.escape(content[position:]))
+    return ''.join(parts)
+
+
+def _scope_sql():
+    """WHERE fragment restricting results to the user's active conversations"""
+    return (
+        'c.is_active = %s AND (c.client_id = %s OR c.professional_id = %s)'
+    )
+
+
+def _search_postgresql(user, terms, after, limit):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    params = [tsquery, True, user.id, user.id]
+    keyset = ''
+    if after:
+        keyset = 'AND (rank < %s OR (rank = %s AND id < %s))'
+        params += [after[0], after[0], after[1]]
+    sql = f"""
+        SELECT id, rank FROM (
+            SELECT m.id AS id,
+                   ts_rank(to_tsvector('simple', m.content), q.query)::float8 AS rank
+            FROM messaging_message m
+            JOIN messaging_conversation c ON c.id = m.conversation_id
+            CROSS JOIN (SELECT to_tsquery('simple', %s) AS query) q
+            WHERE {_scope_sql()}
+              AND to_tsvector('simple', m.content) @@ q.query
+        ) ranked
+        WHERE TRUE {keyset}
+        ORDER BY rank DESC, id DESC
+        LIMIT %s
+    """
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _search_sqlite(user, terms, after, limit):
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    match = ' '.join(f'"{term}"*' for term in terms)
+    params = [match, True, user.id, user.id]
+    keyset = ''
+    if after:
+        keyset = 'WHERE rank < %s OR (rank = %s AND id < %s)'
+        params += [after[0], after[0], after[1]]
+    # bm25() is lower-is-better, negate it so both backends sort rank DESC
+    sql = f"""
+        SELECT id, rank FROM (
+            SELECT m.id AS id, -bm25({FTS_TABLE}) AS rank
+            FROM {FTS_TABLE}
+            JOIN messaging_message m ON m.id = {FTS_TABLE}.rowid
+            JOIN messaging_conversation c ON c.id = m.conversation_id
+            WHERE {FTS_TABLE} MATCH %s
+              AND {_scope_sql()}
+        ) ranked
+        {keyset}
+        ORDER BY rank DESC, id DESC
+        LIMIT %s
+    """
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _search_fallback(user, terms, after, limit):
+    from django.db.models import Q
+
+    messages = Message.objects.filter(
+        Q(conversation__client=user) | Q(conversation__professional=user),
+        conversation__is_active=True
+    )
+    for term in terms:
+        messages = messages.filter(content__icontains=term)
+    if after:
+        messages = messages.filter(id__lt=after[1])
+    return [(message_id, 0.0) for message_id in messages.order_by('-id').values_list('id', flat=True)[:limit]]
+
+
+def search_messages(user, query, cursor=None, limit=PAGE_SIZE):
+    """
+    Search messages in the user's conversations.
+    Returns (messages, next_cursor). Each message has `rank` and
+    `highlighted_content` attributes; next_cursor is None on the last page.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return [], None
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor)
+
+    if connection.vendor == 'postgresql':
+        rows = _search_postgresql(user, terms, after, limit + 1)
+    elif connection.vendor == 'sqlite':
+        rows = _search_sqlite(user, terms, after, limit + 1)
+    else:
+        rows = _search_fallback(user, terms, after, limit + 1)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    ranks = {message_id: rank for message_id, rank in rows}
+    messages_by_id = Message.objects.select_related(
+        'sender', 'conversation__request'
+    ).in_bulk(list(ranks))
+
+    results = []
+    for message_id, rank in rows:
+        message = messages_by_id.get(message_id)
+        if message is None:
+            continue
+        message.rank = rank
+        message.highlighted_content = highlight(message.content, terms)
+        results.append(message)
+
+    if has_more and rows:
+        last_id, last_rank = rows[-1]
+        next_cursor = encode_cursor(last_rank, last_id)
+    else:
+        next_cursor = None
+    return results, next_cursor
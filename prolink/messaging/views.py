@@ -11,63 +11,232 @@ from users.models import CustomUser
 from requests.models import Request
 
 
-@login_required
-def inbox(request):
+CONVERSATION_PAGE_SIZE = 20
+
+
+def _format_conversation_time(conv_time, now_local):
+    """Format a conversation timestamp relative to now (Facebook-style)"""
+    conv_time = timezone.localtime(conv_time)
+    if conv_time.date() == now_local.date():
+        return conv_time.strftime('%I:%M %p').lstrip('0')
+    elif (now_local.date() - conv_time.date()).days == 1:
+        return "Yesterday"
+    elif (now_local.date() - conv_time.date()).days < 7:
+        return conv_time.strftime('%A')
+    return conv_time.strftime('%b %d')
+
+
+def format_message_time(msg_time, now_local):
+    """Smart timestamp formatting: time only for today, date+time for older"""
+    msg_time = timezone.localtime(msg_time)
+    if msg_time.date() == now_local.date():
+        # Today: show only time
+        return msg_time.strftime('%I:%M %p').lstrip('0')
+    elif (now_local.date() - msg_time.date()).days == 1:
+        # Yesterday
+        return f"Yesterday {msg_time.strftime('%I:%M %p').lstrip('0')}"
+    elif (now_local.date() - msg_time.date()).days < 7:
+        # This week: show day name and time
+        return f"{msg_time.strftime('%A')} {msg_time.strftime('%I:%M %p').lstrip('0')}"
+    # Older: show date and time
+    return msg_time.strftime('%b %d, %I:%M %p').lstrip('0')
+
+
+def serialize_message(message, user, now_local=None):
+    """JSON representation of a message as seen by `user`"""
+    if now_local is None:
+        now_local = timezone.localtime(timezone.now())
+    return {
+        'id': message.id,
+        'content': message.content,
+        'sender_id': message.sender_id,
+        'sender_email': message.sender.email,
+        'sender_name': message.sender.get_full_name(),
+        'created_at': format_message_time(message.created_at, now_local),
+        'is_own_message': message.sender_id == user.id,
+    }
+
+
+def validate_message_content(content):
+    """Return an error string for invalid message content, or None"""
+    if not content:
+        return 'Message cannot be empty'
+    if len(content) > 1000:
+        return 'Message is too long (max 1000 characters)'
+    return None
+
+
+def deliver_message(conversation, sender, content):
     """
-    Display all conversations for the logged-in user with Facebook-style split view
-    Optimized with database annotations to avoid N+1 queries
+    Create a message, bump the conversation, notify the recipient and
+    publish it to realtime subscribers. Shared by the HTTP and WebSocket
+    transports; content must already be validated.
     """
-    user = request.user
+    from analytics.models import Notification
+    from django.urls import reverse
+    from . import realtime
     
-    # Optimized query with annotations to avoid N+1 queries
+    message = Message.objects.create(
+        conversation=conversation,
+        sender=sender,
+        content=content
+    )
+    
+    # Update conversation timestamp
+    conversation.updated_at = timezone.now()
+    conversation.save(update_fields=['updated_at'])
+    
+    # Notify the recipient of the new message
+    recipient = conversation.client if sender.id == conversation.professional_id else conversation.professional
+    
+    try:
+        conversation_url = reverse('messaging:conversation', args=[conversation.id])
+    except:
+        conversation_url = f'/messages/{conversation.id}/'
+    
+    Notification.create_notification(
+        user=recipient,
+        notification_type='message_received',
+        title='New Message',
+        message=f'You have a new message from {sender.get_full_name()} in "{conversation.request.title}".',
+        request=conversation.request,
+        related_user=sender,
+        link_url=conversation_url,
+        # One unread notification per conversation instead of one per message
+        collapse_key=Notification.build_collapse_key('message_received', 'conversation', conversation.id)
+    )
+    
+    realtime.publish(conversation.id, {
+        'type': 'message',
+        'message': serialize_message(message, sender),
+    })
+    
+    return message
+
+
+def mark_conversation_read(conversation, reader, up_to_id=None):
+    """
+    Mark messages from the other party as read and publish a read receipt.
+    Returns the number of messages updated.
+    """
+    from . import realtime
+    
+    unread = Message.objects.filter(
+        conversation=conversation,
+        is_read=False
+    ).exclude(sender=reader)
+    if up_to_id is not None:
+        unread = unread.filter(id__lte=up_to_id)
+    
+    last_read_id = unread.aggregate(last_id=Max('id'))['last_id']
+    if last_read_id is None:
+        return 0
+    
+    updated = unread.filter(id__lte=last_read_id).update(is_read=True)
+    if updated:
+        realtime.publish(conversation.id, {
+            'type': 'read',
+            'reader_id': reader.id,
+            'last_read_id': last_read_id,
+        })
+    return updated
+
+
+def _encode_conversation_cursor(conv):
+    """Keyset cursor for the conversation list: '<updated_at iso>|<id>'"""
+    return f"{conv.updated_at.isoformat()}|{conv.id}"
+
+
+def _decode_conversation_cursor(cursor):
+    """Decode a conversation cursor, returning (updated_at, id) or None"""
+    from django.utils.dateparse import parse_datetime
+    
+    if not cursor or '|' not in cursor:
+        return None
+    updated_at, conv_id = cursor.rsplit('|', 1)
+    try:
+        updated_at = parse_datetime(updated_at)
+        conv_id = int(conv_id)
+    except ValueError:
+        return None
+    if updated_at is None:
+        return None
+    return updated_at, conv_id
+
+
+def get_conversation_page(user, cursor=None, limit=CONVERSATION_PAGE_SIZE):
+    """
+    Load one page of the user's active conversations, newest first.
+    Keyset paginated on (updated_at, id) so each page is an index range scan
+    regardless of how deep the user scrolls.
+    Returns (conversation_list, next_cursor).
+    """
     conversations = Conversation.objects.filter(
         Q(client=user) | Q(professional=user),
         is_active=True
-    ).select_related('client', 'professional', 'request').annotate(
+    )
+    
+    after = _decode_conversation_cursor(cursor)
+    if after:
+        updated_at, conv_id = after
+        conversations = conversations.filter(
+            Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=conv_id)
+        )
+    
+    # Optimized query with annotations to avoid N+1 queries
+    page = list(conversations.select_related('client', 'professional', 'request').annotate(
         # Annotate unread count using aggregation
         unread_count=Count('messages', filter=Q(messages__is_read=False) & ~Q(messages__sender=user)),
-    ).prefetch_related(
-        # Prefetch only the last message for each conversation
-        Prefetch(
-            'messages',
-            queryset=Message.objects.select_related('sender').order_by('-created_at')[:1],
-            to_attr='last_message_list'
-        )
-    ).order_by('-updated_at')
+    ).order_by('-updated_at', '-id')[:limit + 1])
     
-    # Format timestamps and build conversation list
-    now = timezone.now()
-    now_local = timezone.localtime(now)
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    # Last message per conversation on this page only
+    last_messages = {}
+    if page:
+        latest_ids = Message.objects.filter(
+            conversation__in=[conv.id for conv in page]
+        ).values('conversation').annotate(latest_id=Max('id')).values_list('latest_id', flat=True)
+        for msg in Message.objects.select_related('sender').filter(id__in=list(latest_ids)):
+            last_messages[msg.conversation_id] = msg
+    
+    now_local = timezone.localtime(timezone.now())
     conversation_list = []
     
-    for conv in conversations:
+    for conv in page:
         # Determine the other party
         other_party = conv.professional if user == conv.client else conv.client
         
-        # Get last message from prefetched list
-        last_message = conv.last_message_list[0] if conv.last_message_list else None
-        
-        # Format conversation timestamp
-        conv_time = timezone.localtime(conv.updated_at)
-        if conv_time.date() == now_local.date():
-            formatted_conv_time = conv_time.strftime('%I:%M %p').lstrip('0')
-        elif (now_local.date() - conv_time.date()).days == 1:
-            formatted_conv_time = "Yesterday"
-        elif (now_local.date() - conv_time.date()).days < 7:
-            formatted_conv_time = conv_time.strftime('%A')
-        else:
-            formatted_conv_time = conv_time.strftime('%b %d')
-        
         conversation_list.append({
             'id': conv.id,
             'request_title': conv.request.title,
             'other_party': other_party,
-            'last_message': last_message,
+            'last_message': last_messages.get(conv.id),
             'unread_count': conv.unread_count or 0,
             'updated_at': conv.updated_at,
-            'formatted_updated_at': formatted_conv_time,
+            'formatted_updated_at': _format_conversation_time(conv.updated_at, now_local),
         })
     
+    next_cursor = _encode_conversation_cursor(page[-1]) if has_more else None
+    return conversation_list, next_cursor
+
+
+@login_required
+def inbox(request):
+    """
+    Display conversations for the logged-in user with Facebook-style split view
+    Only the first page of conversations is rendered; later pages are loaded
+    from conversations_api while scrolling
+    """
+    user = request.user
+    
+    conversation_list, next_cursor = get_conversation_page(user)
+    
+    # Format timestamps for the selected conversation
+    now = timezone.now()
+    now_local = timezone.localtime(now)
+    
     # Check if a conversation is selected (for split view)
     selected_conversation = None
     selected_messages = None
@@ -82,13 +251,10 @@ def inbox(request):
                 is_active=True
             )
             # Check if user has access
-            if user == selected_conv.client or user == selected_conv.professional:
+            if selected_conv.has_participant(user):
                 selected_conversation = selected_conv
                 # Mark messages as read
-                Message.objects.filter(
-                    conversation=selected_conv,
-                    is_read=False
-                ).exclude(sender=user).update(is_read=True)
+                mark_conversation_read(selected_conv, user)
                 # Get messages with pagination - only load recent messages initially
                 messages_queryset = selected_conv.messages.select_related('sender').order_by('-created_at')[:50]
                 messages_queryset = list(reversed(messages_queryset))  # Reverse to show oldest first
@@ -97,16 +263,7 @@ def inbox(request):
                 # Format message timestamps
                 selected_messages = []
                 for msg in messages_queryset:
-                    msg_time = timezone.localtime(msg.created_at)
-                    # Smart timestamp formatting
-                    if msg_time.date() == now_local.date():
-                        formatted_msg_time = msg_time.strftime('%I:%M %p').lstrip('0')
-                    elif (now_local.date() - msg_time.date()).days == 1:
-                        formatted_msg_time = f"Yesterday {msg_time.strftime('%I:%M %p').lstrip('0')}"
-                    elif (now_local.date() - msg_time.date()).days < 7:
-                        formatted_msg_time = f"{msg_time.strftime('%A')} {msg_time.strftime('%I:%M %p').lstrip('0')}"
-                    else:
-                        formatted_msg_time = msg_time.strftime('%b %d, %I:%M %p').lstrip('0')
+                    formatted_msg_time = format_message_time(msg.created_at, now_local)
                     
                     # Create message dict with formatted time
                     msg_dict = {
@@ -125,6 +282,7 @@ def inbox(request):
     
     context = {
         'conversations': conversation_list,
+        'conversations_next_cursor': next_cursor,
         'user': user,
         'selected_conversation': selected_conversation,
         'selected_messages': selected_messages,
@@ -149,7 +307,7 @@ def conversation_detail(request, conversation_id):
     )
     
     # Check if user has access to this conversation
-    if user != conversation.client and user != conversation.professional:
+    if not conversation.has_participant(user):
         django_messages.error(request, "You don't have permission to view this conversation.")
         return redirect('messaging:inbox')
     
@@ -169,84 +327,27 @@ def send_message(request, conversation_id):
     
     # Get conversation and verify access
     try:
-        conversation = Conversation.objects.select_related('client', 'professional').get(id=conversation_id)
+        conversation = Conversation.objects.select_related('client', 'professional', 'request').get(id=conversation_id)
     except Conversation.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Conversation not found'}, status=404)
     
     # Check if user has access
-    if user != conversation.client and user != conversation.professional:
+    if not conversation.has_participant(user):
         return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
     
     # Get message content
     content = request.POST.get('content', '').strip()
     
     # Validate content
-    if not content:
-        return JsonResponse({'success': False, 'error': 'Message cannot be empty'}, status=400)
-    
-    if len(content) > 1000:
-        return JsonResponse({'success': False, 'error': 'Message is too long (max 1000 characters)'}, status=400)
-    
-    # Create message
-    message = Message.objects.create(
-        conversation=conversation,
-        sender=user,
-        content=content
-    )
-    
-    # Update conversation timestamp
-    conversation.updated_at = timezone.now()
-    conversation.save(update_fields=['updated_at'])
-    
-    # Notify the recipient of the new message
-    recipient = conversation.client if user == conversation.professional else conversation.professional
-    from analytics.models import Notification
-    from django.urls import reverse
-    
-    try:
-        conversation_url = reverse('messaging:conversation', args=[conversation_id])
-    except:
-        conversation_url = f'/messages/{conversation_id}/'
+    error = validate_message_content(content)
+    if error:
+        return JsonResponse({'success': False, 'error': error}, status=400)
     
-    Notification.create_notification(
-        user=recipient,
-        notification_type='message_received',
-        title='New Message',
-        message=f'You have a new message from {user.get_full_name()} in "{conversation.request.title}".',
-        request=conversation.request,
-        related_user=user,
-        link_url=conversation_url
-    )
-    
-    # Format timestamp - convert to local timezone and format smartly
-    now = timezone.now()
-    msg_time = timezone.localtime(message.created_at)
-    now_local = timezone.localtime(now)
-    
-    # Smart timestamp formatting: time only for today, date+time for older
-    if msg_time.date() == now_local.date():
-        # Today: show only time
-        formatted_time = msg_time.strftime('%I:%M %p').lstrip('0')
-    elif (now_local.date() - msg_time.date()).days == 1:
-        # Yesterday
-        formatted_time = f"Yesterday {msg_time.strftime('%I:%M %p').lstrip('0')}"
-    elif (now_local.date() - msg_time.date()).days < 7:
-        # This week: show day name and time
-        formatted_time = f"{msg_time.strftime('%A')} {msg_time.strftime('%I:%M %p').lstrip('0')}"
-    else:
-        # Older: show date and time
-        formatted_time = msg_time.strftime('%b %d, %I:%M %p').lstrip('0')
+    message = deliver_message(conversation, user, content)
     
     return JsonResponse({
         'success': True,
-        'message': {
-            'id': message.id,
-            'content': message.content,
-            'sender_email': message.sender.email,
-            'sender_name': message.sender.get_full_name(),
-            'created_at': formatted_time,
-            'is_own_message': True
-        }
+        'message': serialize_message(message, user)
     })
 
 
@@ -278,7 +379,10 @@ def get_new_messages(request, conversation_id):
     AJAX endpoint to get new messages since a specific message ID
     """
     user = request.user
-    last_message_id = request.GET.get('last_message_id', 0)
+    try:
+        last_message_id = int(request.GET.get('last_message_id', 0))
+    except ValueError:
+        last_message_id = 0
     
     try:
         conversation = Conversation.objects.select_related('client', 'professional').get(id=conversation_id)
@@ -286,54 +390,92 @@ def get_new_messages(request, conversation_id):
         return JsonResponse({'success': False, 'error': 'Conversation not found'}, status=404)
     
     # Check if user has access
-    if user != conversation.client and user != conversation.professional:
+    if not conversation.has_participant(user):
         return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
     
     # Get new messages - limit to 50 to avoid large responses
-    # First, mark messages as read (before slicing)
-    Message.objects.filter(
+    new_messages = list(Message.objects.filter(
         conversation=conversation,
         id__gt=last_message_id
-    ).exclude(sender=user).update(is_read=True)
+    ).select_related('sender').order_by('created_at')[:50])
     
-    # Then get the messages for response (with slice)
-    new_messages = Message.objects.filter(
-        conversation=conversation,
-        id__gt=last_message_id
-    ).select_related('sender').order_by('created_at')[:50]
+    # Mark everything up to what we return as read
+    if new_messages:
+        mark_conversation_read(conversation, user, up_to_id=new_messages[-1].id)
     
-    # Format timestamps - convert to local timezone and format smartly
-    now = timezone.now()
-    now_local = timezone.localtime(now)
+    now_local = timezone.localtime(timezone.now())
+    messages_data = [serialize_message(msg, user, now_local) for msg in new_messages]
     
-    messages_data = []
-    for msg in new_messages:
-        msg_time = timezone.localtime(msg.created_at)
-        
-        # Smart timestamp formatting: time only for today, date+time for older
-        if msg_time.date() == now_local.date():
-            # Today: show only time
-            formatted_time = msg_time.strftime('%I:%M %p').lstrip('0')
-        elif (now_local.date() - msg_time.date()).days == 1:
-            # Yesterday
-            formatted_time = f"Yesterday {msg_time.strftime('%I:%M %p').lstrip('0')}"
-        elif (now_local.date() - msg_time.date()).days < 7:
-            # This week: show day name and time
-            formatted_time = f"{msg_time.strftime('%A')} {msg_time.strftime('%I:%M %p').lstrip('0')}"
-        else:
-            # Older: show date and time
-            formatted_time = msg_time.strftime('%b %d, %I:%M %p').lstrip('0')
-        
-        messages_data.append({
+    return JsonResponse({
+        'success': True,
+        'messages': messages_data
+    })
+
+
+@login_required
+def search_messages(request):
+    """
+    AJAX endpoint for full-text message search across the user's conversations
+    Results are ranked and paginated with an opaque cursor
+    """
+    from .search import search_messages as run_search, PAGE_SIZE
+
+    query = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor')
+    try:
+        limit = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        limit = PAGE_SIZE
+
+    results, next_cursor = run_search(request.user, query, cursor=cursor, limit=limit)
+
+    user = request.user
+    results_data = []
+    for msg in results:
+        conversation = msg.conversation
+        results_data.append({
             'id': msg.id,
-            'content': msg.content,
-            'sender_email': msg.sender.email,
-            'sender_name': msg.sender.get_full_name(),
-            'created_at': formatted_time,
-            'is_own_message': msg.sender == user
+            'conversation_id': conversation.id,
+            'request_title': conversation.request.title,
+            'sender_name': msg.sender.get_full_name() or msg.sender.email,
+            'is_own_message': msg.sender_id == user.id,
+            'highlighted_content': msg.highlighted_content,
+            'created_at': timezone.localtime(msg.created_at).strftime('%b %d, %I:%M %p'),
+        })
+
+    return JsonResponse({
+        'success': True,
+        'query': query,
+        'results': results_data,
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def conversations_api(request):
+    """
+    AJAX endpoint returning the next page of the inbox conversation list
+    """
+    user = request.user
+    conversation_list, next_cursor = get_conversation_page(user, cursor=request.GET.get('cursor'))
+    
+    conversations_data = []
+    for conv in conversation_list:
+        other_party = conv['other_party']
+        last_message = conv['last_message']
+        conversations_data.append({
+            'id': conv['id'],
+            'request_title': conv['request_title'],
+            'other_party_name': other_party.get_full_name() or other_party.email,
+            'other_party_avatar': other_party.get_profile_picture(40),
+            'last_message': last_message.content if last_message else None,
+            'last_message_is_own': bool(last_message and last_message.sender_id == user.id),
+            'unread_count': conv['unread_count'],
+            'formatted_updated_at': conv['formatted_updated_at'],
         })
     
     return JsonResponse({
         'success': True,
-        'messages': messages_data
+        'conversations': conversations_data,
+        'next_cursor': next_cursor,
     })
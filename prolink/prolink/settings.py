@@ -156,6 +156,15 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Disk cache for generated initials avatars (users.avatars)
+AVATAR_CACHE_DIR = os.getenv('AVATAR_CACHE_DIR', os.path.join(MEDIA_ROOT, 'avatar_cache'))
+
+# Uploads larger than this are spooled to a temporary file on disk instead of
+# memory, and storage uploads stream from that file (see
+# requests.storage_utils.open_upload_stream), keeping worker RSS flat
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 1024 * 1024))  # 1MB
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR') or None
+
 # WhiteNoise configuration for static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage' 
 
@@ -176,6 +185,17 @@ except ImportError:
     SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY', '')
     SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY', '')
 
+# File storage backend for request attachments, deliverables and dispute evidence
+# (dotted path to a requests.storage_utils.BaseStorageManager subclass).
+# LocalStorageManager keeps files under LOCAL_STORAGE_ROOT; LOCAL_STORAGE_SERVE
+# picks how they are delivered: 'django' (FileResponse with Range support),
+# 'x-accel-redirect' (nginx internal location at LOCAL_STORAGE_ACCEL_PREFIX
+# aliased to LOCAL_STORAGE_ROOT/request-files/) or 'x-sendfile' (Apache)
+FILE_STORAGE_BACKEND = os.getenv('FILE_STORAGE_BACKEND', 'requests.storage_utils.SupabaseStorageManager')
+LOCAL_STORAGE_ROOT = os.getenv('LOCAL_STORAGE_ROOT', os.path.join(BASE_DIR, 'storage'))
+LOCAL_STORAGE_SERVE = os.getenv('LOCAL_STORAGE_SERVE', 'django')
+LOCAL_STORAGE_ACCEL_PREFIX = os.getenv('LOCAL_STORAGE_ACCEL_PREFIX', '/protected-files/')
+
 # Security settings for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -189,11 +209,26 @@ if not DEBUG:
     CSRF_COOKIE_SECURE = True
     SESSION_COOKIE_SECURE = True
 
+# Realtime messaging (WebSocket transport served from prolink/asgi.py)
+# The in-memory layer only reaches sockets in the same process; set this to a
+# shared-broker backend implementing messaging.realtime.BaseChannelLayer when
+# running more than one ASGI worker
+MESSAGING_CHANNEL_LAYER = os.getenv('MESSAGING_CHANNEL_LAYER', 'messaging.realtime.InMemoryChannelLayer')
+
 # Payment Settings
 PROLINK_GCASH_NUMBER = os.getenv('PROLINK_GCASH_NUMBER', '09XX-XXX-XXXX')  # Configure in production
 PROLINK_GCASH_NAME = os.getenv('PROLINK_GCASH_NAME', 'ProLink Services')
 PLATFORM_FEE_PERCENTAGE = 0.10  # 10% platform fee
 
+# Request deadlines, enforced by the scheduler (python manage.py run_scheduler)
+AUTO_APPROVE_DAYS = int(os.getenv('AUTO_APPROVE_DAYS', 7))  # Submitted work is approved if the client doesn't respond
+PAYMENT_WINDOW_DAYS = int(os.getenv('PAYMENT_WINDOW_DAYS', 7))  # Accepted requests are cancelled if left unpaid
+REVIEW_WINDOW_DAYS = int(os.getenv('REVIEW_WINDOW_DAYS', 30))  # Reviews are accepted this long after completion
+
+# Professional ranking (users/ranking.py)
+RANKING_PRIOR_REVIEWS = int(os.getenv('RANKING_PRIOR_REVIEWS', 10))  # Phantom average reviews every rating starts with
+RANKING_RECENCY_HALF_LIFE_DAYS = int(os.getenv('RANKING_RECENCY_HALF_LIFE_DAYS', 90))  # Recency boost halves this often
+
 # PayMongo Configuration
 # Test Mode: Use test keys (starts with pk_test_ and sk_test_)
 # Live Mode: Use live keys (starts with pk_live_ and sk_live_)
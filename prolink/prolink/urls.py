@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from analytics import views as analytics_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,6 +28,7 @@ urlpatterns = [
     path('transactions/', include('transactions.urls')),
     path('notifications/', include('analytics.urls')),
     path('admin-dashboard/', include('admin_dashboard.urls')),
+    path('api/poll/', analytics_views.poll_state, name='poll_state'),
 ]
 
 # Serve static files during development
@@ -1,8 +1,26 @@
 from django.contrib import admin
-from .models import Request, RequestMessage
+from .models import Request, RequestMessage, RequestFile, RequestStatusEvent
 
 # Register your models here.
 
+class RequestFileInline(admin.TabularInline):
+    model = RequestFile
+    fk_name = 'request'
+    extra = 0
+    fields = ['kind', 'original_name', 'url', 'size', 'mime_type', 'owner', 'created_at']
+    readonly_fields = ['created_at']
+    raw_id_fields = ['owner']
+
+class RequestStatusEventInline(admin.TabularInline):
+    model = RequestStatusEvent
+    extra = 0
+    fields = ['from_status', 'status', 'at']
+    readonly_fields = fields
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Request)
 class RequestAdmin(admin.ModelAdmin):
     list_display = ['title', 'client', 'professional', 'status', 'price', 'created_at']
@@ -21,13 +39,10 @@ class RequestAdmin(admin.ModelAdmin):
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'completed_at')
         }),
-        ('Files', {
-            'fields': ('attached_files',),
-            'classes': ('collapse',)
-        }),
     )
     
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [RequestFileInline, RequestStatusEventInline]
 
 @admin.register(RequestMessage)
 class RequestMessageAdmin(admin.ModelAdmin):
@@ -49,3 +64,30 @@ class RequestMessageAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['created_at']
+
+@admin.register(RequestFile)
+class RequestFileAdmin(admin.ModelAdmin):
+    list_display = ['original_name', 'kind', 'request', 'owner', 'size', 'created_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['original_name', 'stored_path', 'request__title', 'owner__email']
+    raw_id_fields = ['request', 'dispute', 'owner']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at']
+
+@admin.register(RequestStatusEvent)
+class RequestStatusEventAdmin(admin.ModelAdmin):
+    list_display = ['request', 'from_status', 'status', 'at']
+    list_filter = ['status', 'at']
+    search_fields = ['request__title']
+    raw_id_fields = ['request']
+    ordering = ['-at']
+    
+    # The history is append-only
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,137 @@
+"""
+Streaming ZIP archives of stored request files
+
+zipfile writes to an unseekable sink here, so each entry is emitted with a
+data descriptor after its content instead of a patched-up local header.
+Nothing is buffered beyond the chunk currently being compressed and no temp
+files are used, so memory stays flat regardless of how many or how large the
+files are.
+
+Files are read by their storage path. Legacy rows without one are
+downloaded from their absolute URL instead. Files that can't be read are
+listed in a MISSING_FILES.txt entry rather than dropped silently.
+"""
+import io
+import logging
+import os
+import zipfile
+
+import httpx
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+URL_TIMEOUT = 30
+
+# Already-compressed formats are stored as-is instead of deflated again
+STORED_EXTENSIONS = {'.zip', '.png', '.jpg', '.jpeg', '.docx', '.pdf'}
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable buffer that hands back what zipfile wrote"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def archive_name(name, used):
+    """Flat, unique entry name for a file ('report.pdf', 'report (2).pdf', ...)"""
+    name = os.path.basename((name or '').replace('\\', '/')).strip() or 'file'
+    base, ext = os.path.splitext(name)
+    candidate = name
+    counter = 2
+    while candidate.lower() in used:
+        candidate = f"{base} ({counter}){ext}"
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def iter_url(url, chunk_size=CHUNK_SIZE):
+    """Chunks of a file downloaded from an absolute http(s) URL"""
+    with httpx.stream('GET', url, timeout=URL_TIMEOUT, follow_redirects=True) as response:
+        response.raise_for_status()
+        yield from response.iter_bytes(chunk_size)
+
+
+def file_chunks(storage_manager, file):
+    """Content of a RequestFile, or None if it has no readable location"""
+    if file.storage_path:
+        return storage_manager.iter_file(file.storage_path, CHUNK_SIZE)
+    if file.url.startswith(('https://', 'http://')):
+        return iter_url(file.url)
+    return None
+
+
+def stream_zip(storage_manager, files):
+    """
+    Yield a ZIP archive of RequestFile rows chunk by chunk, reading each
+    file from storage as it goes.
+
+    A file that can't be opened (no path or URL, or gone from storage) is
+    skipped and listed in MISSING_FILES.txt. A file that fails after part of
+    it was written ends the archive there, since the response status has
+    already been sent; the archive is still closed properly, with the
+    truncated file noted in MISSING_FILES.txt.
+    """
+    sink = _ZipSink()
+    used = set()
+    problems = []
+    with zipfile.ZipFile(sink, mode='w') as archive:
+        for file in files:
+            chunks = file_chunks(storage_manager, file)
+            if chunks is None:
+                logger.warning("No storage path or URL for request file %s, left out of ZIP", file.id)
+                problems.append(f"{file.original_name} (no storage location recorded)")
+                continue
+            # Open the source before starting an entry, so a missing object
+            # is skipped instead of leaving a half-written entry behind
+            try:
+                first_chunk = next(chunks, b'')
+            except Exception:
+                logger.exception("Failed to read %s for ZIP archive", file.storage_path or file.url)
+                problems.append(f"{file.original_name} (not found in storage)")
+                continue
+
+            name = archive_name(file.original_name, used)
+            info = zipfile.ZipInfo(name, date_time=timezone.localtime(file.created_at).timetuple()[:6])
+            info.external_attr = 0o644 << 16
+            if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+
+            try:
+                with archive.open(info, mode='w') as entry:
+                    entry.write(first_chunk)
+                    for chunk in chunks:
+                        entry.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            except Exception:
+                logger.exception("Failed to add %s to ZIP archive", file.storage_path or file.url)
+                problems.append(f"{name} (download interrupted, the copy in this archive is incomplete)")
+                break
+            yield sink.drain()
+        if problems:
+            archive.writestr(
+                archive_name('MISSING_FILES.txt', used),
+                "Some files could not be included in full:\n"
+                + ''.join(f"- {problem}\n" for problem in problems)
+            )
+    # Remaining entries and the central directory
+    yield sink.drain()
@@ -0,0 +1,122 @@
+"""
+Aggregate loader for the request detail pages
+
+request_detail (client/admin) and professional_request_detail both render
+from a RequestDetail built by load_request_detail(). The request comes back
+with its transaction, dispute and conversation from one joined query; files,
+messages, the viewer's review, participants and other reviews are one batched
+query each, and only the ones the page shows are loaded.
+"""
+from django.db.models import Prefetch, prefetch_related_objects
+
+from users.models import CustomUser
+
+from .models import Request, RequestFile
+
+
+# Request fields copied onto the view model as-is
+MODEL_FIELDS = (
+    'id', 'title', 'description', 'client', 'professional', 'status', 'price',
+    'timeline_days', 'created_at', 'updated_at', 'completed_at', 'submitted_at',
+    'deliverable_notes', 'revision_count', 'max_revisions', 'revision_notes',
+)
+
+PROGRESS = {
+    'pending': 0,
+    'in_progress': 60,
+    'under_review': 80,
+    'completed': 100,
+}
+
+
+class RequestDetail:
+    """Read-only view of a request and everything its detail page shows"""
+
+    __slots__ = MODEL_FIELDS + (
+        'attached_files', 'deliverable_files', 'messages', 'transaction', 'conversation',
+        'client_user', 'professional_user', 'user_review', 'other_professional_reviews',
+    )
+
+    def __init__(self, req):
+        for field in MODEL_FIELDS:
+            setattr(self, field, getattr(req, field))
+        files = req.files.all()
+        self.attached_files = [file for file in files if file.kind == RequestFile.KIND_ATTACHMENT]
+        self.deliverable_files = [file for file in files if file.kind == RequestFile.KIND_DELIVERABLE]
+        self.messages = []
+        # Reverse one-to-ones cached by select_related (None when missing)
+        self.transaction = req.transaction if hasattr(req, 'transaction') else None
+        self.conversation = req.conversation if hasattr(req, 'conversation') else None
+        self.client_user = None
+        self.professional_user = None
+        self.user_review = None
+        self.other_professional_reviews = []
+
+    @property
+    def progress(self):
+        return PROGRESS.get(self.status, 0)
+
+
+def load_request_detail(request_id, user, as_professional=False):
+    """
+    Load a request for its detail page, or None if it doesn't exist or the
+    user may not see it. Staff see every request, other users only requests
+    where they are the client (or the professional, with as_professional).
+
+    The client page gets the request messages; the professional page gets
+    the participants and the latest reviews other professionals left for the
+    client. Both get the viewer's own review once the request is completed.
+    """
+    from analytics.models import Review
+
+    queryset = Request.objects.select_related('transaction__dispute', 'conversation')
+    if not getattr(user, 'is_staff', False):
+        if as_professional:
+            queryset = queryset.filter(professional=user.email)
+        else:
+            queryset = queryset.filter(client=user.email)
+    req = queryset.filter(id=request_id).first()
+    if req is None:
+        return None
+
+    lookups = ['files']
+    if not as_professional:
+        lookups.append('messages')
+
+    # The viewer reviews the other participant
+    if as_professional or user.email != req.client:
+        reviewee_email = req.client
+    else:
+        reviewee_email = req.professional
+    if req.status == 'completed' and reviewee_email:
+        lookups.append(Prefetch(
+            'reviews',
+            queryset=Review.objects.filter(reviewer=user, reviewee__email=reviewee_email),
+            to_attr='viewer_reviews'
+        ))
+    prefetch_related_objects([req], *lookups)
+
+    detail = RequestDetail(req)
+    if not as_professional:
+        detail.messages = list(req.messages.all())
+    viewer_reviews = getattr(req, 'viewer_reviews', None)
+    if viewer_reviews:
+        detail.user_review = viewer_reviews[0]
+
+    if as_professional:
+        emails = [email for email in (req.client, req.professional) if email]
+        users = {participant.email: participant for participant in CustomUser.objects.filter(email__in=emails)}
+        detail.client_user = users.get(req.client)
+        detail.professional_user = users.get(req.professional)
+        if detail.client_user:
+            # Reviews from other professionals about this client (visible to professionals only)
+            detail.other_professional_reviews = list(
+                Review.objects.filter(
+                    reviewee=detail.client_user,
+                    is_professional_review=True
+                ).exclude(
+                    reviewer=user
+                ).select_related('reviewer', 'request').order_by('-created_at')[:5]
+            )
+
+    return detail
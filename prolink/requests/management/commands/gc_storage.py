@@ -0,0 +1,152 @@
+"""
+Management command to delete orphaned objects from the request files bucket
+
+An object is an orphan when no RequestFile row points at it. Objects
+younger than the grace period are always kept, since direct uploads land
+in storage before their RequestFile row is created. Content index rows
+(FileContent) left behind by deleted requests are removed with their objects.
+
+Legacy rows without a stored_path are matched on the path in their URL.
+If that fails too, nothing in the folder the file was uploaded to is
+deleted, since any object there may be it.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat, pluralize
+from django.utils import timezone
+
+from requests.models import FileContent, RequestFile
+from requests.storage_utils import get_storage_manager
+
+
+def upload_folder(file):
+    """Folder a RequestFile was uploaded to before paths were content-addressed"""
+    if file.kind == RequestFile.KIND_ATTACHMENT:
+        return f"requests/{file.request.client}"
+    if file.kind == RequestFile.KIND_DELIVERABLE:
+        return f"deliverables/{file.request_id}"
+    if file.dispute_id:
+        return f"disputes/{file.dispute.transaction_id}"
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Deletes storage objects that no request file references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report orphans without deleting anything'
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=24,
+            help='Keep objects modified within this many hours (default: 24)'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=1000,
+            help='Objects listed per storage request (default: 1000)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Objects deleted per storage request (default: 100)'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = max(1, options['batch_size'])
+        cutoff = timezone.now() - timedelta(hours=max(0, options['grace_hours']))
+        storage_manager = get_storage_manager()
+
+        referenced = set(
+            RequestFile.objects.exclude(stored_path='').values_list('stored_path', flat=True).iterator()
+        )
+        protected_folders = set()
+        legacy_files = RequestFile.objects.filter(stored_path='').select_related('request', 'dispute')
+        for file in legacy_files.iterator():
+            if file.storage_path:
+                referenced.add(file.storage_path)
+            else:
+                protected_folders.add(upload_folder(file))
+        if None in protected_folders:
+            self.stdout.write(self.style.WARNING(
+                'Some files have no known storage path or folder; nothing will be deleted'
+            ))
+            dry_run = True
+        elif protected_folders:
+            self.stdout.write(self.style.WARNING(
+                f'Keeping everything under {len(protected_folders)} folder{pluralize(len(protected_folders))} with files of unknown path'
+            ))
+        protected_prefixes = tuple(f"{folder}/" for folder in protected_folders if folder)
+        # Content re-referenced within the grace period may be about to get
+        # its RequestFile row
+        referenced.update(
+            FileContent.objects.filter(updated_at__gte=cutoff).values_list('stored_path', flat=True).iterator()
+        )
+        self.stdout.write(f'{len(referenced)} referenced files in the database')
+        if dry_run:
+            self.stdout.write(self.style.WARNING('Dry run: nothing will be deleted'))
+
+        scanned = 0
+        orphan_count = 0
+        orphan_bytes = 0
+        deleted_count = 0
+        deleted_bytes = 0
+        batch = []
+
+        def delete_batch():
+            nonlocal deleted_count, deleted_bytes
+            paths = [item['path'] for item in batch]
+            # Mark stale index rows as being deleted first (see
+            # BaseStorageManager.release_file) so no upload can deduplicate
+            # onto an object that is about to go; rows touched since the
+            # cutoff survive. The rows are dropped once the objects are gone.
+            FileContent.objects.filter(stored_path__in=paths, updated_at__lt=cutoff).update(
+                ref_count=0, updated_at=timezone.now()
+            )
+            kept = set(
+                FileContent.objects.filter(stored_path__in=paths, ref_count__gt=0).values_list('stored_path', flat=True)
+            )
+            doomed = [item['path'] for item in batch if item['path'] not in kept]
+            if doomed and storage_manager.delete_multiple_files(doomed) == len(doomed):
+                deleted_count += len(doomed)
+                deleted_bytes += sum(item['size'] for item in batch if item['path'] not in kept)
+                FileContent.objects.filter(stored_path__in=doomed, ref_count=0).delete()
+            elif doomed:
+                self.stdout.write(self.style.ERROR(f'  Failed to delete a batch of {len(doomed)} objects'))
+            batch.clear()
+
+        for page in storage_manager.list_files(page_size=max(1, options['page_size'])):
+            scanned += len(page)
+            for item in page:
+                if item['path'] in referenced or item['path'].startswith(protected_prefixes):
+                    continue
+                # Unknown age counts as recent
+                if item['modified_at'] is None or item['modified_at'] >= cutoff:
+                    continue
+
+                orphan_count += 1
+                orphan_bytes += item['size']
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"  {item['path']} ({filesizeformat(item['size'])})")
+                if not dry_run:
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        delete_batch()
+        if batch:
+            delete_batch()
+
+        self.stdout.write(f'Scanned {scanned} objects, found {orphan_count} orphans ({filesizeformat(orphan_bytes)})')
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f'Would reclaim {filesizeformat(orphan_bytes)} ({orphan_bytes} bytes)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {deleted_count} objects, reclaimed {filesizeformat(deleted_bytes)} ({deleted_bytes} bytes)'
+            ))
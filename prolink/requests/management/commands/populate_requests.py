@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from requests.models import Request, RequestMessage
+from requests.models import Request, RequestMessage, RequestFile
 from datetime import datetime, timedelta
 
 class Command(BaseCommand):
@@ -20,7 +20,7 @@ class Command(BaseCommand):
                 'price': 75.00,
                 'timeline_days': 5,
                 'created_at': datetime.now() - timedelta(days=2),
-                'attached_files': '["research_paper.pdf", "references.docx"]'
+                'attached_files': ['research_paper.pdf', 'references.docx']
             },
             {
                 'title': 'Website Design Consultation',
@@ -32,7 +32,7 @@ class Command(BaseCommand):
                 'timeline_days': 3,
                 'created_at': datetime.now() - timedelta(days=5),
                 'completed_at': datetime.now() - timedelta(days=2),
-                'attached_files': '["portfolio_screenshots.png", "wireframes.pdf"]'
+                'attached_files': ['portfolio_screenshots.png', 'wireframes.pdf']
             },
             {
                 'title': 'Business Plan Review',
@@ -43,7 +43,7 @@ class Command(BaseCommand):
                 'price': 200.00,
                 'timeline_days': 7,
                 'created_at': datetime.now() - timedelta(hours=6),
-                'attached_files': '["business_plan.pdf", "financial_model.xlsx"]'
+                'attached_files': ['business_plan.pdf', 'financial_model.xlsx']
             },
             {
                 'title': 'Code Review - React Application',
@@ -54,7 +54,7 @@ class Command(BaseCommand):
                 'price': 150.00,
                 'timeline_days': 4,
                 'created_at': datetime.now() - timedelta(days=1),
-                'attached_files': '["src_code.zip", "package.json"]'
+                'attached_files': ['src_code.zip', 'package.json']
             },
             {
                 'title': 'Marketing Strategy Consultation',
@@ -65,13 +65,18 @@ class Command(BaseCommand):
                 'price': 300.00,
                 'timeline_days': 10,
                 'created_at': datetime.now() - timedelta(days=10),
-                'attached_files': '["current_strategy.pdf", "analytics_report.pdf"]'
+                'attached_files': ['current_strategy.pdf', 'analytics_report.pdf']
             }
         ]
         
         # Create requests
         for req_data in requests_data:
+            attached_files = req_data.pop('attached_files', [])
             request_obj = Request.objects.create(**req_data)
+            RequestFile.objects.bulk_create([
+                RequestFile(request=request_obj, kind=RequestFile.KIND_ATTACHMENT, original_name=name)
+                for name in attached_files
+            ])
             self.stdout.write(f'Created request: {request_obj.title}')
             
             # Add some sample messages for in-progress requests
@@ -0,0 +1,67 @@
+"""
+Management command to run the time-based request transitions
+
+Run it from cron (e.g. every few minutes) or as a long-running worker with
+--loop. Any number of instances may run at once; due rows are claimed with
+SKIP LOCKED so each is handled by exactly one of them.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from requests.scheduler import BATCH_SIZE, run_due
+
+
+class Command(BaseCommand):
+    help = 'Auto-approves overdue work, cancels unpaid requests and closes expired review windows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--now',
+            help='Treat this ISO datetime as the current time (for testing)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Requests claimed per transaction (default: {BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, sweeping every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=60,
+            help='Seconds between sweeps with --loop (default: 60)'
+        )
+
+    def handle(self, *args, **options):
+        now = None
+        if options['now']:
+            now = parse_datetime(options['now'])
+            if now is None:
+                raise CommandError(f"Invalid --now datetime: {options['now']}")
+            if timezone.is_naive(now):
+                now = timezone.make_aware(now)
+        if options['loop'] and now is not None:
+            raise CommandError('--now cannot be combined with --loop')
+
+        batch_size = max(1, options['batch_size'])
+        while True:
+            results = run_due(now=now, batch_size=batch_size)
+            for name, counts in results.items():
+                line = f"{name}: {counts['processed']} processed, {counts['skipped']} skipped, {counts['failed']} failed"
+                if counts['failed']:
+                    self.stdout.write(self.style.ERROR(line))
+                elif counts['processed']:
+                    self.stdout.write(self.style.SUCCESS(line))
+                elif options['verbosity'] > 1 or not options['loop']:
+                    self.stdout.write(line)
+            if not options['loop']:
+                break
+            time.sleep(max(1, options['interval']))
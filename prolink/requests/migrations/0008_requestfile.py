@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0007_filecontent'),
+        ('transactions', '0002_withdrawalrequest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('attachment', 'Request Attachment'), ('deliverable', 'Deliverable'), ('client_evidence', 'Client Dispute Evidence'), ('professional_evidence', 'Professional Dispute Evidence')], max_length=30)),
+                ('original_name', models.CharField(max_length=255)),
+                ('stored_path', models.CharField(blank=True, help_text='Path in the storage bucket', max_length=500)),
+                ('url', models.CharField(blank=True, max_length=1000)),
+                ('size', models.BigIntegerField(blank=True, help_text='Size in bytes', null=True)),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('sha256', models.CharField(blank=True, help_text='Content hash (empty for direct and legacy uploads)', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dispute', models.ForeignKey(blank=True, help_text='Set for dispute evidence', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='files', to='transactions.dispute')),
+                ('owner', models.ForeignKey(blank=True, help_text='User who uploaded the file', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_files', to=settings.AUTH_USER_MODEL)),
+                ('request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='requests.request')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['request', 'kind'], name='requests_re_request_e8201d_idx'), models.Index(fields=['dispute', 'kind'], name='requests_re_dispute_7e8efe_idx'), models.Index(fields=['owner', 'kind'], name='requests_re_owner_i_e9d7d3_idx')],
+            },
+        ),
+    ]
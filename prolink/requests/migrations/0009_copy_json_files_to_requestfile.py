@@ -0,0 +1,174 @@
+# Copies the JSON file lists on Request (attached_files, deliverable_files)
+# and Dispute (client_files, professional_files) into RequestFile rows.
+
+import json
+import logging
+import re
+from urllib.parse import unquote
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# Supabase public object URLs: .../storage/v1/object/public/<bucket>/<path>
+PUBLIC_OBJECT_URL_RE = re.compile(r'/object/public/[^/?#]+/([^?#]+)')
+
+logger = logging.getLogger(__name__)
+
+
+def _stored_path(info, url):
+    """
+    Uploads record their bucket path; deliverables only kept name, url and
+    size, so their path is taken from the public URL
+    """
+    path = info.get('stored_path') or info.get('file_path')
+    if not path:
+        match = PUBLIC_OBJECT_URL_RE.search(url)
+        path = unquote(match.group(1)) if match else ''
+    return path
+
+
+def _parse_files(raw):
+    """
+    Legacy values are a JSON list of upload dicts, a JSON list of bare
+    names/URLs (populate_requests), or a single raw URL string
+    """
+    if not raw:
+        return []
+    try:
+        files = json.loads(raw)
+    except (TypeError, ValueError):
+        return [{'public_url': raw, 'original_name': raw.rsplit('/', 1)[-1]}]
+    if not isinstance(files, list):
+        files = [files]
+
+    parsed = []
+    for item in files:
+        if isinstance(item, str):
+            is_url = '/' in item
+            item = {'public_url': item if is_url else '', 'original_name': item.rsplit('/', 1)[-1]}
+        elif not isinstance(item, dict):
+            continue
+        parsed.append(item)
+    return parsed
+
+
+def _build(RequestFile, info, **fields):
+    url = info.get('public_url') or info.get('url') or ''
+    try:
+        size = int(info['size']) if info.get('size') not in (None, '') else None
+    except (TypeError, ValueError):
+        size = None
+    return RequestFile(
+        original_name=(info.get('original_name') or info.get('name') or url.rsplit('/', 1)[-1] or 'file')[:255],
+        stored_path=_stored_path(info, url)[:500],
+        url=url[:1000],
+        size=size,
+        mime_type=(info.get('mime_type') or '')[:100],
+        sha256=(info.get('sha256') or '')[:64],
+        **fields
+    )
+
+
+def forwards(apps, schema_editor):
+    Request = apps.get_model('requests', 'Request')
+    Dispute = apps.get_model('transactions', 'Dispute')
+    RequestFile = apps.get_model('requests', 'RequestFile')
+    User = apps.get_model('users', 'CustomUser')
+
+    users_by_email = {}
+
+    def user_for(email):
+        if not email:
+            return None
+        if email not in users_by_email:
+            users_by_email[email] = User.objects.filter(email=email).values_list('id', flat=True).first()
+        return users_by_email[email]
+
+    pending = []
+
+    def flush():
+        RequestFile.objects.bulk_create(pending, batch_size=BATCH_SIZE)
+        pending.clear()
+
+    requests = Request.objects.exclude(attached_files='', deliverable_files='').only(
+        'id', 'client', 'professional', 'attached_files', 'deliverable_files'
+    )
+    for req in requests.iterator(chunk_size=BATCH_SIZE):
+        for info in _parse_files(req.attached_files):
+            pending.append(_build(RequestFile, info, request_id=req.id, kind='attachment',
+                                  owner_id=user_for(req.client)))
+        for info in _parse_files(req.deliverable_files):
+            pending.append(_build(RequestFile, info, request_id=req.id, kind='deliverable',
+                                  owner_id=user_for(req.professional)))
+        if len(pending) >= BATCH_SIZE:
+            flush()
+
+    disputes = Dispute.objects.exclude(client_files='', professional_files='').select_related('transaction')
+    for dispute in disputes.iterator(chunk_size=BATCH_SIZE):
+        transaction = dispute.transaction
+        for info in _parse_files(dispute.client_files):
+            pending.append(_build(RequestFile, info, request_id=transaction.request_id, dispute_id=dispute.id,
+                                  kind='client_evidence', owner_id=transaction.client_id))
+        for info in _parse_files(dispute.professional_files):
+            pending.append(_build(RequestFile, info, request_id=transaction.request_id, dispute_id=dispute.id,
+                                  kind='professional_evidence', owner_id=transaction.professional_id))
+        if len(pending) >= BATCH_SIZE:
+            flush()
+    flush()
+
+    unresolved = RequestFile.objects.filter(stored_path='')
+    if unresolved.exists():
+        logger.warning(
+            "%d request files have no storage path (ids: %s); they can't be deleted, zipped or "
+            "garbage-collected until one is set",
+            unresolved.count(), ', '.join(str(pk) for pk in unresolved.values_list('id', flat=True)[:50])
+        )
+
+
+def _dump(files):
+    return json.dumps([{
+        'original_name': file.original_name,
+        'stored_path': file.stored_path,
+        'public_url': file.url,
+        'size': file.size,
+        'mime_type': file.mime_type,
+        'sha256': file.sha256,
+    } for file in files]) if files else ''
+
+
+def backwards(apps, schema_editor):
+    Request = apps.get_model('requests', 'Request')
+    Dispute = apps.get_model('transactions', 'Dispute')
+    RequestFile = apps.get_model('requests', 'RequestFile')
+
+    grouped = {}
+    for file in RequestFile.objects.order_by('created_at', 'id').iterator(chunk_size=BATCH_SIZE):
+        key = ('dispute', file.dispute_id) if file.dispute_id else ('request', file.request_id)
+        grouped.setdefault(key, {}).setdefault(file.kind, []).append(file)
+
+    for (target, target_id), kinds in grouped.items():
+        if target == 'request':
+            Request.objects.filter(id=target_id).update(
+                attached_files=_dump(kinds.get('attachment')),
+                deliverable_files=_dump(kinds.get('deliverable')),
+            )
+        else:
+            Dispute.objects.filter(id=target_id).update(
+                client_files=_dump(kinds.get('client_evidence')),
+                professional_files=_dump(kinds.get('professional_evidence')),
+            )
+    RequestFile.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0008_requestfile'),
+        ('transactions', '0002_withdrawalrequest'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
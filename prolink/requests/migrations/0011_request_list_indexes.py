@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0010_remove_request_attached_files_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['client', '-created_at', '-id'], name='requests_re_client_c7bd27_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['professional', '-created_at', '-id'], name='requests_re_profess_a70adb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['professional', 'price', '-created_at'], name='requests_re_profess_22185d_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0011_request_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,122 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS requests_request_fts USING fts5(
+        search_document,
+        content='requests_request',
+        content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_request_fts_insert
+    AFTER INSERT ON requests_request BEGIN
+        INSERT INTO requests_request_fts(rowid, search_document) VALUES (new.id, new.search_document);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_request_fts_delete
+    AFTER DELETE ON requests_request BEGIN
+        INSERT INTO requests_request_fts(requests_request_fts, rowid, search_document)
+        VALUES ('delete', old.id, old.search_document);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_request_fts_update
+    AFTER UPDATE OF search_document ON requests_request BEGIN
+        INSERT INTO requests_request_fts(requests_request_fts, rowid, search_document)
+        VALUES ('delete', old.id, old.search_document);
+        INSERT INTO requests_request_fts(rowid, search_document) VALUES (new.id, new.search_document);
+    END
+    """,
+    # Index requests that existed before the table was created
+    "INSERT INTO requests_request_fts(requests_request_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS requests_request_fts_update',
+    'DROP TRIGGER IF EXISTS requests_request_fts_delete',
+    'DROP TRIGGER IF EXISTS requests_request_fts_insert',
+    'DROP TABLE IF EXISTS requests_request_fts',
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE INDEX IF NOT EXISTS requests_request_search_fts
+    ON requests_request USING GIN (to_tsvector('simple', search_document))
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    'DROP INDEX IF EXISTS requests_request_search_fts',
+]
+
+
+def fill_search_documents(apps, schema_editor):
+    """
+    Build search_document for existing requests (same content as
+    Request.build_search_document)
+    """
+    Request = apps.get_model('requests', 'Request')
+    User = apps.get_model('users', 'CustomUser')
+
+    names = {
+        email: f"{first_name} {last_name}"
+        for email, first_name, last_name in User.objects.values_list('email', 'first_name', 'last_name')
+    }
+    batch = []
+    for req in Request.objects.only('id', 'title', 'description', 'client', 'professional').iterator(chunk_size=500):
+        parts = [req.title, req.description]
+        for email in (req.client, req.professional):
+            if not email:
+                continue
+            if email in names:
+                parts.append(names[email])
+            parts.append(email)
+        req.search_document = '\n'.join(part.strip() for part in parts if part and part.strip())
+        batch.append(req)
+        if len(batch) >= 500:
+            Request.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    if batch:
+        Request.objects.bulk_update(batch, ['search_document'])
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the full-text index for request search.
+    PostgreSQL maintains the expression index itself; on SQLite the FTS5
+    table is kept current by triggers on requests_request.
+    """
+    statements = {
+        'postgresql': POSTGRESQL_FORWARD,
+        'sqlite': SQLITE_FORWARD,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    """
+    Reverse migration: drop the full-text index
+    """
+    statements = {
+        'postgresql': POSTGRESQL_REVERSE,
+        'sqlite': SQLITE_REVERSE,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0012_request_search_document'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:03
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_deadlines(apps, schema_editor):
+    """
+    Give requests already waiting on a deadline one, so the scheduler picks
+    them up: submitted work, accepted-but-unpaid requests and completed
+    requests whose review window is still open
+    """
+    Request = apps.get_model('requests', 'Request')
+    now = timezone.now()
+
+    for req in Request.objects.filter(status='under_review', auto_approve_date__isnull=True).iterator():
+        started = req.submitted_at or req.updated_at
+        req.auto_approve_date = started + timedelta(days=settings.AUTO_APPROVE_DAYS)
+        req.save(update_fields=['auto_approve_date'])
+
+    for req in Request.objects.filter(status='awaiting_payment').iterator():
+        req.payment_due_date = req.updated_at + timedelta(days=settings.PAYMENT_WINDOW_DAYS)
+        req.save(update_fields=['payment_due_date'])
+
+    window = timedelta(days=settings.REVIEW_WINDOW_DAYS)
+    for req in Request.objects.filter(status='completed', completed_at__gt=now - window).iterator():
+        req.review_deadline = req.completed_at + window
+        req.save(update_fields=['review_deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0013_request_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='payment_due_date',
+            field=models.DateTimeField(blank=True, help_text="Date when an accepted request is cancelled if the client hasn't paid", null=True),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='review_deadline',
+            field=models.DateTimeField(blank=True, help_text='End of the review window; cleared once it has closed', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['status', 'auto_approve_date'], name='requests_re_status_34cde0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['status', 'payment_due_date'], name='requests_re_status_c66dac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['review_deadline'], name='requests_re_review__76cd8f_idx'),
+        ),
+        migrations.RunPython(fill_deadlines, migrations.RunPython.noop),
+    ]
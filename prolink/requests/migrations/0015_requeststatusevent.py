@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0014_request_deadlines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('awaiting_payment', 'Awaiting Payment'), ('in_progress', 'In Progress'), ('under_review', 'Under Review'), ('revision_requested', 'Revision Requested'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('declined', 'Declined'), ('disputed', 'Disputed')], help_text="Empty for the request's first status", max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('awaiting_payment', 'Awaiting Payment'), ('in_progress', 'In Progress'), ('under_review', 'Under Review'), ('revision_requested', 'Revision Requested'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('declined', 'Declined'), ('disputed', 'Disputed')], max_length=20)),
+                ('at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('request', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='requests.request')),
+            ],
+            options={
+                'ordering': ['at', 'id'],
+                'indexes': [models.Index(fields=['status', 'at'], name='requests_re_status_4cb04a_idx'), models.Index(fields=['request', 'at'], name='requests_re_request_5d4dc5_idx')],
+            },
+        ),
+    ]
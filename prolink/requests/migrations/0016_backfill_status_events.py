@@ -0,0 +1,75 @@
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_status_events(apps, schema_editor):
+    """
+    Reconstruct a status history for requests that predate the event log
+    from the timestamps they do have: created_at (pending), the
+    transaction's created_at and paid_at (awaiting_payment, in_progress),
+    submitted_at (under_review), the dispute's created_at (disputed) and
+    completed_at (completed). A current status none of those explain is
+    placed at updated_at.
+    """
+    Request = apps.get_model('requests', 'Request')
+    RequestStatusEvent = apps.get_model('requests', 'RequestStatusEvent')
+    Transaction = apps.get_model('transactions', 'Transaction')
+    Dispute = apps.get_model('transactions', 'Dispute')
+
+    transactions = {
+        request_id: (created_at, paid_at)
+        for request_id, created_at, paid_at in Transaction.objects.values_list('request_id', 'created_at', 'paid_at')
+    }
+    disputes = dict(Dispute.objects.values_list('transaction__request_id', 'created_at'))
+
+    requests = Request.objects.exclude(
+        id__in=RequestStatusEvent.objects.values('request_id')
+    ).only('id', 'status', 'created_at', 'updated_at', 'submitted_at', 'completed_at')
+
+    batch = []
+    for req in requests.iterator(chunk_size=BATCH_SIZE):
+        steps = [('pending', req.created_at)]
+        if req.id in transactions:
+            created_at, paid_at = transactions[req.id]
+            steps.append(('awaiting_payment', created_at))
+            if paid_at:
+                steps.append(('in_progress', paid_at))
+        if req.submitted_at:
+            steps.append(('under_review', req.submitted_at))
+        if req.id in disputes:
+            steps.append(('disputed', disputes[req.id]))
+        if req.completed_at:
+            steps.append(('completed', req.completed_at))
+        if steps[-1][0] != req.status:
+            steps.append((req.status, req.updated_at))
+
+        previous_status = ''
+        previous_at = None
+        for status, at in steps:
+            if status == previous_status:
+                continue
+            # Keep the reconstructed history in order even if timestamps disagree
+            if previous_at is not None and at < previous_at:
+                at = previous_at
+            batch.append(RequestStatusEvent(request_id=req.id, from_status=previous_status, status=status, at=at))
+            previous_status, previous_at = status, at
+
+        if len(batch) >= BATCH_SIZE:
+            RequestStatusEvent.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        RequestStatusEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0015_requeststatusevent'),
+        ('transactions', '0003_remove_dispute_client_files_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_status_events, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,11 @@
-from django.db import models
+import re
+from datetime import timedelta
+from urllib.parse import unquote
+
+from django.db import models, transaction
+from django.conf import settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
 
 # Create your models here.
@@ -36,17 +43,121 @@ class Request(models.Model):
     auto_approve_date = models.DateTimeField(null=True, blank=True, 
                                             help_text="Date when work will be auto-approved if client doesn't respond")
     
-    # File attachments (stored as JSON string for simplicity)
-    attached_files = models.TextField(blank=True, help_text="Client's initial request files (JSON)")
-    deliverable_files = models.TextField(blank=True, help_text="Professional's deliverable files (JSON)")
+    # Other deadlines swept by the scheduler (requests/scheduler.py)
+    payment_due_date = models.DateTimeField(null=True, blank=True,
+                                            help_text="Date when an accepted request is cancelled if the client hasn't paid")
+    review_deadline = models.DateTimeField(null=True, blank=True,
+                                           help_text="End of the review window; cleared once it has closed")
+    
+    # Attachments and deliverables are RequestFile rows (related_name='files')
     deliverable_notes = models.TextField(blank=True, help_text="Professional's notes on deliverables")
     revision_notes = models.TextField(blank=True, help_text="Client's revision requests")
     
+    # Full-text search source (see requests/search.py), rebuilt on save
+    search_document = models.TextField(blank=True, editable=False)
+    
+    SEARCH_FIELDS = ('title', 'description', 'client', 'professional')
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the client and professional request lists
+            models.Index(fields=['client', '-created_at', '-id']),
+            models.Index(fields=['professional', '-created_at', '-id']),
+            models.Index(fields=['professional', 'price', '-created_at']),
+            # Due-item range scans of the scheduler
+            models.Index(fields=['status', 'auto_approve_date']),
+            models.Index(fields=['status', 'payment_due_date']),
+            models.Index(fields=['review_deadline']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.get_status_display()}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as stored, so save() can tell a transition happened
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        fields = kwargs.get('fields')
+        if fields is None or 'status' in fields:
+            self._saved_status = self.__dict__.get('status')
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(self.SEARCH_FIELDS):
+            self.search_document = self.build_search_document()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'search_document'}
+        
+        # Every status change is appended to the request's status history
+        previous_status = getattr(self, '_saved_status', None)
+        status_changed = (
+            'status' in self.__dict__
+            and (update_fields is None or 'status' in update_fields)
+            and (self._state.adding or self.status != previous_status)
+        )
+        if not status_changed:
+            super().save(*args, **kwargs)
+            return
+        
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            RequestStatusEvent.objects.create(
+                request=self,
+                from_status=previous_status or '',
+                status=self.status
+            )
+        self._saved_status = self.status
+    
+    def mark_completed(self, now=None):
+        """
+        Set the completion fields and open the review window. The caller saves.
+        """
+        now = now or timezone.now()
+        self.status = 'completed'
+        if not self.completed_at:
+            self.completed_at = now
+        self.auto_approve_date = None
+        self.review_deadline = self.completed_at + timedelta(days=settings.REVIEW_WINDOW_DAYS)
+    
+    def review_window_open(self, now=None):
+        return self.review_deadline is not None and self.review_deadline > (now or timezone.now())
+    
+    def build_search_document(self, users=None):
+        """
+        Text indexed for search: title, description and both participants'
+        names and emails. `users` maps email to user; looked up when omitted.
+        """
+        emails = [email for email in (self.client, self.professional) if email]
+        if users is None:
+            users = {user.email: user for user in get_user_model().objects.filter(email__in=emails)} if emails else {}
+        parts = [self.title, self.description]
+        for email in emails:
+            user = users.get(email)
+            if user is not None:
+                parts.append(f"{user.first_name} {user.last_name}")
+            parts.append(email)
+        return '\n'.join(part.strip() for part in parts if part and part.strip())
+    
+    def files_of_kind(self, kind):
+        """
+        This request's files of one kind, in upload order.
+        Uses prefetch_related('files') when the caller prefetched them.
+        """
+        return [file for file in self.files.all() if file.kind == kind]
+    
+    @property
+    def attachments(self):
+        return self.files_of_kind(RequestFile.KIND_ATTACHMENT)
+    
+    @property
+    def deliverables(self):
+        return self.files_of_kind(RequestFile.KIND_DELIVERABLE)
 
 class RequestMessage(models.Model):
     request = models.ForeignKey(Request, on_delete=models.CASCADE, related_name='messages')
@@ -59,4 +170,131 @@ class RequestMessage(models.Model):
         ordering = ['created_at']
     
     def __str__(self):
-        return f"Message for {self.request.title} - {self.sender_email}"
\ No newline at end of file
+        return f"Message for {self.request.title} - {self.sender_email}"
+
+
+class FileContent(models.Model):
+    """
+    Content-addressed index of uploaded files: one row per distinct SHA-256,
+    shared by every upload of the same bytes (see storage_utils.upload_file)
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    stored_path = models.CharField(max_length=500, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=1, help_text="Number of file records pointing at this content")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+# Supabase public object URLs: .../storage/v1/object/public/<bucket>/<path>
+PUBLIC_OBJECT_URL_RE = re.compile(r'/object/public/[^/?#]+/([^?#]+)')
+
+
+def stored_path_from_url(url):
+    """
+    Bucket path of a Supabase public object URL, or '' if the URL isn't one.
+    Files uploaded before paths were recorded only kept their URL.
+    """
+    match = PUBLIC_OBJECT_URL_RE.search(url or '')
+    return unquote(match.group(1)) if match else ''
+
+
+class RequestFile(models.Model):
+    """
+    A file stored for a request: client attachments, deliverables and
+    dispute evidence from either side
+    """
+    KIND_ATTACHMENT = 'attachment'
+    KIND_DELIVERABLE = 'deliverable'
+    KIND_CLIENT_EVIDENCE = 'client_evidence'
+    KIND_PROFESSIONAL_EVIDENCE = 'professional_evidence'
+    KIND_CHOICES = [
+        (KIND_ATTACHMENT, 'Request Attachment'),
+        (KIND_DELIVERABLE, 'Deliverable'),
+        (KIND_CLIENT_EVIDENCE, 'Client Dispute Evidence'),
+        (KIND_PROFESSIONAL_EVIDENCE, 'Professional Dispute Evidence'),
+    ]
+    
+    request = models.ForeignKey(Request, on_delete=models.CASCADE, related_name='files')
+    dispute = models.ForeignKey('transactions.Dispute', on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='files', help_text="Set for dispute evidence")
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='request_files', help_text="User who uploaded the file")
+    original_name = models.CharField(max_length=255)
+    stored_path = models.CharField(max_length=500, blank=True, help_text="Path in the storage bucket")
+    url = models.CharField(max_length=1000, blank=True)
+    size = models.BigIntegerField(null=True, blank=True, help_text="Size in bytes")
+    mime_type = models.CharField(max_length=100, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Content hash (empty for direct and legacy uploads)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['request', 'kind']),
+            models.Index(fields=['dispute', 'kind']),
+            models.Index(fields=['owner', 'kind']),
+        ]
+    
+    def __str__(self):
+        return f"{self.original_name} ({self.get_kind_display()})"
+    
+    # Aliases for the two key sets the old JSON blobs used in templates
+    @property
+    def name(self):
+        return self.original_name
+    
+    @property
+    def public_url(self):
+        return self.url
+    
+    @property
+    def storage_path(self):
+        """Path in the storage bucket, worked out from the URL for legacy rows"""
+        return self.stored_path or stored_path_from_url(self.url)
+    
+    @classmethod
+    def from_upload(cls, info, **fields):
+        """Unsaved RequestFile from a storage manager upload result"""
+        return cls(
+            original_name=info.get('original_name') or '',
+            stored_path=info.get('stored_path') or '',
+            url=info.get('public_url') or '',
+            size=info.get('size'),
+            mime_type=info.get('mime_type') or '',
+            sha256=info.get('sha256') or '',
+            **fields
+        )
+
+
+class RequestStatusEvent(models.Model):
+    """
+    Append-only history of request status transitions, one row per change
+    (written by Request.save). Lifecycle analytics aggregate over it instead
+    of inferring transitions from the request's timestamps.
+    """
+    # Covered by the (request, at) index
+    request = models.ForeignKey(Request, on_delete=models.CASCADE, related_name='status_events', db_index=False)
+    from_status = models.CharField(max_length=20, choices=Request.STATUS_CHOICES, blank=True,
+                                   help_text="Empty for the request's first status")
+    status = models.CharField(max_length=20, choices=Request.STATUS_CHOICES)
+    at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'at']),
+            models.Index(fields=['request', 'at']),
+        ]
+    
+    def __str__(self):
+        return f"Request {self.request_id}: {self.from_status or '-'} → {self.status} at {self.at:%Y-%m-%d %H:%M}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Request status events are append-only")
+        super().save(*args, **kwargs)
@@ -0,0 +1,115 @@
+"""
+Keyset pagination for the request list pages
+
+Pages are fetched with WHERE (sort key) < (last row's sort key) instead of
+OFFSET, so the database never scans the rows before the current page and
+page N costs the same as page 1. The position travels in an opaque cursor
+together with the filters it was produced under; a cursor that doesn't match
+the current filters is ignored and the list restarts from the top.
+
+Sorts:
+- latest: created_at DESC, id DESC
+- price_high / price_low: price DESC / ASC (requests without a price last),
+  then created_at DESC, id DESC
+- relevance: search_rank DESC, id DESC (needs requests.search.search_requests)
+"""
+import base64
+import decimal
+import json
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = 20
+SORTS = ('latest', 'price_high', 'price_low', 'relevance')
+
+
+def encode_cursor(filters, values):
+    """Encode filters and a keyset position as an opaque URL-safe token"""
+    raw = json.dumps([filters, values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, filters, sort):
+    """
+    Decode a cursor token, returning (key, created_at, id) or None if it is
+    invalid or was produced under different filters. key is the price for
+    the price sorts, the rank for relevance and None for latest.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_filters, (key, created_at, request_id) = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if cursor_filters != filters:
+            return None
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            return None
+        if sort == 'relevance':
+            key = float(key)
+        elif sort != 'latest':
+            key = decimal.Decimal(key) if key is not None else None
+        return key, created_at, int(request_id)
+    except (ValueError, TypeError, decimal.InvalidOperation):
+        return None
+
+
+def order_requests(queryset, sort):
+    """Apply one of SORTS with an id tiebreaker so the order is total"""
+    if sort == 'price_high':
+        return queryset.order_by(F('price').desc(nulls_last=True), '-created_at', '-id')
+    if sort == 'price_low':
+        return queryset.order_by(F('price').asc(nulls_last=True), '-created_at', '-id')
+    if sort == 'relevance':
+        return queryset.order_by('-search_rank', '-id')
+    return queryset.order_by('-created_at', '-id')
+
+
+def _after(sort, key, created_at, request_id):
+    """Rows strictly after the given position in the sort order"""
+    if sort == 'relevance':
+        return Q(search_rank__lt=key) | Q(search_rank=key, id__lt=request_id)
+    older = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=request_id)
+    if sort == 'latest':
+        return older
+    price = key
+    if price is None:
+        # Already in the priceless tail
+        return Q(price__isnull=True) & older
+    further = Q(price__lt=price) if sort == 'price_high' else Q(price__gt=price)
+    return further | (Q(price=price) & older) | Q(price__isnull=True)
+
+
+def paginate_requests(queryset, sort, filters, cursor=None, page_size=PAGE_SIZE):
+    """
+    One page of an (unordered, filtered) request queryset.
+    Returns (requests, next_cursor, is_first_page); next_cursor is None on
+    the last page.
+    """
+    if sort not in SORTS:
+        sort = 'latest'
+    filters = list(filters) + [sort]
+    queryset = order_requests(queryset, sort)
+    position = decode_cursor(cursor, filters, sort)
+    if position:
+        queryset = queryset.filter(_after(sort, *position))
+
+    page = list(queryset[:page_size + 1])
+    if len(page) <= page_size:
+        return page, None, position is None
+
+    page = page[:page_size]
+    last = page[-1]
+    if sort == 'relevance':
+        key = last.search_rank
+    elif sort == 'latest':
+        key = None
+    else:
+        key = str(last.price) if last.price is not None else None
+    next_cursor = encode_cursor(filters, [
+        key,
+        last.created_at.isoformat(),
+        last.id,
+    ])
+    return page, next_cursor, position is None
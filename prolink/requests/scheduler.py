@@ -0,0 +1,158 @@
+"""
+Time-based request transitions
+
+Each sweep is a range query on an indexed deadline column:
+- auto_approve: work still under review at auto_approve_date is approved and
+  the escrowed payment released to the professional
+- expire_payments: accepted requests still awaiting payment at
+  payment_due_date are cancelled and their pending transaction marked failed
+- close_review_windows: completed requests past review_deadline stop
+  accepting reviews
+
+Due rows are claimed in batches with select_for_update(skip_locked=True)
+inside a transaction, so several workers can sweep at once without handling
+a row twice. Every handler moves its row out of the due set, even when it
+skips it. All functions take `now`, so tests and backfills can freeze the
+clock.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from analytics.models import Notification
+from transactions.models import Transaction
+from users.models import CustomUser
+
+from .models import Request
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+
+def auto_approve_date_from(now=None):
+    """Deadline for the client to act on work submitted at `now`"""
+    return (now or timezone.now()) + timedelta(days=settings.AUTO_APPROVE_DAYS)
+
+
+def payment_due_date_from(now=None):
+    """Deadline for the client to pay a request accepted at `now`"""
+    return (now or timezone.now()) + timedelta(days=settings.PAYMENT_WINDOW_DAYS)
+
+
+def _notify(email, notification_type, title, message, req, url_name):
+    user = CustomUser.objects.filter(email__iexact=email).first() if email else None
+    if user is None:
+        return
+    Notification.create_notification(
+        user=user,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        request=req,
+        link_url=reverse(url_name, args=[req.id])
+    )
+
+
+def auto_approve(req, now):
+    """Approve submitted work the client never acted on and release escrow"""
+    transaction = Transaction.objects.select_for_update().filter(request=req).first()
+    if transaction is None or transaction.status != 'pending_approval':
+        # Nothing in escrow to release; stop tracking the deadline
+        req.auto_approve_date = None
+        req.save(update_fields=['auto_approve_date'])
+        return False
+
+    req.mark_completed(now)
+    req.save(update_fields=['status', 'completed_at', 'auto_approve_date', 'review_deadline', 'updated_at'])
+
+    transaction.status = 'completed'
+    transaction.released_at = now
+    transaction.save(update_fields=['status', 'released_at'])
+
+    _notify(
+        req.professional, 'work_approved', 'Work Auto-Approved! Payment Released',
+        f'Your work for "{req.title}" was approved automatically after {settings.AUTO_APPROVE_DAYS} days '
+        f'without a response. Payment of ₱{transaction.professional_payout:,.2f} has been released to you.',
+        req, 'professional_request_detail'
+    )
+    _notify(
+        req.client, 'work_approved', 'Work Auto-Approved',
+        f'The work submitted for "{req.title}" was approved automatically after {settings.AUTO_APPROVE_DAYS} days '
+        f'and the payment released to the professional.',
+        req, 'request_detail'
+    )
+    return True
+
+
+def expire_payment(req, now):
+    """Cancel an accepted request the client never paid for"""
+    req.status = 'cancelled'
+    req.payment_due_date = None
+    req.save(update_fields=['status', 'payment_due_date', 'updated_at'])
+    Transaction.objects.filter(request=req, status='pending_payment').update(status='failed')
+
+    message = f'"{req.title}" was cancelled because payment wasn\'t received within {settings.PAYMENT_WINDOW_DAYS} days.'
+    _notify(req.client, 'request_updated', 'Request Cancelled (Unpaid)', message, req, 'request_detail')
+    _notify(req.professional, 'request_updated', 'Request Cancelled (Unpaid)', message, req, 'professional_request_detail')
+    return True
+
+
+def close_review_window(req, now):
+    """Stop accepting reviews for a request"""
+    req.review_deadline = None
+    req.save(update_fields=['review_deadline'])
+    return True
+
+
+SWEEPS = (
+    ('auto_approve', auto_approve,
+     lambda now: Request.objects.filter(status='under_review', auto_approve_date__lte=now), 'auto_approve_date'),
+    ('expire_payments', expire_payment,
+     lambda now: Request.objects.filter(status='awaiting_payment', payment_due_date__lte=now), 'payment_due_date'),
+    ('close_review_windows', close_review_window,
+     lambda now: Request.objects.filter(review_deadline__lte=now), 'review_deadline'),
+)
+
+
+def sweep(queryset, handler, order_field, now, batch_size=BATCH_SIZE):
+    """
+    Run `handler(req, now)` on every row of a due queryset, one locked batch
+    per transaction and one savepoint per row. Rows another worker holds are
+    skipped; rows that raise are logged and not retried until the next run.
+    Returns counts of processed, skipped and failed rows.
+    """
+    counts = {'processed': 0, 'skipped': 0, 'failed': 0}
+    failed_ids = set()
+    while True:
+        with db_transaction.atomic():
+            batch = list(
+                queryset.exclude(id__in=failed_ids)
+                .select_for_update(skip_locked=True)
+                .order_by(order_field, 'id')[:batch_size]
+            )
+            for req in batch:
+                try:
+                    with db_transaction.atomic():
+                        done = handler(req, now)
+                except Exception:
+                    logger.exception("Scheduler: %s failed for request %s", handler.__name__, req.id)
+                    failed_ids.add(req.id)
+                    counts['failed'] += 1
+                    continue
+                counts['processed' if done else 'skipped'] += 1
+        if len(batch) < batch_size:
+            return counts
+
+
+def run_due(now=None, batch_size=BATCH_SIZE):
+    """Run every sweep once as of `now`. Returns {sweep name: counts}."""
+    now = now or timezone.now()
+    return {
+        name: sweep(due(now), handler, order_field, now, batch_size)
+        for name, handler, due, order_field in SWEEPS
+    }
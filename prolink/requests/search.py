@@ -0,0 +1,109 @@
+"""
+Full-text search over service requests
+
+Requests keep a denormalized search_document (title, description and both
+participants' names and emails) that is rebuilt on save, and the database
+indexes it:
+- PostgreSQL: GIN expression index on to_tsvector('simple', search_document)
+- SQLite: FTS5 table requests_request_fts kept in sync by triggers
+Other backends fall back to a plain icontains scan.
+
+search_requests() filters and annotates a queryset, so callers scope it to
+the user and apply status filters before or after as usual.
+"""
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from messaging.search import parse_terms
+
+from .models import Request
+
+
+FTS_TABLE = 'requests_request_fts'
+
+
+def _search_postgresql(queryset, terms):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    return queryset.alias(
+        search_match=RawSQL(
+            "to_tsvector('simple', requests_request.search_document) @@ to_tsquery('simple', %s)",
+            [tsquery],
+            output_field=BooleanField()
+        )
+    ).filter(search_match=True).annotate(
+        search_rank=RawSQL(
+            "ts_rank(to_tsvector('simple', requests_request.search_document), to_tsquery('simple', %s))::float8",
+            [tsquery],
+            output_field=FloatField()
+        )
+    )
+
+
+def _search_sqlite(queryset, terms):
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    match = ' '.join(f'"{term}"*' for term in terms)
+    return queryset.alias(
+        search_match=RawSQL(
+            f"requests_request.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+            [match],
+            output_field=BooleanField()
+        )
+    ).filter(search_match=True).annotate(
+        # bm25() is lower-is-better, negate it so both backends sort rank DESC
+        search_rank=RawSQL(
+            f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = requests_request.id",
+            [match],
+            output_field=FloatField()
+        )
+    )
+
+
+def _search_fallback(queryset, terms):
+    for term in terms:
+        queryset = queryset.filter(search_document__icontains=term)
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def search_requests(queryset, query):
+    """
+    Restrict a Request queryset to matches for a raw search string and
+    annotate each with `search_rank` (higher is better). Terms match as word
+    prefixes and all must match. A query without any terms matches everything
+    with rank 0.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(queryset, terms)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(queryset, terms)
+    return _search_fallback(queryset, terms)
+
+
+def refresh_search_documents(email):
+    """
+    Rebuild search_document for every request a user takes part in,
+    e.g. after they change their name
+    """
+    requests = list(Request.objects.filter(Q(client=email) | Q(professional=email)).only(
+        'id', 'title', 'description', 'client', 'professional', 'search_document'
+    ))
+    if not requests:
+        return 0
+
+    from users.models import CustomUser
+    emails = {req.client for req in requests} | {req.professional for req in requests}
+    users = {user.email: user for user in CustomUser.objects.filter(email__in=emails - {''})}
+
+    changed = []
+    for req in requests:
+        document = req.build_search_document(users)
+        if document != req.search_document:
+            req.search_document = document
+            changed.append(req)
+    Request.objects.bulk_update(changed, ['search_document'], batch_size=500)
+    return len(changed)
@@ -0,0 +1,21 @@
+"""
+Signal handlers keeping request search documents current
+"""
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .search import refresh_search_documents
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_participant_names(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Re-index a user's requests when their name may have changed
+    (skips saves that only touch other fields, like last_login)
+    """
+    if created or not instance.email:
+        return
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    refresh_search_documents(instance.email)
@@ -1,37 +1,525 @@
 """
-Supabase Storage utilities for file uploads
+File storage utilities for request attachments, deliverables and evidence
+
+The backend is selected with the FILE_STORAGE_BACKEND setting:
+- SupabaseStorageManager: Supabase Storage bucket (default)
+- LocalStorageManager: local filesystem, served by requests.views.serve_stored_file
 """
+import hashlib
+import httpx
+import io
 import os
+import re
 import uuid
 import mimetypes
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import quote
 from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
 from supabase import create_client, Client
 from typing import List, Dict, Optional
 
+from .models import FileContent
+
+DEFAULT_STORAGE_BACKEND = 'requests.storage_utils.SupabaseStorageManager'
+
 
-class SupabaseStorageManager:
+def hash_upload(file) -> str:
     """
-    Manager class for handling file uploads to Supabase Storage
+    SHA-256 of a Django uploaded file, read chunk by chunk from its buffer or
+    temp file so large uploads are never held in memory
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+@contextmanager
+def open_upload_stream(file):
+    """
+    Open a Django uploaded file as a stream the storage client can send in
+    chunks, instead of reading the whole payload into memory.
+    
+    - TemporaryUploadedFile (larger than FILE_UPLOAD_MAX_MEMORY_SIZE) is
+      reopened from its temp path on disk
+    - InMemoryUploadedFile is wrapped without copying its buffer
+    """
+    if hasattr(file, 'temporary_file_path'):
+        stream = open(file.temporary_file_path(), 'rb')
+        try:
+            yield stream
+        finally:
+            stream.close()
+    elif isinstance(getattr(file, 'file', None), io.BytesIO):
+        file.seek(0)
+        # BufferedReader is what the storage client streams from; wrapping
+        # the existing in-memory buffer avoids a second copy of the bytes
+        stream = io.BufferedReader(file.file)
+        try:
+            yield stream
+        finally:
+            # Detach so closing the wrapper doesn't close Django's buffer
+            stream.detach()
+    else:
+        file.seek(0)
+        yield file.read()
+
+
+class _UploadBatch:
+    """
+    Shared by the workers of one upload_multiple_files call. A thread can't
+    be interrupted, so once the deadline passes the batch is cancelled:
+    uploads that haven't started are skipped and uploads that finish late
+    release what they stored instead of leaving an unreferenced object
+    (and FileContent reference) behind.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cancelled = False
+        self.finished = {}
+    
+    def cancel(self) -> Dict:
+        """Cancel the batch, returning the uploads that finished in time by index"""
+        with self.lock:
+            self.cancelled = True
+            return dict(self.finished)
+
+
+class BaseStorageManager:
+    """
+    Interface and shared logic for file storage backends
+    
+    Subclasses implement ensure_bucket_exists, store_file, create_signed_upload,
+    confirm_signed_upload, delete_file, get_file_url, iter_file and list_files;
+    validation, batching, deduplication and upload tickets are common to all
+    backends.
     """
     
     BUCKET_NAME = "request-files"
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    MAX_FILES = 5
+    MAX_UPLOAD_WORKERS = 5  # Parallel uploads per call
+    UPLOAD_DEADLINE = 60  # Seconds allowed for a whole upload_multiple_files call
+    SIGNED_UPLOAD_MAX_AGE = 15 * 60  # Seconds a direct-upload ticket stays valid
+    SIGNED_UPLOAD_SALT = 'requests.storage_utils.signed_upload'
+    CONTENT_FOLDER = "objects"  # Content-addressed uploads (see upload_file)
+    CONTENT_RELEASE_WAIT = 0.2  # Seconds between checks while the same content is being deleted
+    CONTENT_RELEASE_RETRIES = 25
+    CONTENT_RELEASE_STALE = 5 * 60  # Seconds after which an unfinished deletion is taken over
     ALLOWED_EXTENSIONS = {
         '.pdf', '.doc', '.docx', 
         '.png', '.jpg', '.jpeg', 
         '.zip', '.txt', '.csv'
     }
     
+    def validate_file(self, file) -> tuple[bool, Optional[str]]:
+        """
+        Validate file size and type
+        Returns: (is_valid, error_message)
+        """
+        return self.validate_file_info(file.name, file.size)
+    
+    def validate_file_info(self, name: str, size: int) -> tuple[bool, Optional[str]]:
+        """
+        Validate a file by name and size (no file object needed)
+        Returns: (is_valid, error_message)
+        """
+        # Check file size
+        if size > self.MAX_FILE_SIZE:
+            return False, f"File {name} is too large. Maximum size is 10MB."
+        
+        # Check file extension
+        file_ext = os.path.splitext(name)[1].lower()
+        if file_ext not in self.ALLOWED_EXTENSIONS:
+            allowed = ', '.join(self.ALLOWED_EXTENSIONS)
+            return False, f"File {name} has unsupported format. Allowed: {allowed}"
+        
+        return True, None
+    
+    def new_file_path(self, name: str, folder: str) -> str:
+        """Unique object path for an uploaded file, keeping its extension"""
+        return f"{folder}/{uuid.uuid4()}{os.path.splitext(name)[1]}"
+    
+    @staticmethod
+    def guess_mime_type(name: str) -> str:
+        mime_type, _ = mimetypes.guess_type(name)
+        return mime_type or 'application/octet-stream'
+    
+    def sign_upload_ticket(self, name: str, file_path: str, folder: str, mime_type: str) -> str:
+        """
+        Sign a direct-upload ticket. The token binds the issued path to its
+        folder so a client can only confirm objects we signed for this destination
+        """
+        return signing.dumps({
+            'name': name,
+            'path': file_path,
+            'folder': folder,
+            'mime_type': mime_type,
+        }, salt=self.SIGNED_UPLOAD_SALT)
+    
+    def load_upload_ticket(self, upload_token: str, folder: str) -> Dict:
+        """Verify a direct-upload ticket for the given folder and return it"""
+        try:
+            ticket = signing.loads(upload_token, salt=self.SIGNED_UPLOAD_SALT, max_age=self.SIGNED_UPLOAD_MAX_AGE)
+        except signing.BadSignature:
+            raise ValueError("Upload link is invalid or has expired. Please upload the file again.")
+        
+        if ticket['folder'] != folder:
+            raise ValueError(f"File {ticket['name']} was not uploaded for this form.")
+        return ticket
+    
+    def ensure_bucket_exists(self, force: bool = False) -> bool:
+        raise NotImplementedError
+    
+    def store_file(self, file, file_path: str, mime_type: str):
+        """Write an uploaded file's content to file_path in the bucket"""
+        raise NotImplementedError
+    
+    def is_existing_file_error(self, error: Exception) -> bool:
+        """Whether store_file failed only because file_path already exists"""
+        return False
+    
+    def content_file_path(self, content_hash: str, name: str) -> str:
+        """Content-addressed object path shared by every upload of the same bytes"""
+        extension = os.path.splitext(name)[1].lower()
+        return f"{self.CONTENT_FOLDER}/{content_hash[:2]}/{content_hash}{extension}"
+    
+    def upload_file(self, file, folder: str = "uploads") -> Dict:
+        """
+        Upload a single file, storing each distinct content only once
+        
+        The file is hashed first; if the FileContent index already has the
+        hash the existing object gains a reference and nothing is sent to
+        storage. New content goes to a content-addressed path, so `folder`
+        only scopes direct uploads and is kept for API compatibility.
+        If the same content is being deleted (see release_file) the upload
+        waits for the deletion to finish and stores it again.
+        
+        Args:
+            file: Django uploaded file object
+            folder: Folder path within the bucket
+            
+        Returns:
+            Dictionary with file information
+        """
+        self.ensure_bucket_exists()
+        
+        is_valid, error = self.validate_file(file)
+        if not is_valid:
+            raise ValueError(error)
+        
+        mime_type = self.guess_mime_type(file.name)
+        
+        try:
+            content_hash = hash_upload(file)
+            for attempt in range(self.CONTENT_RELEASE_RETRIES):
+                file_path = self.reference_content(content_hash)
+                if file_path is not None:
+                    break
+                file_path = self.content_file_path(content_hash, file.name)
+                try:
+                    file.seek(0)
+                    self.store_file(file, file_path, mime_type)
+                except Exception as e:
+                    # A concurrent upload of the same bytes got there first,
+                    # or a deletion hasn't removed the object yet; in the
+                    # latter case registering fails below and we store again
+                    if not self.is_existing_file_error(e):
+                        raise
+                file_path = self.register_content(content_hash, file_path, file.size)
+                if file_path is not None:
+                    break
+                time.sleep(self.CONTENT_RELEASE_WAIT)
+            else:
+                raise Exception("the same file is being deleted, please try again")
+        except Exception as e:
+            raise Exception(f"Error uploading file {file.name}: {str(e)}")
+        
+        return {
+            'original_name': file.name,
+            'stored_path': file_path,
+            'public_url': self.get_file_url(file_path),
+            'size': file.size,
+            'mime_type': mime_type,
+            'sha256': content_hash,
+            'uploaded': True
+        }
+    
+    # Reference counts are only changed with single conditional UPDATE/DELETE
+    # statements, which are atomic on every backend without row locks (and
+    # don't deadlock SQLite when uploads run on worker threads)
+    
+    # A row with ref_count 0 is content being deleted: it takes no new
+    # references and keeps its sha256/path reserved until the object is gone
+    
+    def reference_content(self, content_hash: str) -> Optional[str]:
+        """Add a reference to already stored content, returning its path (None if new or being deleted)"""
+        contents = FileContent.objects.filter(sha256=content_hash, ref_count__gt=0)
+        if not contents.update(ref_count=F('ref_count') + 1, updated_at=timezone.now()):
+            return None
+        # None if the last reference was released in between: store it again
+        return contents.values_list('stored_path', flat=True).first()
+    
+    def register_content(self, content_hash: str, file_path: str, size: int) -> Optional[str]:
+        """
+        Index newly stored content with one reference, returning its path.
+        None if the same content is still being deleted; the caller must wait
+        and store it again, since the object may be about to go.
+        """
+        try:
+            with transaction.atomic():
+                FileContent.objects.create(sha256=content_hash, stored_path=file_path, size=size)
+            return file_path
+        except IntegrityError:
+            # Registered concurrently by another upload of the same bytes
+            referenced = self.reference_content(content_hash)
+            if referenced is None:
+                # A deletion that never finished (e.g. the process died) is taken over
+                stale = timezone.now() - timedelta(seconds=self.CONTENT_RELEASE_STALE)
+                FileContent.objects.filter(sha256=content_hash, ref_count=0, updated_at__lt=stale).delete()
+            return referenced
+    
+    def release_file(self, file_path: str) -> bool:
+        """
+        Drop one reference to a stored file, deleting the object when the last
+        reference goes. Files outside the index (direct uploads, files stored
+        before deduplication) are deleted straight away.
+        
+        The last reference marks the row as being deleted (ref_count 0)
+        before the object goes and removes the row only afterwards, so a
+        concurrent upload of the same bytes can't register a reference to
+        an object that is about to be deleted.
+        """
+        contents = FileContent.objects.filter(stored_path=file_path)
+        while True:
+            if contents.filter(ref_count__gt=1).update(ref_count=F('ref_count') - 1, updated_at=timezone.now()):
+                return True
+            if contents.filter(ref_count=1).update(ref_count=0, updated_at=timezone.now()):
+                break
+            if not contents.exists():
+                # Not in the index
+                break
+            if contents.filter(ref_count=0).exists():
+                # Already being deleted
+                return True
+            # A new reference arrived between the statements: retry
+        deleted = self.delete_file(file_path)
+        contents.filter(ref_count=0).delete()
+        return deleted
+    
+    def release_files(self, file_paths: List[str]) -> int:
+        """
+        Release several stored files
+        
+        Returns:
+            Number of successfully released files
+        """
+        return sum(1 for file_path in file_paths if self.release_file(file_path))
+    
+    def create_signed_upload(self, name: str, size: int, folder: str = "uploads") -> Dict:
+        raise NotImplementedError
+    
+    def confirm_signed_upload(self, upload_token: str, folder: str) -> Dict:
+        raise NotImplementedError
+    
+    def delete_file(self, file_path: str) -> bool:
+        raise NotImplementedError
+    
+    def get_file_url(self, file_path: str) -> Optional[str]:
+        raise NotImplementedError
+    
+    def iter_file(self, file_path: str, chunk_size: int = 64 * 1024):
+        """
+        Stream a stored file's content in chunks without loading it whole.
+        Raises when the file can't be read.
+        """
+        raise NotImplementedError
+    
+    def list_files(self, page_size: int = 1000):
+        """
+        Iterate over every object in the bucket, one page at a time
+        
+        Yields:
+            Lists of at most page_size dicts with 'path', 'size' and
+            'modified_at' (aware datetime, None if the backend doesn't say)
+        """
+        raise NotImplementedError
+    
+    def confirm_signed_uploads(self, upload_tokens, folder: str, max_files: Optional[int] = MAX_FILES) -> tuple[List[Dict], List[str]]:
+        """
+        Confirm several direct uploads
+        
+        Returns:
+            Tuple of (uploaded_files_list, errors_list), both in input order
+        """
+        uploaded_files = []
+        errors = []
+        
+        if max_files is not None and len(upload_tokens) > max_files:
+            errors.append(f"Maximum {max_files} files allowed.")
+            return uploaded_files, errors
+        
+        for upload_token in upload_tokens:
+            try:
+                uploaded_files.append(self.confirm_signed_upload(upload_token, folder))
+            except Exception as e:
+                errors.append(str(e))
+        
+        return uploaded_files, errors
+    
+    def upload_multiple_files(self, files, folder: str = "uploads", max_files: Optional[int] = MAX_FILES,
+                              deadline: Optional[float] = None) -> tuple[List[Dict], List[str]]:
+        """
+        Upload multiple files in parallel
+        
+        Files are sent concurrently on a bounded thread pool, so total latency
+        is roughly that of the slowest file rather than the sum of all of them.
+        
+        Args:
+            files: List of Django uploaded file objects
+            folder: Folder path within the bucket
+            max_files: Maximum number of files accepted (None for no limit)
+            deadline: Seconds allowed for all uploads (defaults to UPLOAD_DEADLINE)
+            
+        Returns:
+            Tuple of (uploaded_files_list, errors_list), both in input order
+        """
+        uploaded_files = []
+        errors = []
+        
+        # Validate file count
+        if max_files is not None and len(files) > max_files:
+            errors.append(f"Maximum {max_files} files allowed.")
+            return uploaded_files, errors
+        
+        if not files:
+            return uploaded_files, errors
+        
+        if deadline is None:
+            deadline = self.UPLOAD_DEADLINE
+        
+        batch = _UploadBatch()
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.MAX_UPLOAD_WORKERS, len(files)),
+            thread_name_prefix='storage-upload'
+        )
+        try:
+            futures = [
+                executor.submit(self._upload_file_in_worker, file, folder, batch, index)
+                for index, file in enumerate(files)
+            ]
+            wait(futures, timeout=deadline)
+            finished = batch.cancel()
+            
+            # Collect in input order regardless of completion order
+            for index, (file, future) in enumerate(zip(files, futures)):
+                if index in finished:
+                    uploaded_files.append(finished[index])
+                elif future.done() and future.exception() is not None:
+                    errors.append(str(future.exception()))
+                else:
+                    errors.append(f"Upload of {file.name} timed out after {deadline} seconds.")
+        finally:
+            # Don't block the request on uploads that overran the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return uploaded_files, errors
+    
+    def _upload_file_in_worker(self, file, folder: str, batch: _UploadBatch, index: int) -> Optional[Dict]:
+        try:
+            if batch.cancelled:
+                return None
+            info = self.upload_file(file, folder)
+            with batch.lock:
+                if not batch.cancelled:
+                    batch.finished[index] = info
+                    return info
+            # Finished after the deadline: the caller already reported a timeout
+            self.release_file(info['stored_path'])
+            return None
+        finally:
+            # Worker threads open their own DB connections for the content index
+            connections.close_all()
+    
+    def delete_multiple_files(self, file_paths: List[str]) -> int:
+        """
+        Delete multiple files
+        
+        Returns:
+            Number of successfully deleted files
+        """
+        return sum(1 for file_path in file_paths if self.delete_file(file_path))
+
+
+class SupabaseStorageManager(BaseStorageManager):
+    """
+    Manager class for handling file uploads to Supabase Storage
+    """
+    
+    BUCKET_CHECK_TTL = 3600  # Seconds before bucket existence is re-verified
+    SIGNED_DOWNLOAD_TTL = 60  # Seconds a server-side download URL stays valid
+    
     def __init__(self):
         self.client: Client = create_client(
             settings.SUPABASE_URL, 
             settings.SUPABASE_SERVICE_ROLE_KEY  # Use service role for admin operations
         )
         self.storage = self.client.storage
+        # Monotonic time of the last successful bucket check (None = unverified)
+        self._bucket_verified_at = None
+        self._bucket_lock = threading.Lock()
     
-    def ensure_bucket_exists(self) -> bool:
+    def ensure_bucket_exists(self, force: bool = False) -> bool:
         """
         Ensure the bucket exists, create if it doesn't
+        
+        The result is cached for BUCKET_CHECK_TTL seconds so uploads don't pay
+        for a list_buckets round trip each time. Pass force=True to re-verify,
+        e.g. after an upload failed because the bucket is missing.
+        """
+        if not force and self._bucket_is_verified():
+            return True
+        
+        with self._bucket_lock:
+            # Another thread may have verified while we waited for the lock
+            if not force and self._bucket_is_verified():
+                return True
+            verified = self._verify_bucket()
+            self._bucket_verified_at = time.monotonic() if verified else None
+            return verified
+    
+    def invalidate_bucket_cache(self):
+        """Forget the cached bucket check so the next upload re-verifies"""
+        self._bucket_verified_at = None
+    
+    def _bucket_is_verified(self) -> bool:
+        verified_at = self._bucket_verified_at
+        return verified_at is not None and time.monotonic() - verified_at < self.BUCKET_CHECK_TTL
+    
+    @staticmethod
+    def _is_missing_bucket_error(error: Exception) -> bool:
+        message = str(error).lower()
+        return 'bucket not found' in message or 'bucket does not exist' in message
+    
+    def _verify_bucket(self) -> bool:
+        """
+        Check for the bucket with list_buckets and create it if missing
         """
         try:
             # Try to get bucket - list_buckets returns a list directly in newer versions
@@ -65,110 +553,120 @@ class SupabaseStorageManager:
             print(f"Error ensuring bucket exists: {str(e)}")
             return False
     
-    def validate_file(self, file) -> tuple[bool, Optional[str]]:
-        """
-        Validate file size and type
-        Returns: (is_valid, error_message)
-        """
-        # Check file size
-        if file.size > self.MAX_FILE_SIZE:
-            return False, f"File {file.name} is too large. Maximum size is 10MB."
-        
-        # Check file extension
-        file_ext = os.path.splitext(file.name)[1].lower()
-        if file_ext not in self.ALLOWED_EXTENSIONS:
-            allowed = ', '.join(self.ALLOWED_EXTENSIONS)
-            return False, f"File {file.name} has unsupported format. Allowed: {allowed}"
-        
-        return True, None
-    
-    def upload_file(self, file, folder: str = "uploads") -> Dict:
+    def create_signed_upload(self, name: str, size: int, folder: str = "uploads") -> Dict:
         """
-        Upload a single file to Supabase Storage
+        Issue a short-lived signed URL so the browser can upload a file
+        directly to storage without passing through a Django worker
         
         Args:
-            file: Django uploaded file object
+            name: Original filename
+            size: File size in bytes as reported by the browser
             folder: Folder path within the bucket
             
         Returns:
-            Dictionary with file information
+            Dictionary with the signed URL, the content type to send and an
+            upload_token to hand back to confirm_signed_upload
         """
-        # Ensure bucket exists
         self.ensure_bucket_exists()
         
-        # Validate file
-        is_valid, error = self.validate_file(file)
+        is_valid, error = self.validate_file_info(name, size)
         if not is_valid:
             raise ValueError(error)
         
-        # Generate unique filename
-        file_extension = os.path.splitext(file.name)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = f"{folder}/{unique_filename}"
-        
-        # Get MIME type
-        mime_type, _ = mimetypes.guess_type(file.name)
-        if not mime_type:
-            mime_type = 'application/octet-stream'
-        
-        # Read file content
-        file_content = file.read()
-        
-        # Upload to Supabase
-        try:
-            response = self.storage.from_(self.BUCKET_NAME).upload(
-                file_path,
-                file_content,
-                file_options={
-                    "content-type": mime_type,
-                    "cache-control": "3600",
-                    "upsert": "false"
-                }
-            )
-            
-            # Get public URL
-            public_url = self.storage.from_(self.BUCKET_NAME).get_public_url(file_path)
-            
-            return {
-                'original_name': file.name,
-                'stored_path': file_path,
-                'public_url': public_url,
-                'size': file.size,
-                'mime_type': mime_type,
-                'uploaded': True
-            }
-            
+        file_path = self.new_file_path(name, folder)
+        mime_type = self.guess_mime_type(name)
+        
+        try:
+            signed = self.storage.from_(self.BUCKET_NAME).create_signed_upload_url(file_path)
         except Exception as e:
-            raise Exception(f"Error uploading file {file.name}: {str(e)}")
+            raise Exception(f"Error preparing upload for {name}: {str(e)}")
+        
+        return {
+            'signed_url': signed['signed_url'],
+            'stored_path': file_path,
+            'mime_type': mime_type,
+            'upload_token': self.sign_upload_ticket(name, file_path, folder, mime_type),
+        }
     
-    def upload_multiple_files(self, files, folder: str = "uploads") -> tuple[List[Dict], List[str]]:
+    def confirm_signed_upload(self, upload_token: str, folder: str) -> Dict:
         """
-        Upload multiple files to Supabase Storage
+        Verify a direct upload finished and return its file information
         
         Args:
-            files: List of Django uploaded file objects
-            folder: Folder path within the bucket
+            upload_token: Token returned by create_signed_upload
+            folder: Folder the caller expects the upload in
             
         Returns:
-            Tuple of (uploaded_files_list, errors_list)
+            Dictionary with file information (same shape as upload_file)
         """
-        uploaded_files = []
-        errors = []
+        ticket = self.load_upload_ticket(upload_token, folder)
+        name = ticket['name']
+        file_path = ticket['path']
         
-        # Validate file count
-        if len(files) > 5:
-            errors.append("Maximum 5 files allowed.")
-            return uploaded_files, errors
+        # Look the object up to make sure it exists and get its real size
+        object_name = file_path.rsplit('/', 1)[-1]
+        try:
+            listing = self.storage.from_(self.BUCKET_NAME).list(folder, {'search': object_name})
+        except Exception as e:
+            raise Exception(f"Error confirming upload of {name}: {str(e)}")
         
-        # Upload each file
-        for file in files:
-            try:
-                file_info = self.upload_file(file, folder)
-                uploaded_files.append(file_info)
-            except Exception as e:
-                errors.append(str(e))
+        stored = next((item for item in listing or [] if item.get('name') == object_name), None)
+        if stored is None:
+            raise ValueError(f"File {name} was not uploaded. Please try again.")
         
-        return uploaded_files, errors
+        size = (stored.get('metadata') or {}).get('size') or 0
+        if size > self.MAX_FILE_SIZE:
+            self.delete_file(file_path)
+            raise ValueError(f"File {name} is too large. Maximum size is 10MB.")
+        
+        return {
+            'original_name': name,
+            'stored_path': file_path,
+            'public_url': self.storage.from_(self.BUCKET_NAME).get_public_url(file_path),
+            'size': size,
+            'mime_type': ticket['mime_type'],
+            'uploaded': True
+        }
+    
+    @staticmethod
+    def is_existing_file_error(error: Exception) -> bool:
+        message = str(error).lower()
+        return 'duplicate' in message or 'already exists' in message
+    
+    def store_file(self, file, file_path: str, mime_type: str):
+        """
+        Upload a file's content to Supabase Storage
+        
+        Args:
+            file: Django uploaded file object
+            file_path: Object path within the bucket
+            mime_type: Content type to store the object with
+        """
+        file_options = {
+            "content-type": mime_type,
+            "cache-control": "3600",
+            "upsert": "false"
+        }
+        
+        def upload():
+            # Stream from the upload's buffer or temp file; a fresh stream
+            # per attempt, since the first one may have been partly consumed
+            with open_upload_stream(file) as stream:
+                self.storage.from_(self.BUCKET_NAME).upload(
+                    file_path,
+                    stream,
+                    file_options=dict(file_options)
+                )
+        
+        try:
+            upload()
+        except Exception as e:
+            if not self._is_missing_bucket_error(e):
+                raise
+            # Cached check is stale (bucket deleted): re-verify and retry once
+            self.invalidate_bucket_cache()
+            self.ensure_bucket_exists(force=True)
+            upload()
     
     def delete_file(self, file_path: str) -> bool:
         """
@@ -219,16 +717,352 @@ class SupabaseStorageManager:
         except Exception as e:
             print(f"Error getting file URL: {str(e)}")
             return None
+    
+    def iter_file(self, file_path: str, chunk_size: int = 64 * 1024):
+        """Stream an object over a short-lived signed URL (download() buffers it whole)"""
+        signed = self.storage.from_(self.BUCKET_NAME).create_signed_url(file_path, self.SIGNED_DOWNLOAD_TTL)
+        url = signed.get('signedURL') or signed.get('signedUrl')
+        with httpx.stream('GET', url, timeout=30, follow_redirects=True) as response:
+            response.raise_for_status()
+            yield from response.iter_bytes(chunk_size)
+    
+    def list_files(self, page_size: int = 1000):
+        """
+        Walk the bucket folder by folder with paged list() calls.
+        Supabase returns folders as entries without an id.
+        """
+        bucket = self.storage.from_(self.BUCKET_NAME)
+        folders = ['']
+        page = []
+        while folders:
+            folder = folders.pop()
+            offset = 0
+            while True:
+                items = bucket.list(folder, {
+                    'limit': page_size,
+                    'offset': offset,
+                    'sortBy': {'column': 'name', 'order': 'asc'}
+                }) or []
+                for item in items:
+                    path = f"{folder}/{item['name']}" if folder else item['name']
+                    if item.get('id') is None:
+                        folders.append(path)
+                        continue
+                    page.append({
+                        'path': path,
+                        'size': (item.get('metadata') or {}).get('size') or 0,
+                        'modified_at': parse_datetime(item.get('updated_at') or item.get('created_at') or '')
+                    })
+                    if len(page) >= page_size:
+                        yield page
+                        page = []
+                if len(items) < page_size:
+                    break
+                offset += page_size
+        if page:
+            yield page
+
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range_header(header: Optional[str], size: int):
+    """
+    Parse a single-range Range header against a file size
+    
+    Returns (start, end) inclusive, None to serve the whole file (no header,
+    multiple ranges or an unrecognised unit), or raises ValueError when the
+    range can't be satisfied.
+    """
+    match = _RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def _read_range(path: str, start: int, length: int, chunk_size: int):
+    with open(path, 'rb') as stream:
+        stream.seek(start)
+        while length > 0:
+            chunk = stream.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request, path: str, content_type: str, chunk_size: int = 64 * 1024):
+    """
+    FileResponse for a file on disk, answering single Range requests with 206
+    so media players and resumable downloads don't refetch the whole file
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    
+    try:
+        byte_range = parse_range_header(request.headers.get('Range'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(path, start, end - start + 1, chunk_size),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+class LocalStorageManager(BaseStorageManager):
+    """
+    Storage backend that keeps files on the local filesystem
+    
+    Files live under LOCAL_STORAGE_ROOT/<bucket>/ and are served by
+    requests.views.serve_stored_file, either directly with range support or
+    by handing the file to the front-end server (LOCAL_STORAGE_SERVE).
+    Writes go to a temp file in the destination folder and are renamed into
+    place, so readers never see a partially written file.
+    """
+    
+    CHUNK_SIZE = 64 * 1024
+    LOCAL_UPLOAD_SALT = 'requests.storage_utils.local_upload'
+    SERVE_MODES = ('django', 'x-accel-redirect', 'x-sendfile')
+    
+    def __init__(self):
+        self.root = os.path.realpath(os.path.join(settings.LOCAL_STORAGE_ROOT, self.BUCKET_NAME))
+        self.serve_mode = getattr(settings, 'LOCAL_STORAGE_SERVE', 'django')
+        if self.serve_mode not in self.SERVE_MODES:
+            raise ValueError(f"LOCAL_STORAGE_SERVE must be one of: {', '.join(self.SERVE_MODES)}")
+    
+    def ensure_bucket_exists(self, force: bool = False) -> bool:
+        os.makedirs(self.root, exist_ok=True)
+        return True
+    
+    def path(self, file_path: str) -> str:
+        """Absolute path for a stored file, refusing paths outside the bucket"""
+        full_path = os.path.realpath(os.path.join(self.root, file_path))
+        if os.path.commonpath([self.root, full_path]) != self.root or full_path == self.root:
+            raise ValueError(f"Invalid file path: {file_path}")
+        return full_path
+    
+    def _write_atomic(self, file_path: str, chunks) -> int:
+        """
+        Write chunks to file_path via a temp file and rename, returning the size.
+        Existing files are never overwritten (same as upsert=false on Supabase).
+        """
+        destination = self.path(file_path)
+        directory = os.path.dirname(destination)
+        os.makedirs(directory, exist_ok=True)
+        
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            size = 0
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.MAX_FILE_SIZE:
+                        raise ValueError("File is too large. Maximum size is 10MB.")
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            os.chmod(temp_path, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+            # link() fails if the destination exists, unlike rename()
+            os.link(temp_path, destination)
+        finally:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+        return size
+    
+    def is_existing_file_error(self, error: Exception) -> bool:
+        return isinstance(error, FileExistsError)
+    
+    def store_file(self, file, file_path: str, mime_type: str):
+        """Write an uploaded file's content to local storage"""
+        file.seek(0)
+        self._write_atomic(file_path, file.chunks(self.CHUNK_SIZE))
+    
+    def create_signed_upload(self, name: str, size: int, folder: str = "uploads") -> Dict:
+        """
+        Issue a signed URL for a direct upload to requests.views.receive_direct_upload
+        (same contract as SupabaseStorageManager.create_signed_upload)
+        """
+        self.ensure_bucket_exists()
+        
+        is_valid, error = self.validate_file_info(name, size)
+        if not is_valid:
+            raise ValueError(error)
+        
+        file_path = self.new_file_path(name, folder)
+        mime_type = self.guess_mime_type(name)
+        token = signing.dumps({'path': file_path}, salt=self.LOCAL_UPLOAD_SALT)
+        
+        return {
+            'signed_url': f"{reverse('receive_direct_upload')}?token={quote(token)}",
+            'stored_path': file_path,
+            'mime_type': mime_type,
+            'upload_token': self.sign_upload_ticket(name, file_path, folder, mime_type),
+        }
+    
+    def receive_signed_upload(self, token: str, stream) -> int:
+        """
+        Store the body of a direct upload request, streaming it to disk
+        
+        Args:
+            token: The token from the signed URL
+            stream: File-like request body
+            
+        Returns:
+            Number of bytes written
+        """
+        try:
+            ticket = signing.loads(token, salt=self.LOCAL_UPLOAD_SALT, max_age=self.SIGNED_UPLOAD_MAX_AGE)
+        except signing.BadSignature:
+            raise ValueError("Upload link is invalid or has expired.")
+        
+        chunks = iter(lambda: stream.read(self.CHUNK_SIZE), b'')
+        try:
+            return self._write_atomic(ticket['path'], chunks)
+        except FileExistsError:
+            raise ValueError("This upload link has already been used.")
+    
+    def confirm_signed_upload(self, upload_token: str, folder: str) -> Dict:
+        """
+        Verify a direct upload finished and return its file information
+        """
+        ticket = self.load_upload_ticket(upload_token, folder)
+        name = ticket['name']
+        file_path = ticket['path']
+        
+        try:
+            size = os.path.getsize(self.path(file_path))
+        except OSError:
+            raise ValueError(f"File {name} was not uploaded. Please try again.")
+        
+        return {
+            'original_name': name,
+            'stored_path': file_path,
+            'public_url': self.get_file_url(file_path),
+            'size': size,
+            'mime_type': ticket['mime_type'],
+            'uploaded': True
+        }
+    
+    def delete_file(self, file_path: str) -> bool:
+        """
+        Delete a file from local storage
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            os.remove(self.path(file_path))
+            return True
+        except (OSError, ValueError) as e:
+            print(f"Error deleting file {file_path}: {str(e)}")
+            return False
+    
+    def get_file_url(self, file_path: str) -> Optional[str]:
+        """URL of requests.views.serve_stored_file for a stored file"""
+        return reverse('serve_stored_file', args=[file_path])
+    
+    def iter_file(self, file_path: str, chunk_size: int = 64 * 1024):
+        """Read a stored file in chunks"""
+        with open(self.path(file_path), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
+    def list_files(self, page_size: int = 1000):
+        """Walk the bucket directory (including leftover temp files)"""
+        page = []
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                full_path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(full_path)
+                except FileNotFoundError:
+                    continue
+                page.append({
+                    'path': os.path.relpath(full_path, self.root).replace(os.sep, '/'),
+                    'size': stat.st_size,
+                    'modified_at': datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+                })
+                if len(page) >= page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+    
+    def serve(self, request, file_path: str):
+        """
+        Response that delivers a stored file. Raises ValueError or OSError
+        when the path is invalid or missing.
+        
+        - django: FileResponse with single-range support
+        - x-accel-redirect: nginx serves LOCAL_STORAGE_ACCEL_PREFIX + path
+          from an internal location aliased to the bucket directory
+        - x-sendfile: Apache mod_xsendfile (or lighttpd) serves the absolute path
+        """
+        full_path = self.path(file_path)
+        if not os.path.isfile(full_path):
+            raise FileNotFoundError(file_path)
+        content_type = self.guess_mime_type(full_path)
+        
+        if self.serve_mode == 'django':
+            response = ranged_file_response(request, full_path, content_type, self.CHUNK_SIZE)
+        else:
+            response = HttpResponse(content_type=content_type)
+            if self.serve_mode == 'x-accel-redirect':
+                prefix = settings.LOCAL_STORAGE_ACCEL_PREFIX.rstrip('/')
+                response['X-Accel-Redirect'] = f"{prefix}/{quote(file_path)}"
+            else:
+                response['X-Sendfile'] = full_path
+        
+        # A content-addressed path always holds the same bytes, so caches
+        # never need to revalidate; the short lifetime bounds how long a
+        # shared cache keeps serving a file after its last reference is
+        # released and the object deleted
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
 
 
 # Singleton instance
 _storage_manager = None
 
-def get_storage_manager() -> SupabaseStorageManager:
+def get_storage_manager() -> BaseStorageManager:
     """
-    Get singleton instance of SupabaseStorageManager
+    Get singleton instance of the storage backend configured by FILE_STORAGE_BACKEND
     """
     global _storage_manager
     if _storage_manager is None:
-        _storage_manager = SupabaseStorageManager()
+        backend = getattr(settings, 'FILE_STORAGE_BACKEND', DEFAULT_STORAGE_BACKEND)
+        _storage_manager = import_string(backend)()
     return _storage_manager
@@ -9,7 +9,11 @@ urlpatterns = [
     path("professional/", views.professional_requests_list, name="professional_requests_list"),
     path("create/", views.create_request, name="create_request"),
     path("test-upload/", views.test_upload_page, name="test_upload"),
+    path("api/upload-url/", views.direct_upload_url, name="direct_upload_url"),
+    path("storage/upload/", views.receive_direct_upload, name="receive_direct_upload"),
+    path("storage/files/<path:file_path>", views.serve_stored_file, name="serve_stored_file"),
     path("<int:request_id>/", views.request_detail, name="request_detail"),
+    path("<int:request_id>/deliverables.zip", views.deliverables_zip, name="deliverables_zip"),
     path("professional/<int:request_id>/", views.professional_request_detail, name="professional_request_detail"),
     path("<int:request_id>/edit/", views.edit_request, name="edit_request"),
     path("<int:request_id>/delete/", views.delete_request, name="delete_request"),
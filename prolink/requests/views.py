@@ -17,25 +17,46 @@ from django.contrib.auth import authenticate, login as auth_login
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.db.models import Q
+from django.utils.http import content_disposition_header
+from django.utils.text import slugify
 from supabase import create_client, Client
 import json
 import os
 import uuid
 import decimal
-from .models import Request, RequestMessage
-from .storage_utils import get_storage_manager
+from .models import Request, RequestFile
+from .storage_utils import get_storage_manager, LocalStorageManager
+from .archives import stream_zip
+from .pagination import paginate_requests
+from .search import search_requests
+from .detail import load_request_detail
+from .scheduler import payment_due_date_from
 from users.models import CustomUser
 
 # Initialize Supabase client
 def get_supabase_client():
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
 
+def status_counts(queryset):
+    """Number of requests per status, from a single GROUP BY query"""
+    rows = queryset.order_by().values('status').annotate(count=models.Count('id'))
+    return {row['status']: row['count'] for row in rows}
+
+
+def users_by_email(emails):
+    """Map emails to users with one query (requests store users by email)"""
+    emails = {email for email in emails if email}
+    if not emails:
+        return {}
+    return {user.email: user for user in CustomUser.objects.filter(email__in=emails)}
+
+
 def requests_list(request):
     # Check if user is authenticated
     if not request.user.is_authenticated:
@@ -49,15 +70,18 @@ def requests_list(request):
     search_query = request.GET.get('search', '')
     
     # Query real requests from database
-    user_requests = Request.objects.filter(client=user_email).select_related('conversation').order_by('-created_at')
+    user_requests = Request.objects.filter(client=user_email).select_related(
+        'transaction', 'conversation'
+    )
     
     # Calculate counts for each status
-    all_requests_count = user_requests.count()
-    pending_count = user_requests.filter(status='pending').count()
-    in_progress_count = user_requests.filter(status='in_progress').count()
-    completed_count = user_requests.filter(status='completed').count()
-    cancelled_count = user_requests.filter(status='cancelled').count()
-    declined_count = user_requests.filter(status='declined').count()
+    counts = status_counts(user_requests)
+    all_requests_count = sum(counts.values())
+    pending_count = counts.get('pending', 0)
+    in_progress_count = counts.get('in_progress', 0)
+    completed_count = counts.get('completed', 0)
+    cancelled_count = counts.get('cancelled', 0)
+    declined_count = counts.get('declined', 0)
     
     # Apply filters
     filtered_requests = user_requests
@@ -70,11 +94,15 @@ def requests_list(request):
         filtered_requests = filtered_requests.filter(status=status_filter)
     # Default (all) shows everything
     if search_query:
-        filtered_requests = filtered_requests.filter(
-            models.Q(title__icontains=search_query) | 
-            models.Q(professional__icontains=search_query)
-        )
+        filtered_requests = search_requests(filtered_requests, search_query)
+    # One page, keyset-paginated: best matches first when searching, else newest
+    cursor = request.GET.get('cursor')
+    filtered_requests, next_cursor, is_first_page = paginate_requests(
+        filtered_requests, 'relevance' if search_query else 'latest', [status_filter, search_query], cursor
+    )
+    
     # Attach professional_user objects and add progress to each request
+    professionals = users_by_email(req.professional for req in filtered_requests)
     requests_with_data = []
     for req in filtered_requests:
         # Calculate progress based on status
@@ -91,31 +119,18 @@ def requests_list(request):
         req.progress = progress
         
         # Attach professional_user object if professional is assigned
-        if req.professional:
-            try:
-                req.professional_user = CustomUser.objects.get(email=req.professional)
-            except CustomUser.DoesNotExist:
-                req.professional_user = None
-        else:
-            req.professional_user = None
-            
-        # Attach transaction if exists
-        try:
-            from transactions.models import Transaction
-            req.transaction = Transaction.objects.filter(request=req).first()
-        except:
-            req.transaction = None
+        req.professional_user = professionals.get(req.professional)
         
-        # Check if conversation exists (safely handle OneToOne relationship)
-        try:
-            req.has_conversation = hasattr(req, 'conversation') and req.conversation is not None
-        except:
-            req.has_conversation = False
+        # Transaction and conversation come from select_related; a missing
+        # one-to-one raises DoesNotExist, which hasattr treats as absent
+        req.has_conversation = hasattr(req, 'conversation')
             
         requests_with_data.append(req)
     
     context = {
         'requests': requests_with_data,
+        'next_cursor': next_cursor,
+        'is_first_page': is_first_page,
         'current_status': status_filter,
         'search_query': search_query,
         'user_email': user_email,
@@ -140,121 +155,55 @@ def request_detail(request, request_id):
     
     user_email = request.user.email
     
-    # Check if user is admin
-    is_admin = hasattr(request.user, 'is_staff') and request.user.is_staff
-    
-    # Get the request - CLIENT or ADMIN
-    try:
-        if is_admin:
-            # Admins can view any request
-            req = Request.objects.get(id=request_id)
-        else:
-            # Regular users can only view their own requests
-            req = Request.objects.get(id=request_id, client=user_email)
-    except Request.DoesNotExist:
+    # Get the request - CLIENT or ADMIN (admins can view any request)
+    request_data = load_request_detail(request_id, request.user)
+    if request_data is None:
         messages.error(request, "Request not found or you don't have permission to view it.")
         return redirect('requests_list')
     
-    # Get messages for this request
-    messages_list = RequestMessage.objects.filter(request=req).order_by('created_at')
-    
-    # Parse attached files
-    attached_files = []
-    if req.attached_files:
-        try:
-            attached_files = json.loads(req.attached_files)
-        except json.JSONDecodeError:
-            attached_files = []
-    
-    # Parse deliverable files (submitted by professional)
-    deliverable_files = []
-    if getattr(req, 'deliverable_files', None):
-        try:
-            deliverable_files = json.loads(req.deliverable_files)
-        except json.JSONDecodeError:
-            deliverable_files = []
-    
-    # Calculate progress based on status
-    progress = 0
-    if req.status == 'in_progress':
-        progress = 60  # Default progress for in_progress
-    elif req.status == 'completed':
-        progress = 100
-    elif req.status == 'pending':
-        progress = 0
-    
-    # Format messages for template
-    formatted_messages = [
-        {
-            'id': msg.id,
-            'sender_email': msg.sender_email,
-            'message': msg.message,
-            'created_at': msg.created_at.strftime('%b %d, %Y at %I:%M %p'),
-            'is_from_professional': msg.is_from_professional
-        }
-        for msg in messages_list
-    ]
-    
-    # Create a namespace object for the request data to work better with template
-    class RequestData:
-        pass
-    
-    request_data = RequestData()
-    request_data.id = req.id
-    request_data.title = req.title
-    request_data.description = req.description
-    request_data.professional = req.professional
-    request_data.client = req.client  # Needed for template condition
-    request_data.status = req.status
-    request_data.price = req.price  # Keep as Decimal for template
-    request_data.timeline_days = req.timeline_days
-    request_data.created_at = req.created_at.strftime('%b %d, %Y at %I:%M %p')
-    request_data.updated_at = req.updated_at.strftime('%b %d, %Y at %I:%M %p')
-    request_data.completed_at = req.completed_at.strftime('%b %d, %Y at %I:%M %p') if req.completed_at else None
-    request_data.progress = progress
-    request_data.attached_files = attached_files
-    request_data.messages = formatted_messages
-    # Include deliverables for client review
-    request_data.deliverable_notes = getattr(req, 'deliverable_notes', '')
-    request_data.deliverable_files = deliverable_files
-    # Include revision fields for template
-    request_data.revision_count = getattr(req, 'revision_count', 0)
-    request_data.max_revisions = getattr(req, 'max_revisions', 3)
-    request_data.revision_notes = getattr(req, 'revision_notes', '')
-    
     context = {
         'request': request_data,
         'user_email': user_email,
         'user_role': request.user.user_role if hasattr(request.user, 'user_role') else 'client',
-        'user': request.user
+        'user': request.user,
+        'user_review': request_data.user_review
     }
     
-    # Check if user has already reviewed (only for completed requests)
-    if req.status == 'completed' and request.user.is_authenticated:
-        from analytics.models import Review
-        from users.models import CustomUser
-        
-        # Get reviewee
-        reviewee_email = req.professional if user_email == req.client else req.client
-        if reviewee_email:
-            try:
-                reviewee = CustomUser.objects.get(email=reviewee_email)
-                user_review = Review.objects.filter(
-                    request=req,
-                    reviewer=request.user,
-                    reviewee=reviewee
-                ).first()
-                context['user_review'] = user_review
-            except CustomUser.DoesNotExist:
-                context['user_review'] = None
-        else:
-            context['user_review'] = None
-    else:
-        context['user_review'] = None
-    
     return render(request, 'requests/request_detail.html', context)
 
 
+def deliverables_zip(request, request_id):
+    """
+    Download all deliverables of a request as one ZIP, built on the fly
+    from storage (same access rules as request_detail)
+    """
+    if not request.user.is_authenticated:
+        messages.error(request, "Please log in to view request details.")
+        return redirect("login")
+    
+    # Admins can download any request's deliverables, clients only their own
+    is_admin = hasattr(request.user, 'is_staff') and request.user.is_staff
+    requests_qs = Request.objects.all() if is_admin else Request.objects.filter(client=request.user.email)
+    req = requests_qs.filter(id=request_id).first()
+    if req is None:
+        messages.error(request, "Request not found or you don't have permission to view it.")
+        return redirect('requests_list')
+    
+    files = list(req.files.filter(kind=RequestFile.KIND_DELIVERABLE))
+    if not files:
+        messages.error(request, "There are no deliverables to download yet.")
+        return redirect('request_detail', request_id=request_id)
+    
+    response = StreamingHttpResponse(
+        stream_zip(get_storage_manager(), files),
+        content_type='application/zip'
+    )
+    filename = f"{slugify(req.title) or 'request'}-{req.id}-deliverables.zip"
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
 def professional_requests_list(request):
     """Professional view for all their client requests"""
     # Check if user is authenticated
@@ -272,28 +221,21 @@ def professional_requests_list(request):
     # Get filter parameters
     status_filter = request.GET.get('status', 'all')
     search_query = request.GET.get('search', '')
-    sort_by = request.GET.get('sort', 'latest')  # latest, price_high, price_low
+    sort_by = request.GET.get('sort') or ('relevance' if search_query else 'latest')  # relevance, latest, price_high, price_low
+    if sort_by == 'relevance' and not search_query:
+        sort_by = 'latest'
     
     # Query all requests assigned to this professional
     professional_requests = Request.objects.filter(professional=user_email)
     
-    # Apply sorting
-    if sort_by == 'latest':
-        professional_requests = professional_requests.order_by('-created_at')
-    elif sort_by == 'price_high':
-        professional_requests = professional_requests.order_by('-price', '-created_at')
-    elif sort_by == 'price_low':
-        professional_requests = professional_requests.order_by('price', '-created_at')
-    else:
-        professional_requests = professional_requests.order_by('-created_at')
-    
     # Calculate counts for each status
-    total_count = professional_requests.count()
-    pending_count = professional_requests.filter(status='pending').count()
-    in_progress_count = professional_requests.filter(status='in_progress').count()
-    under_review_count = professional_requests.filter(status='under_review').count()
-    completed_count = professional_requests.filter(status='completed').count()
-    cancelled_count = professional_requests.filter(status='cancelled').count()
+    counts = status_counts(professional_requests)
+    total_count = sum(counts.values())
+    pending_count = counts.get('pending', 0)
+    in_progress_count = counts.get('in_progress', 0)
+    under_review_count = counts.get('under_review', 0)
+    completed_count = counts.get('completed', 0)
+    cancelled_count = counts.get('cancelled', 0)
     
     # Apply filters
     filtered_requests = professional_requests
@@ -302,22 +244,23 @@ def professional_requests_list(request):
         filtered_requests = filtered_requests.filter(status=status_filter)
     
     if search_query:
-        filtered_requests = filtered_requests.filter(
-            models.Q(title__icontains=search_query) | 
-            models.Q(client__icontains=search_query)
-        )
+        filtered_requests = search_requests(filtered_requests, search_query)
+    
+    # One page in the selected order (keyset-paginated)
+    cursor = request.GET.get('cursor')
+    requests_list, next_cursor, is_first_page = paginate_requests(
+        filtered_requests, sort_by, [status_filter, search_query, sort_by], cursor
+    )
     
     # Attach client_user objects to each request
-    requests_list = []
-    for req in filtered_requests:
-        try:
-            req.client_user = CustomUser.objects.get(email=req.client)
-        except CustomUser.DoesNotExist:
-            req.client_user = None
-        requests_list.append(req)
+    clients = users_by_email(req.client for req in requests_list)
+    for req in requests_list:
+        req.client_user = clients.get(req.client)
     
     context = {
         'requests': requests_list,
+        'next_cursor': next_cursor,
+        'is_first_page': is_first_page,
         'current_status': status_filter,
         'search_query': search_query,
         'sort_by': sort_by,
@@ -336,10 +279,6 @@ def professional_requests_list(request):
 
 def professional_request_detail(request, request_id):
     """Professional view for request details (also accessible by admins)"""
-    from users.models import CustomUser
-    from transactions.models import Transaction
-    from analytics.models import Review
-    
     # Check if user is authenticated
     if not request.user.is_authenticated:
         messages.error(request, "Please log in to view request details.")
@@ -353,99 +292,25 @@ def professional_request_detail(request, request_id):
         messages.error(request, "This page is for professionals only.")
         return redirect('dashboard')
     
-    user_email = request.user.email
-    
-    # Get the request - PROFESSIONAL or ADMIN
-    try:
-        if is_admin:
-            # Admins can view any request
-            req = Request.objects.get(id=request_id)
-        else:
-            # Professionals can only view requests assigned to them
-            req = Request.objects.get(id=request_id, professional=user_email)
-    except Request.DoesNotExist:
+    # Get the request - PROFESSIONAL or ADMIN (admins can view any request)
+    req = load_request_detail(request_id, request.user, as_professional=True)
+    if req is None:
         messages.error(request, "Request not found or not assigned to you.")
         return redirect('dashboard')
     
-    # Parse attached files
-    attached_files = []
-    if req.attached_files:
-        try:
-            attached_files = json.loads(req.attached_files)
-        except json.JSONDecodeError:
-            attached_files = []
-    
-    # Parse deliverable files (submitted by professional)
-    deliverable_files = []
-    if getattr(req, 'deliverable_files', None):
-        try:
-            deliverable_files = json.loads(req.deliverable_files)
-        except json.JSONDecodeError:
-            deliverable_files = []
-    
-    # Calculate progress based on status
-    progress = 0
-    if req.status == 'in_progress':
-        progress = 60
-    elif req.status == 'completed':
-        progress = 100
-    elif req.status == 'under_review':
-        progress = 80
-    elif req.status == 'pending':
-        progress = 0
-    
-    # Get transaction if exists
-    transaction = None
-    try:
-        transaction = Transaction.objects.get(request_id=req.id)
-    except Transaction.DoesNotExist:
-        pass
-    
-    # Get client user object
-    client_user = CustomUser.objects.filter(email=req.client).first()
-    
-    # Get reviews from other professionals about this client (visible to professionals only)
-    other_professional_reviews = []
-    if client_user:
-        other_professional_reviews = Review.objects.filter(
-            reviewee=client_user,
-            is_professional_review=True
-        ).exclude(
-            reviewer=request.user  # Exclude current professional's own review
-        ).select_related('reviewer', 'request').order_by('-created_at')[:5]  # Show latest 5 reviews
-    
     context = {
         'request': req,
         'service_request': req,
-        'attached_files': attached_files,
-        'deliverable_files': deliverable_files,
-        'progress': progress,
-        'transaction': transaction,
-        'client': client_user,
-        'other_professional_reviews': other_professional_reviews,  # Reviews from other professionals about this client
-        'user': request.user
+        'attached_files': req.attached_files,
+        'deliverable_files': req.deliverable_files,
+        'progress': req.progress,
+        'transaction': req.transaction,
+        'client': req.client_user,
+        'other_professional_reviews': req.other_professional_reviews,  # Reviews from other professionals about this client
+        'user': request.user,
+        'user_review': req.user_review
     }
     
-    # Check if user has already reviewed (only for completed requests)
-    if req.status == 'completed' and request.user.is_authenticated:
-        
-        # Get reviewee (client)
-        if req.client:
-            try:
-                reviewee = CustomUser.objects.get(email=req.client)
-                user_review = Review.objects.filter(
-                    request=req,
-                    reviewer=request.user,
-                    reviewee=reviewee
-                ).first()
-                context['user_review'] = user_review
-            except CustomUser.DoesNotExist:
-                context['user_review'] = None
-        else:
-            context['user_review'] = None
-    else:
-        context['user_review'] = None
-    
     return render(request, 'requests/professional_request_detail.html', context)
 
 
@@ -457,9 +322,6 @@ def create_request(request):
     
     user_email = request.user.email
     
-    # Get all professionals for the dropdown
-    professionals = CustomUser.objects.filter(user_role='professional')
-    
     # Check if a professional is pre-selected via URL parameter
     preselected_professional_id = request.GET.get('professional')
     preselected_professional = None
@@ -512,8 +374,18 @@ def create_request(request):
             except CustomUser.DoesNotExist:
                 errors.append("Selected professional is not valid.")
         
-        # Handle file uploads with Supabase Storage
+        # Files uploaded directly to storage from the browser
         attached_files = []
+        upload_tokens = request.POST.getlist('uploaded_files')
+        if upload_tokens:
+            confirmed, confirm_errors = get_storage_manager().confirm_signed_uploads(
+                upload_tokens,
+                folder=f"requests/{user_email}"
+            )
+            attached_files.extend(confirmed)
+            errors.extend(confirm_errors)
+        
+        # Handle file uploads with Supabase Storage
         if 'attached_files' in request.FILES:
             files = request.FILES.getlist('attached_files')
             
@@ -526,10 +398,11 @@ def create_request(request):
                 # Upload files and collect any errors
                 uploaded, upload_errors = storage_manager.upload_multiple_files(
                     files, 
-                    folder=f"requests/{user_email}"
+                    folder=f"requests/{user_email}",
+                    max_files=storage_manager.MAX_FILES - len(upload_tokens)
                 )
                 
-                attached_files = uploaded
+                attached_files.extend(uploaded)
                 errors.extend(upload_errors)
                 
                 # Debug: Log upload results
@@ -544,6 +417,10 @@ def create_request(request):
                 errors.append(error_msg)
         
         if errors:
+            # Nothing will point at what did upload: drop our references
+            if attached_files:
+                get_storage_manager().release_files([info['stored_path'] for info in attached_files])
+            
             # Return form with errors
             context = {
                 'title': title,
@@ -555,23 +432,31 @@ def create_request(request):
                 'priority': priority,
                 'errors': errors,
                 'user_email': user_email,
-                'user_role': request.session.get('user_role', 'student'),
-                'professionals': professionals
+                'user_role': request.session.get('user_role', 'student')
             }
             return render(request, 'requests/create_request.html', context)
         
         # Create the request
         try:
-            Request.objects.create(
-                title=title,
-                description=description,
-                client=user_email,
-                professional=professional_email if professional_email else '',
-                status='pending',
-                price=float(price) if price else None,
-                timeline_days=int(timeline_days),
-                attached_files=json.dumps(attached_files) if attached_files else ''
-            )
+            with db_transaction.atomic():
+                new_request = Request.objects.create(
+                    title=title,
+                    description=description,
+                    client=user_email,
+                    professional=professional_email if professional_email else '',
+                    status='pending',
+                    price=float(price) if price else None,
+                    timeline_days=int(timeline_days)
+                )
+                RequestFile.objects.bulk_create([
+                    RequestFile.from_upload(
+                        file_info,
+                        request=new_request,
+                        kind=RequestFile.KIND_ATTACHMENT,
+                        owner=request.user
+                    )
+                    for file_info in attached_files
+                ])
             
             success_msg = f"Request '{title}' created successfully!"
             if attached_files:
@@ -580,6 +465,8 @@ def create_request(request):
             return redirect('requests_list')
             
         except Exception as e:
+            if attached_files:
+                get_storage_manager().release_files([info['stored_path'] for info in attached_files])
             messages.error(request, f"Error creating request: {str(e)}")
             context = {
                 'title': title,
@@ -591,8 +478,7 @@ def create_request(request):
                 'priority': priority,
                 'errors': [f"Error creating request: {str(e)}"],
                 'user_email': user_email,
-                'user_role': request.session.get('user_role', 'student'),
-                'professionals': professionals
+                'user_role': request.session.get('user_role', 'student')
             }
             return render(request, 'requests/create_request.html', context)
     
@@ -600,12 +486,116 @@ def create_request(request):
     context = {
         'user_email': user_email,
         'user_role': request.session.get('user_role', 'student'),
-        'professionals': professionals,
         'preselected_professional': preselected_professional,
         'preselected_professional_email': preselected_professional_email
     }
     return render(request, 'requests/create_request.html', context)
 
+def get_direct_upload_folder(user, purpose, target_id=None):
+    """
+    Storage folder a user may upload to for a given form, or None if the
+    user isn't allowed to. Mirrors the folders used by the multipart paths.
+    """
+    if purpose == 'request_attachment':
+        # New requests and edits of the user's own requests
+        if target_id and not Request.objects.filter(id=target_id, client=user.email).exists():
+            return None
+        return f"requests/{user.email}"
+    
+    if purpose == 'deliverable':
+        if Request.objects.filter(id=target_id, professional=user.email).exists():
+            return f"deliverables/{target_id}"
+        return None
+    
+    if purpose == 'dispute_evidence':
+        from transactions.models import Transaction
+        transaction = Transaction.objects.filter(request_id=target_id).filter(
+            Q(client=user) | Q(professional=user)
+        ).first()
+        if transaction:
+            return f"disputes/{transaction.id}"
+        return None
+    
+    return None
+
+
+def direct_upload_url(request):
+    """
+    API: issue a signed URL for uploading one file straight to storage.
+    The returned upload_token is posted back with the form (as
+    'uploaded_files') and confirmed by the view that saves the record.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    
+    name = request.POST.get('filename', '').strip()
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid file size'}, status=400)
+    try:
+        target_id = int(request.POST.get('target_id') or 0) or None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid target'}, status=400)
+    if not name:
+        return JsonResponse({'success': False, 'error': 'Missing filename'}, status=400)
+    
+    folder = get_direct_upload_folder(request.user, request.POST.get('purpose', ''), target_id)
+    if folder is None:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+    
+    try:
+        upload = get_storage_manager().create_signed_upload(name, size, folder=folder)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=502)
+    
+    return JsonResponse({'success': True, **upload})
+
+
+def _local_storage_manager():
+    """The storage manager if it is the local filesystem backend, else 404"""
+    storage_manager = get_storage_manager()
+    if not isinstance(storage_manager, LocalStorageManager):
+        raise Http404("Local file storage is not enabled")
+    return storage_manager
+
+
+def serve_stored_file(request, file_path):
+    """
+    Serve a file from the local storage backend. Files are public like the
+    Supabase bucket. Uploads are stored under their content hash and
+    shared between requests, so a path is only as secret as the file's
+    contents (direct uploads keep random names).
+    """
+    storage_manager = _local_storage_manager()
+    try:
+        return storage_manager.serve(request, file_path)
+    except (OSError, ValueError):
+        raise Http404("File not found")
+
+
+@csrf_exempt
+def receive_direct_upload(request):
+    """
+    Target of the signed URLs issued by LocalStorageManager.create_signed_upload.
+    The signed token authorizes the write, so no session or CSRF token is needed.
+    """
+    storage_manager = _local_storage_manager()
+    if request.method not in ('PUT', 'POST'):
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    
+    try:
+        size = storage_manager.receive_signed_upload(request.GET.get('token', ''), request)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True, 'size': size})
+
+
 def test_upload_page(request):
     """Test page for file uploads"""
     if request.method == 'POST':
@@ -725,23 +715,17 @@ def edit_request(request, request_id):
     user_email = request.user.email
     req = get_object_or_404(Request, id=request_id, client=user_email)
     
-    # Get all professionals for the dropdown
-    professionals = CustomUser.objects.filter(user_role='professional').values('id', 'email', 'first_name', 'last_name')
-    
     # Only allow editing of pending requests
     if req.status != 'pending':
         messages.error(request, "Only pending requests can be edited.")
         return redirect('requests_list')
     
-    # Parse existing files
-    existing_files = []
-    if req.attached_files:
-        try:
-            existing_files = json.loads(req.attached_files)
-        except json.JSONDecodeError:
-            existing_files = []
+    # Existing attachments
+    existing_files = list(req.files.filter(kind=RequestFile.KIND_ATTACHMENT))
     
     if request.method == 'POST':
+        # Uploads of this submission, released again if it fails
+        new_files = []
         try:
             # Update request fields
             req.title = request.POST.get('title', '').strip()
@@ -789,54 +773,73 @@ def edit_request(request, request_id):
                     pass
             
             # Handle new file uploads
-            new_files = []
-            if 'attached_files' in request.FILES:
-                files = request.FILES.getlist('attached_files')
-                storage_manager = get_storage_manager()
-                
-                # Check total files (existing + new)
-                total_files = len(existing_files) + len(files)
-                if total_files > 5:
-                    messages.error(request, f"Maximum 5 files allowed. You have {len(existing_files)} existing files.")
+            upload_tokens = request.POST.getlist('uploaded_files')
+            files = request.FILES.getlist('attached_files')
+            
+            # Check total files (existing + new)
+            total_files = len(existing_files) + len(files) + len(upload_tokens)
+            if total_files > 5:
+                messages.error(request, f"Maximum 5 files allowed. You have {len(existing_files)} existing files.")
+                return redirect('edit_request', request_id=request_id)
+            
+            # Files uploaded directly to storage from the browser
+            if upload_tokens:
+                confirmed, confirm_errors = get_storage_manager().confirm_signed_uploads(
+                    upload_tokens,
+                    folder=f"requests/{user_email}"
+                )
+                new_files.extend(confirmed)
+                if confirm_errors:
+                    for error in confirm_errors:
+                        messages.error(request, error)
+                    get_storage_manager().release_files([info['stored_path'] for info in new_files])
                     return redirect('edit_request', request_id=request_id)
+            
+            if files:
+                storage_manager = get_storage_manager()
                 
                 # Upload new files
                 uploaded, upload_errors = storage_manager.upload_multiple_files(
                     files, 
                     folder=f"requests/{user_email}"
                 )
+                new_files.extend(uploaded)
                 
                 if upload_errors:
                     for error in upload_errors:
                         messages.error(request, error)
+                    storage_manager.release_files([info['stored_path'] for info in new_files])
                     return redirect('edit_request', request_id=request_id)
-                
-                new_files = uploaded
             
             # Handle file deletions
             files_to_delete = request.POST.getlist('delete_files')
-            if files_to_delete:
-                storage_manager = get_storage_manager()
-                remaining_files = []
-                
-                for file_data in existing_files:
-                    if file_data.get('stored_path') not in files_to_delete:
-                        remaining_files.append(file_data)
-                    else:
-                        # Delete from Supabase
-                        storage_manager.delete_file(file_data.get('stored_path'))
-                
-                existing_files = remaining_files
+            deleted_files = [file for file in existing_files if str(file.id) in files_to_delete]
             
-            # Combine existing and new files
-            all_files = existing_files + new_files
-            req.attached_files = json.dumps(all_files) if all_files else ''
+            with db_transaction.atomic():
+                req.save()
+                RequestFile.objects.filter(id__in=[file.id for file in deleted_files]).delete()
+                RequestFile.objects.bulk_create([
+                    RequestFile.from_upload(
+                        file_info,
+                        request=req,
+                        kind=RequestFile.KIND_ATTACHMENT,
+                        owner=request.user
+                    )
+                    for file_info in new_files
+                ])
+            # Saved: the new uploads are referenced now
+            new_files = []
+            
+            if deleted_files:
+                # Drop our references; storage is freed with the last one
+                get_storage_manager().release_files([file.storage_path for file in deleted_files if file.storage_path])
             
-            req.save()
             messages.success(request, "Request updated successfully!")
             return redirect('request_detail', request_id=request_id)
             
         except Exception as e:
+            if new_files:
+                get_storage_manager().release_files([info['stored_path'] for info in new_files])
             messages.error(request, f"Error updating request: {str(e)}")
             return redirect('edit_request', request_id=request_id)
     
@@ -845,7 +848,8 @@ def edit_request(request, request_id):
         'request': req,
         'user': request.user,
         'existing_files': existing_files,
-        'professionals': professionals
+        # Label for the typeahead; other professionals are looked up as the user types
+        'current_professional': CustomUser.objects.filter(email=req.professional).first() if req.professional else None
     }
     return render(request, 'requests/edit_request.html', context)
 
@@ -901,6 +905,7 @@ def accept_request(request, request_id):
                 
                 # Update request status to awaiting payment
                 req.status = 'awaiting_payment'
+                req.payment_due_date = payment_due_date_from()  # Cancelled if left unpaid
                 req.save()
                 
                 # Create or get conversation
@@ -90,13 +90,14 @@ function initNotifications() {
         });
     }
     
-    // Update notification badge on load
-    updateNotificationBadge();
-    
-    // Poll for new notifications every 30 seconds
-    setInterval(() => {
+    // The navbar poller (poll.js) already refreshes the badge from /api/poll/;
+    // only fall back to polling on our own on pages without it
+    if (!window.ProLinkPoll) {
         updateNotificationBadge();
-    }, 30000);
+        setInterval(() => {
+            updateNotificationBadge();
+        }, 30000);
+    }
 }
 
 function showNotification(message, type = 'info') {
@@ -178,6 +179,12 @@ function updateNotificationBadge() {
     const badge = document.querySelector('.notification-badge');
     if (!badge) return;
     
+    // Combined poll endpoint updates every navbar badge in one request
+    if (window.ProLinkPoll) {
+        window.ProLinkPoll.refresh();
+        return;
+    }
+    
     // Fetch real notification count from API
     fetch('/notifications/api/count/')
         .then(response => response.json())
@@ -263,7 +270,7 @@ function showNotificationDropdown() {
                             <i class="fas ${notif.icon}"></i>
                         </div>
                         <div class="notification-content">
-                            <p class="notification-title">${notif.title}</p>
+                            <p class="notification-title">${notif.title}${notif.count > 1 ? ` (${notif.count})` : ''}</p>
                             ${notificationDetails ? `<div class="notification-details">${notificationDetails}</div>` : ''}
                             <div class="notification-time">${notif.time_ago}</div>
                         </div>
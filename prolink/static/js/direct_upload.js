@@ -0,0 +1,167 @@
+// ProLink direct uploads
+// Files go from the browser straight to storage through signed upload URLs,
+// so the Django worker only receives small tokens instead of file bodies.
+// Forms opt in with data-direct-upload="<purpose>" (and data-upload-target
+// for the request id). If anything fails the form falls back to a normal
+// multipart submission.
+
+(function() {
+    if (window.ProLinkDirectUpload) return;
+
+    const SIGN_URL = '/requests/api/upload-url/';
+
+    function csrfToken(form) {
+        const input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+        return input ? input.value : '';
+    }
+
+    function fileInputs(form) {
+        return Array.from(form.querySelectorAll('input[type="file"]'))
+            .filter(input => !input.disabled && input.files && input.files.length > 0);
+    }
+
+    function hasFiles(form) {
+        return fileInputs(form).length > 0;
+    }
+
+    function requestSignedUrl(form, file) {
+        const body = new FormData();
+        body.append('purpose', form.dataset.directUpload);
+        body.append('target_id', form.dataset.uploadTarget || '');
+        body.append('filename', file.name);
+        body.append('size', file.size);
+
+        return fetch(SIGN_URL, {
+            method: 'POST',
+            body: body,
+            headers: {
+                'X-CSRFToken': csrfToken(form),
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) throw new Error(data.error || 'Could not start upload');
+                return data;
+            });
+    }
+
+    function putFile(upload, file, onProgress) {
+        return new Promise((resolve, reject) => {
+            const xhr = new XMLHttpRequest();
+            xhr.open('PUT', upload.signed_url);
+            xhr.setRequestHeader('content-type', upload.mime_type || 'application/octet-stream');
+            xhr.setRequestHeader('x-upsert', 'false');
+            xhr.upload.addEventListener('progress', e => {
+                if (e.lengthComputable) onProgress(e.loaded);
+            });
+            xhr.onload = () => {
+                if (xhr.status >= 200 && xhr.status < 300) resolve(upload.upload_token);
+                else reject(new Error('Upload failed (' + xhr.status + ')'));
+            };
+            xhr.onerror = () => reject(new Error('Upload failed'));
+            xhr.send(file);
+        });
+    }
+
+    function addToken(form, token) {
+        const input = document.createElement('input');
+        input.type = 'hidden';
+        input.name = 'uploaded_files';
+        input.value = token;
+        input.dataset.directUploadToken = '';
+        form.appendChild(input);
+    }
+
+    function reset(form) {
+        form.querySelectorAll('input[data-direct-upload-token]').forEach(input => input.remove());
+        form.querySelectorAll('input[type="file"][data-direct-upload-disabled]').forEach(input => {
+            input.disabled = false;
+            delete input.dataset.directUploadDisabled;
+        });
+    }
+
+    // Upload every selected file, then swap the file inputs for token inputs.
+    // onProgress(loaded, total, index, state) is called per file with state
+    // 'uploading', 'done' or 'error'. Resolves to true when all files went
+    // direct, false when the form should be submitted as multipart instead.
+    function prepare(form, onProgress) {
+        onProgress = onProgress || function() {};
+        reset(form);
+
+        const inputs = fileInputs(form);
+        const files = inputs.reduce((all, input) => all.concat(Array.from(input.files)), []);
+        if (!files.length) return Promise.resolve(true);
+
+        const total = files.reduce((sum, file) => sum + file.size, 0);
+        const loaded = files.map(() => 0);
+        const report = (index, state) => {
+            onProgress(loaded.reduce((a, b) => a + b, 0), total, index, state);
+        };
+
+        const uploads = files.map((file, index) =>
+            requestSignedUrl(form, file)
+                .then(upload => putFile(upload, file, bytes => {
+                    loaded[index] = bytes;
+                    report(index, 'uploading');
+                }))
+                .then(token => {
+                    loaded[index] = file.size;
+                    report(index, 'done');
+                    return token;
+                })
+                .catch(error => {
+                    report(index, 'error');
+                    throw error;
+                })
+        );
+
+        return Promise.all(uploads)
+            .then(tokens => {
+                tokens.forEach(token => addToken(form, token));
+                // Disabled inputs are left out of the submission
+                inputs.forEach(input => {
+                    input.disabled = true;
+                    input.dataset.directUploadDisabled = '';
+                });
+                return true;
+            })
+            .catch(error => {
+                console.warn('Direct upload failed, falling back to form upload:', error);
+                reset(form);
+                return false;
+            });
+    }
+
+    function submit(form, onProgress) {
+        return prepare(form, onProgress).then(() => form.submit());
+    }
+
+    document.addEventListener('submit', function(e) {
+        const form = e.target;
+        if (!form.matches || !form.matches('form[data-direct-upload]')) return;
+        // Pages with their own submit handling call prepare() themselves
+        if (e.defaultPrevented || 'directUploadPrepared' in form.dataset || !hasFiles(form)) return;
+
+        e.preventDefault();
+        prepare(form).then(() => {
+            // requestSubmit runs the page's own submit handlers again; the
+            // marker stops this listener from handling the resubmission
+            form.dataset.directUploadPrepared = '';
+            if (form.requestSubmit) form.requestSubmit();
+            else form.submit();
+            delete form.dataset.directUploadPrepared;
+        });
+    });
+
+    // Restore file inputs when the page comes back from the back/forward cache
+    window.addEventListener('pageshow', function() {
+        document.querySelectorAll('form[data-direct-upload]').forEach(reset);
+    });
+
+    window.ProLinkDirectUpload = {
+        prepare: prepare,
+        submit: submit,
+        hasFiles: hasFiles
+    };
+})();
@@ -0,0 +1,58 @@
+// ProLink navbar state poller
+// One request per tick for unread messages, notifications and admin counts.
+// Other scripts can listen for the 'prolink:poll' event instead of polling.
+
+(function() {
+    if (window.ProLinkPoll) return;
+
+    const POLL_URL = '/api/poll/';
+    const POLL_INTERVAL = 30000; // 30 seconds
+
+    let version = '';
+    let lastState = null;
+
+    function setBadge(badge, count, display) {
+        if (!badge) return;
+        if (count > 0) {
+            badge.textContent = count;
+            badge.style.display = display;
+        } else {
+            badge.style.display = 'none';
+        }
+    }
+
+    function render(state) {
+        setBadge(document.getElementById('unreadMessageCount'), state.unread_messages, 'inline-block');
+        setBadge(document.querySelector('.notifications .notification-badge'), state.unread_notifications, 'block');
+        if (state.admin) {
+            setBadge(document.getElementById('openDisputesCount'), state.admin.open_disputes, 'inline-block');
+            setBadge(document.getElementById('pendingWithdrawalsCount'), state.admin.pending_withdrawals, 'inline-block');
+        }
+        document.dispatchEvent(new CustomEvent('prolink:poll', { detail: state }));
+    }
+
+    function refresh(force) {
+        const url = force || !version ? POLL_URL : POLL_URL + '?version=' + encodeURIComponent(version);
+        return fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => response.json())
+            .then(data => {
+                version = data.version;
+                if (data.changed || force || !lastState) {
+                    lastState = data;
+                    render(data);
+                }
+                return data;
+            })
+            .catch(error => console.error('Error polling navbar state:', error));
+    }
+
+    window.ProLinkPoll = {
+        refresh: () => refresh(true),
+        getState: () => lastState,
+    };
+
+    refresh(true);
+    setInterval(() => {
+        if (!document.hidden) refresh(false);
+    }, POLL_INTERVAL);
+})();
@@ -0,0 +1,160 @@
+// ProLink professional typeahead
+// Professionals are looked up through /api/professionals/ as the user types
+// instead of rendering the whole directory into the form. Lookups are
+// debounced and each query's response is cached for the page's lifetime, so
+// backspacing to a prefix that was already typed never refetches.
+// Text inputs opt in with data-professional-typeahead="<hidden input id>";
+// the hidden input receives the selected professional's email.
+
+(function() {
+    if (window.ProLinkProfessionals) return;
+
+    const API_URL = '/api/professionals/';
+    const DEBOUNCE_MS = 200;
+    const TYPEAHEAD_SIZE = 8;
+    const cache = new Map();
+
+    function normalize(query) {
+        return (query || '').trim().toLowerCase().replace(/\s+/g, ' ');
+    }
+
+    function search(query, perPage) {
+        const q = normalize(query);
+        const size = perPage || TYPEAHEAD_SIZE;
+        const key = size + ':' + q;
+        if (!cache.has(key)) {
+            const params = new URLSearchParams({ q: q, per_page: size });
+            const pending = fetch(API_URL + '?' + params.toString(), {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            }).then(response => {
+                if (!response.ok) throw new Error('Lookup failed (' + response.status + ')');
+                return response.json();
+            });
+            // Don't keep failures around
+            pending.catch(() => cache.delete(key));
+            cache.set(key, pending);
+        }
+        return cache.get(key);
+    }
+
+    function label(professional) {
+        return professional.name && professional.name !== professional.email
+            ? professional.name + ' (' + professional.email + ')'
+            : professional.email;
+    }
+
+    function attach(input) {
+        const hidden = document.getElementById(input.dataset.professionalTypeahead);
+        if (!hidden) return;
+
+        const list = document.createElement('ul');
+        list.className = 'typeahead-results';
+        list.setAttribute('role', 'listbox');
+        list.hidden = true;
+        input.insertAdjacentElement('afterend', list);
+        input.setAttribute('autocomplete', 'off');
+
+        let results = [];
+        let active = -1;
+        let timer = null;
+        let latest = 0;
+        let selected = { email: hidden.value, label: input.value };
+
+        function close() {
+            list.hidden = true;
+            active = -1;
+        }
+
+        function choose(professional) {
+            hidden.value = professional.email;
+            input.value = label(professional);
+            selected = { email: hidden.value, label: input.value };
+            close();
+            hidden.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+
+        function highlight(index) {
+            const items = list.querySelectorAll('li[data-index]');
+            items.forEach(item => item.classList.toggle('active', Number(item.dataset.index) === index));
+            active = index;
+        }
+
+        function render(data) {
+            results = data.results || [];
+            list.innerHTML = '';
+            if (!results.length) {
+                const empty = document.createElement('li');
+                empty.className = 'typeahead-empty';
+                empty.textContent = 'No professionals found';
+                list.appendChild(empty);
+            }
+            results.forEach((professional, index) => {
+                const item = document.createElement('li');
+                item.dataset.index = index;
+                item.setAttribute('role', 'option');
+                const name = document.createElement('strong');
+                name.textContent = professional.name || professional.email;
+                const email = document.createElement('span');
+                email.textContent = professional.email;
+                item.append(name, email);
+                list.appendChild(item);
+            });
+            list.hidden = false;
+            highlight(results.length ? 0 : -1);
+        }
+
+        function lookup() {
+            const request = ++latest;
+            search(input.value).then(data => {
+                // Ignore responses that arrive after a newer query
+                if (request === latest && document.activeElement === input) render(data);
+            }).catch(close);
+        }
+
+        input.addEventListener('input', () => {
+            // Typing invalidates the previous selection until one is picked again
+            hidden.value = '';
+            clearTimeout(timer);
+            timer = setTimeout(lookup, DEBOUNCE_MS);
+        });
+        input.addEventListener('focus', lookup);
+        input.addEventListener('blur', () => {
+            // Leaving half-typed text keeps the last selection; an emptied
+            // field clears it
+            if (!hidden.value && input.value.trim()) {
+                hidden.value = selected.email;
+                input.value = selected.label;
+            } else if (!input.value.trim()) {
+                selected = { email: '', label: '' };
+            }
+            setTimeout(close, 150);
+        });
+        input.addEventListener('keydown', e => {
+            if (list.hidden) return;
+            if (e.key === 'ArrowDown' && results.length) {
+                e.preventDefault();
+                highlight((active + 1) % results.length);
+            } else if (e.key === 'ArrowUp' && results.length) {
+                e.preventDefault();
+                highlight((active - 1 + results.length) % results.length);
+            } else if (e.key === 'Enter' && active >= 0) {
+                e.preventDefault();
+                choose(results[active]);
+            } else if (e.key === 'Escape') {
+                close();
+            }
+        });
+        list.addEventListener('mousedown', e => {
+            const item = e.target.closest('li[data-index]');
+            if (!item) return;
+            e.preventDefault();
+            choose(results[Number(item.dataset.index)]);
+        });
+    }
+
+    window.ProLinkProfessionals = { search: search, label: label };
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('input[data-professional-typeahead]').forEach(attach);
+    });
+})();
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from requests.models import RequestFile
 from .models import Transaction, Dispute, WithdrawalRequest
 
 
@@ -30,6 +31,15 @@ class TransactionAdmin(admin.ModelAdmin):
     )
 
 
+class EvidenceFileInline(admin.TabularInline):
+    model = RequestFile
+    fk_name = 'dispute'
+    extra = 0
+    fields = ('kind', 'request', 'original_name', 'url', 'size', 'owner', 'created_at')
+    readonly_fields = ('created_at',)
+    raw_id_fields = ('request', 'owner')
+
+
 @admin.register(Dispute)
 class DisputeAdmin(admin.ModelAdmin):
     list_display = ('id', 'transaction', 'opened_by', 'status', 'created_at', 'resolved_by')
@@ -43,7 +53,7 @@ class DisputeAdmin(admin.ModelAdmin):
             'fields': ('transaction', 'opened_by', 'status', 'reason')
         }),
         ('Evidence', {
-            'fields': ('client_evidence', 'client_files', 'professional_evidence', 'professional_files')
+            'fields': ('client_evidence', 'professional_evidence')
         }),
         ('Resolution', {
             'fields': ('resolved_by', 'resolution_notes', 'refund_amount')
@@ -52,6 +62,7 @@ class DisputeAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'resolved_at')
         }),
     )
+    inlines = (EvidenceFileInline,)
 
 
 @admin.register(WithdrawalRequest)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:48
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_withdrawalrequest'),
+        ('requests', '0009_copy_json_files_to_requestfile'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='dispute',
+            name='client_files',
+        ),
+        migrations.RemoveField(
+            model_name='dispute',
+            name='professional_files',
+        ),
+    ]
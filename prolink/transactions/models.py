@@ -84,8 +84,7 @@ class Dispute(models.Model):
     reason = models.TextField(help_text="Why the dispute was opened")
     client_evidence = models.TextField(blank=True, help_text="Client's evidence/explanation")
     professional_evidence = models.TextField(blank=True, help_text="Professional's evidence/explanation")
-    client_files = models.TextField(blank=True, help_text="JSON array of file paths")
-    professional_files = models.TextField(blank=True, help_text="JSON array of file paths")
+    # Evidence files are RequestFile rows (related_name='files')
     
     # Resolution
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='open')
@@ -150,4 +149,4 @@ class WithdrawalRequest(models.Model):
         verbose_name_plural = 'Withdrawal Requests'
     
     def __str__(self):
-        return f"Withdrawal ₱{self.amount} - {self.professional.username} - {self.get_status_display()}"
\ No newline at end of file
+        return f"Withdrawal ₱{self.amount} - {self.professional.username} - {self.get_status_display()}"
@@ -3,12 +3,13 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.utils import timezone
+from django.db import transaction as db_transaction
 from django.db.models import Q
 from decimal import Decimal
 from .models import Transaction, Dispute
-from requests.models import Request
+from requests.models import Request, RequestFile
+from requests.scheduler import auto_approve_date_from
 from users.models import CustomUser
-import json
 
 
 # ============= PAYMENT FLOW =============
@@ -146,7 +147,9 @@ def submit_work(request, request_id):
                 'transaction': transaction,
             })
         
-        if not deliverable_files:
+        upload_tokens = request.POST.getlist('uploaded_files')
+        
+        if not deliverable_files and not upload_tokens:
             messages.error(request, 'Please upload at least one deliverable file.')
             return render(request, 'transactions/submit_work.html', {
                 'service_request': service_request,
@@ -157,26 +160,57 @@ def submit_work(request, request_id):
             # Upload files to Supabase (deliverables folder, separate from request-files roots)
             from requests.storage_utils import get_storage_manager
             storage_manager = get_storage_manager()
-            uploaded_files = []
             
-            for file in deliverable_files:
-                info = storage_manager.upload_file(file, folder=f'deliverables/{service_request.id}')
-                uploaded_files.append({
-                    'name': info.get('original_name', file.name),
-                    'url': info.get('public_url'),
-                    'size': info.get('size')
-                })
+            # Files the browser already put in storage via signed upload URLs
+            uploaded, upload_errors = storage_manager.confirm_signed_uploads(
+                upload_tokens,
+                folder=f'deliverables/{service_request.id}',
+                max_files=None
+            )
             
-            # Update request
-            service_request.deliverable_files = json.dumps(uploaded_files)
-            service_request.deliverable_notes = deliverable_notes
-            service_request.status = 'under_review'
-            service_request.submitted_at = timezone.now()
-            service_request.save()
+            # Upload all deliverables in parallel; any failure aborts the submission
+            if deliverable_files and not upload_errors:
+                streamed, upload_errors = storage_manager.upload_multiple_files(
+                    deliverable_files,
+                    folder=f'deliverables/{service_request.id}',
+                    max_files=None
+                )
+                uploaded.extend(streamed)
+            if upload_errors:
+                if uploaded:
+                    storage_manager.release_files([info['stored_path'] for info in uploaded])
+                raise Exception('; '.join(upload_errors))
+            
+            # Deliverables from a previous submission that this one replaces
+            previous_files = list(service_request.files.filter(kind=RequestFile.KIND_DELIVERABLE))
+            
+            with db_transaction.atomic():
+                # Update request
+                service_request.deliverable_notes = deliverable_notes
+                service_request.status = 'under_review'
+                service_request.submitted_at = timezone.now()
+                # Approved automatically if the client doesn't respond in time
+                service_request.auto_approve_date = auto_approve_date_from(service_request.submitted_at)
+                service_request.save()
+                
+                RequestFile.objects.filter(id__in=[file.id for file in previous_files]).delete()
+                RequestFile.objects.bulk_create([
+                    RequestFile.from_upload(
+                        info,
+                        request=service_request,
+                        kind=RequestFile.KIND_DELIVERABLE,
+                        owner=request.user
+                    )
+                    for info in uploaded
+                ])
+                
+                # Update transaction
+                transaction.status = 'pending_approval'
+                transaction.save()
             
-            # Update transaction
-            transaction.status = 'pending_approval'
-            transaction.save()
+            # Release the replaced files; unchanged files were deduplicated
+            # onto the same content, so only genuinely dropped ones are freed
+            storage_manager.release_files([file.storage_path for file in previous_files if file.storage_path])
             
             # Notify client that work has been submitted
             from analytics.models import Notification
@@ -260,9 +294,8 @@ def approve_work(request, request_id):
     if request.method == 'POST':
         try:
             # Update request status
-            service_request.status = 'completed'
             service_request.completed_at = timezone.now()
-            service_request.auto_approve_date = None  # Clear auto-approve
+            service_request.mark_completed()  # Clears auto-approve, opens the review window
             service_request.save()
             
             # Release payment
@@ -303,6 +336,7 @@ def approve_work(request, request_id):
     context = {
         'service_request': service_request,
         'transaction': transaction,
+        'deliverable_files': service_request.files.filter(kind=RequestFile.KIND_DELIVERABLE),
     }
     return render(request, 'transactions/approve_work.html', context)
 
@@ -443,34 +477,58 @@ def open_dispute(request, request_id):
             }
             return render(request, 'transactions/open_dispute.html', context)
         
+        # Evidence uploaded by this submission, released again if it fails
+        uploaded_evidence = []
         try:
             # Upload evidence files using the same method as create_request
-            uploaded_evidence = []
             upload_errors = []
-            if evidence_files:
+            upload_tokens = request.POST.getlist('uploaded_files')
+            if evidence_files or upload_tokens:
                 from requests.storage_utils import get_storage_manager
                 storage_manager = get_storage_manager()
                 
-                # Use upload_multiple_files for consistent handling
-                uploaded_evidence, upload_errors = storage_manager.upload_multiple_files(
-                    evidence_files,
+                # Files the browser already put in storage via signed upload URLs
+                uploaded_evidence, upload_errors = storage_manager.confirm_signed_uploads(
+                    upload_tokens,
                     folder=f'disputes/{transaction.id}'
                 )
                 
+                # Use upload_multiple_files for consistent handling
+                if evidence_files:
+                    uploaded, errors = storage_manager.upload_multiple_files(
+                        evidence_files,
+                        folder=f'disputes/{transaction.id}',
+                        max_files=storage_manager.MAX_FILES - len(uploaded_evidence)
+                    )
+                    uploaded_evidence.extend(uploaded)
+                    upload_errors.extend(errors)
+                
                 # If there are upload errors, show them
                 if upload_errors:
                     for error in upload_errors:
                         messages.warning(request, f'File upload warning: {error}')
             
             # Create dispute
-            dispute = Dispute.objects.create(
-                transaction=transaction,
-                opened_by=request.user,
-                reason=reason,
-                client_evidence=client_evidence,
-                client_files=json.dumps(uploaded_evidence),
-                status='open'
-            )
+            with db_transaction.atomic():
+                dispute = Dispute.objects.create(
+                    transaction=transaction,
+                    opened_by=request.user,
+                    reason=reason,
+                    client_evidence=client_evidence,
+                    status='open'
+                )
+                RequestFile.objects.bulk_create([
+                    RequestFile.from_upload(
+                        info,
+                        request=service_request,
+                        dispute=dispute,
+                        kind=RequestFile.KIND_CLIENT_EVIDENCE,
+                        owner=request.user
+                    )
+                    for info in uploaded_evidence
+                ])
+            # Saved: the evidence is referenced now
+            uploaded_evidence = []
             
             # Update transaction status
             transaction.status = 'disputed'
@@ -527,6 +585,9 @@ def open_dispute(request, request_id):
             return redirect('transactions:dispute_submitted', dispute_id=dispute.id)
             
         except Exception as e:
+            if uploaded_evidence:
+                from requests.storage_utils import get_storage_manager
+                get_storage_manager().release_files([info['stored_path'] for info in uploaded_evidence])
             messages.error(request, f'Error opening dispute: {str(e)}')
             return redirect('request_detail', request_id=request_id)
     
@@ -569,21 +630,10 @@ def dispute_detail(request, dispute_id):
         messages.error(request, 'You do not have permission to view this dispute.')
         return redirect('dashboard')
     
-    # Parse evidence files
-    client_files = []
-    professional_files = []
-    
-    if dispute.client_files:
-        try:
-            client_files = json.loads(dispute.client_files)
-        except json.JSONDecodeError:
-            client_files = []
-    
-    if dispute.professional_files:
-        try:
-            professional_files = json.loads(dispute.professional_files)
-        except json.JSONDecodeError:
-            professional_files = []
+    # Evidence files from both sides
+    evidence_files = list(dispute.files.all())
+    client_files = [file for file in evidence_files if file.kind == RequestFile.KIND_CLIENT_EVIDENCE]
+    professional_files = [file for file in evidence_files if file.kind == RequestFile.KIND_PROFESSIONAL_EVIDENCE]
     
     context = {
         'dispute': dispute,
@@ -626,26 +676,56 @@ def submit_evidence(request, dispute_id):
             # Upload evidence files using the same method as create_request
             uploaded_evidence = []
             upload_errors = []
-            if evidence_files:
+            upload_tokens = request.POST.getlist('uploaded_files')
+            if evidence_files or upload_tokens:
                 from requests.storage_utils import get_storage_manager
                 storage_manager = get_storage_manager()
                 
-                # Use upload_multiple_files for consistent handling
-                uploaded_evidence, upload_errors = storage_manager.upload_multiple_files(
-                    evidence_files,
+                # Files the browser already put in storage via signed upload URLs
+                uploaded_evidence, upload_errors = storage_manager.confirm_signed_uploads(
+                    upload_tokens,
                     folder=f'disputes/{transaction.id}'
                 )
                 
+                # Use upload_multiple_files for consistent handling
+                if evidence_files:
+                    uploaded, errors = storage_manager.upload_multiple_files(
+                        evidence_files,
+                        folder=f'disputes/{transaction.id}',
+                        max_files=storage_manager.MAX_FILES - len(uploaded_evidence)
+                    )
+                    uploaded_evidence.extend(uploaded)
+                    upload_errors.extend(errors)
+                
                 # If there are upload errors, show them
                 if upload_errors:
                     for error in upload_errors:
                         messages.warning(request, f'File upload warning: {error}')
             
+            # Evidence from an earlier submission that this one replaces
+            previous_files = list(dispute.files.filter(kind=RequestFile.KIND_PROFESSIONAL_EVIDENCE))
+            
             # Update dispute
-            dispute.professional_evidence = professional_evidence
-            dispute.professional_files = json.dumps(uploaded_evidence)
-            dispute.status = 'under_review'  # Move to under_review once professional responds
-            dispute.save()
+            with db_transaction.atomic():
+                dispute.professional_evidence = professional_evidence
+                dispute.status = 'under_review'  # Move to under_review once professional responds
+                dispute.save()
+                
+                RequestFile.objects.filter(id__in=[file.id for file in previous_files]).delete()
+                RequestFile.objects.bulk_create([
+                    RequestFile.from_upload(
+                        info,
+                        request=transaction.request,
+                        dispute=dispute,
+                        kind=RequestFile.KIND_PROFESSIONAL_EVIDENCE,
+                        owner=request.user
+                    )
+                    for info in uploaded_evidence
+                ])
+            
+            if previous_files:
+                from requests.storage_utils import get_storage_manager
+                get_storage_manager().release_files([file.storage_path for file in previous_files if file.storage_path])
             
             messages.success(request, f'✅ Evidence submitted successfully. {len(uploaded_evidence)} file(s) uploaded. Admin will review both sides.')
             return redirect('transactions:dispute_detail', dispute_id=dispute_id)
@@ -682,17 +762,8 @@ def transaction_detail(request, transaction_id):
         messages.error(request, 'You do not have permission to view this transaction.')
         return redirect('dashboard')
     
-    # Parse deliverable files (submitted by professional)
-    deliverable_files = []
-    if getattr(transaction.request, 'deliverable_files', None):
-        try:
-            deliverable_files = json.loads(transaction.request.deliverable_files)
-        except (json.JSONDecodeError, TypeError):
-            # Handle legacy format where it might be a single URL string
-            if isinstance(transaction.request.deliverable_files, str):
-                deliverable_files = [{'url': transaction.request.deliverable_files}]
-            else:
-                deliverable_files = []
+    # Deliverable files (submitted by professional)
+    deliverable_files = transaction.request.files.filter(kind=RequestFile.KIND_DELIVERABLE)
     
     context = {
         'transaction': transaction,
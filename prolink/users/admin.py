@@ -37,11 +37,11 @@ class SpecializationAdmin(admin.ModelAdmin):
 # Professional Profile Admin
 @admin.register(ProfessionalProfile)
 class ProfessionalProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'experience_level', 'hourly_rate', 'average_rating', 'total_reviews', 'is_available', 'is_verified')
+    list_display = ('user', 'experience_level', 'hourly_rate', 'average_rating', 'total_reviews', 'ranking_score', 'is_available', 'is_verified')
     list_filter = ('experience_level', 'is_available', 'is_verified', 'is_featured')
     search_fields = ('user__username', 'user__email', 'user__first_name', 'user__last_name')
     filter_horizontal = ('specializations',)
-    readonly_fields = ('total_consultations', 'completed_consultations', 'average_rating', 'total_reviews', 'profile_views', 'created_at', 'updated_at')
+    readonly_fields = ('total_consultations', 'completed_consultations', 'average_rating', 'total_reviews', 'ranking_score', 'profile_views', 'created_at', 'updated_at')
     
     fieldsets = (
         ('User', {'fields': ('user',)}),
@@ -55,7 +55,7 @@ class ProfessionalProfileAdmin(admin.ModelAdmin):
             'fields': ('hourly_rate', 'consultation_fee', 'is_available', 'timezone')
         }),
         ('Statistics (Read-only)', {
-            'fields': ('total_consultations', 'completed_consultations', 'average_rating', 'total_reviews', 'profile_views'),
+            'fields': ('total_consultations', 'completed_consultations', 'average_rating', 'total_reviews', 'ranking_score', 'profile_views'),
             'classes': ('collapse',)
         }),
         ('Portfolio & Links', {
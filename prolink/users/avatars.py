@@ -0,0 +1,185 @@
+"""
+Profile pictures
+
+Uploaded avatars are square-cropped and resized with Pillow into a few fixed
+sizes at upload time, so pages download an image close to the size they
+display instead of the original (up to 5MB). Derivatives share a base name
+and differ only in a `_<size>` suffix, which lets
+CustomUser.get_profile_picture(size) map the stored URL to any size.
+
+Users without a picture get an initials avatar rendered here (SVG, or PNG
+for clients that need a bitmap), cached on disk under AVATAR_CACHE_DIR and
+served by users.views.initials_avatar with long-lived cache headers.
+Initials are folded to A-Z/0-9, which bounds the cache (and what an
+anonymous client can make the server write) to a few thousand small files.
+"""
+import io
+import os
+import re
+import tempfile
+import unicodedata
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont, ImageOps, features
+
+AVATAR_SIZES = (40, 80, 200)
+
+# WebP is much smaller than JPEG at the same quality; fall back to JPEG when
+# Pillow was built without libwebp
+if features.check('webp'):
+    AVATAR_FORMAT, AVATAR_EXTENSION, AVATAR_CONTENT_TYPE = 'WEBP', 'webp', 'image/webp'
+else:
+    AVATAR_FORMAT, AVATAR_EXTENSION, AVATAR_CONTENT_TYPE = 'JPEG', 'jpg', 'image/jpeg'
+AVATAR_QUALITY = 82
+
+# Reject decompression bombs well before Pillow's own (much higher) limit
+MAX_SOURCE_PIXELS = 40 * 1000 * 1000
+
+_DERIVATIVE_RE = re.compile(r'_(?P<size>\d+)\.(?P<ext>webp|jpg)(?=\?|$)')
+
+
+def derivative_name(base_name, size):
+    """Object name of one derivative, e.g. '12_abc_80.webp'"""
+    return f"{base_name}_{size}.{AVATAR_EXTENSION}"
+
+
+def pick_size(size):
+    """Smallest derivative at least `size` pixels wide (largest if none is)"""
+    for candidate in AVATAR_SIZES:
+        if candidate >= size:
+            return candidate
+    return AVATAR_SIZES[-1]
+
+
+def derivative_url(url, size):
+    """
+    URL of the derivative closest to `size` for a stored derivative URL.
+    Returns None if the URL isn't a derivative (e.g. a legacy original upload).
+    """
+    match = _DERIVATIVE_RE.search(url)
+    if match is None or int(match.group('size')) not in AVATAR_SIZES:
+        return None
+    return f"{url[:match.start()]}_{pick_size(size)}.{match.group('ext')}{url[match.end():]}"
+
+
+def generate_derivatives(file):
+    """
+    Build every avatar derivative from an uploaded image
+
+    Returns:
+        Dict mapping size to encoded image bytes
+    Raises:
+        ValueError if the file isn't a readable image
+    """
+    try:
+        file.seek(0)
+        image = Image.open(file)
+        if image.width * image.height > MAX_SOURCE_PIXELS:
+            raise ValueError("Image dimensions are too large.")
+        # Decode at a reduced scale where the codec supports it (JPEG)
+        image.draft('RGB', (AVATAR_SIZES[-1] * 2, AVATAR_SIZES[-1] * 2))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (OSError, Image.DecompressionBombError, SyntaxError) as e:
+        raise ValueError(f"Invalid image file: {e}")
+
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    if AVATAR_FORMAT == 'WEBP' and has_alpha:
+        image = image.convert('RGBA')
+    elif has_alpha:
+        # JPEG has no alpha channel: flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+        image = background
+    else:
+        image = image.convert('RGB')
+
+    # Centre-crop to a square at the largest size, then step down from it
+    current = ImageOps.fit(image, (AVATAR_SIZES[-1], AVATAR_SIZES[-1]), Image.Resampling.LANCZOS)
+    derivatives = {}
+    for size in sorted(AVATAR_SIZES, reverse=True):
+        if current.width != size:
+            current = current.resize((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        if AVATAR_FORMAT == 'WEBP':
+            current.save(buffer, AVATAR_FORMAT, quality=AVATAR_QUALITY, method=4)
+        else:
+            current.save(buffer, AVATAR_FORMAT, quality=AVATAR_QUALITY, optimize=True, progressive=True)
+        derivatives[size] = buffer.getvalue()
+    return derivatives
+
+
+# Initials avatars (same palette the ui-avatars.com fallback used)
+INITIALS_BACKGROUND = '#90EE90'
+INITIALS_COLOR = '#000000'
+INITIALS_FORMATS = {'svg': 'image/svg+xml', 'png': 'image/png'}
+INITIALS_RE = re.compile(r'^[A-Z0-9]{1,2}$')
+# Stands in for a missing name part or a letter with no ASCII equivalent
+INITIALS_FALLBACK = 'U'
+
+
+def _initial(name):
+    for char in name or '':
+        if char.isalnum():
+            # 'É' -> 'E'; scripts without an ASCII form fall back
+            folded = unicodedata.normalize('NFKD', char).encode('ascii', 'ignore').decode().upper()[:1]
+            return folded if folded.isalnum() else INITIALS_FALLBACK
+    return INITIALS_FALLBACK
+
+
+def initials_for(first_name, last_name):
+    """Two-character A-Z/0-9 initials, INITIALS_FALLBACK standing in for a missing or unfoldable name part"""
+    return f"{_initial(first_name)}{_initial(last_name)}"
+
+
+def render_initials_svg(initials, size):
+    font_size = round(size * 0.4)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">'
+        f'<rect width="{size}" height="{size}" fill="{INITIALS_BACKGROUND}"/>'
+        f'<text x="50%" y="50%" dy="0.35em" fill="{INITIALS_COLOR}" font-family="Helvetica, Arial, sans-serif" '
+        f'font-size="{font_size}" font-weight="600" text-anchor="middle">{escape(initials)}</text>'
+        f'</svg>'
+    ).encode()
+
+
+def render_initials_png(initials, size):
+    image = Image.new('RGB', (size, size), INITIALS_BACKGROUND)
+    try:
+        font = ImageFont.load_default(size=round(size * 0.4))
+    except TypeError:
+        # Pillow < 10.1 only ships a fixed-size bitmap font
+        font = ImageFont.load_default()
+    ImageDraw.Draw(image).text((size / 2, size / 2), initials, fill=INITIALS_COLOR, font=font, anchor='mm')
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def initials_avatar_path(initials, size, fmt):
+    """
+    Path of the cached initials avatar, rendering it on first use.
+    Output is deterministic, so the cache never needs invalidating.
+    """
+    cache_dir = os.path.join(settings.AVATAR_CACHE_DIR, 'initials')
+    path = os.path.join(cache_dir, f"{initials}-{size}.{fmt}")
+    if os.path.exists(path):
+        return path
+
+    render = render_initials_svg if fmt == 'svg' else render_initials_png
+    content = render(initials, size)
+
+    # Write to a temp file and rename so concurrent requests never read a
+    # half-written avatar
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix='.avatar-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(content)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return path
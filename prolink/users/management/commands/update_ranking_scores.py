@@ -0,0 +1,19 @@
+"""
+Management command to recompute every professional's ranking score
+Usage: python manage.py update_ranking_scores
+
+Scores are updated as reviews and transactions come in; run this
+periodically (e.g. nightly from cron) so the recency component keeps
+decaying for professionals without new activity.
+"""
+from django.core.management.base import BaseCommand
+
+from users.ranking import refresh_ranking_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute the ranking score used to sort the professional directory'
+
+    def handle(self, *args, **options):
+        count = refresh_ranking_scores()
+        self.stdout.write(self.style.SUCCESS(f'Updated {count} ranking scores'))
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+# Frozen copy of users/ranking.py as of this migration, so later changes
+# to the live formula don't change what this backfill computes
+RATING_WEIGHT = 0.75
+COMPLETION_WEIGHT = 0.15
+RECENCY_WEIGHT = 0.10
+COMPLETION_PRIOR = 0.8
+COMPLETION_PRIOR_WEIGHT = 5
+DEFAULT_PRIOR_RATING = 3.5
+SETTLED_STATUSES = ('completed', 'refunded')
+
+
+def ranking_score(average_rating, total_reviews, completed, settled, last_activity, prior_rating, now):
+    prior_reviews = getattr(settings, 'RANKING_PRIOR_REVIEWS', 10)
+    half_life_days = getattr(settings, 'RANKING_RECENCY_HALF_LIFE_DAYS', 90)
+
+    rating = (prior_reviews * prior_rating + total_reviews * float(average_rating or 0)) / (
+        (prior_reviews + total_reviews) or 1
+    )
+    completion = (completed + COMPLETION_PRIOR_WEIGHT * COMPLETION_PRIOR) / (settled + COMPLETION_PRIOR_WEIGHT)
+    if last_activity is None:
+        recency = 0.0
+    else:
+        age_days = max((now - last_activity).total_seconds(), 0) / 86400
+        recency = 0.5 ** (age_days / half_life_days)
+
+    return round(
+        RATING_WEIGHT * rating / 5 + COMPLETION_WEIGHT * completion + RECENCY_WEIGHT * recency,
+        6
+    )
+
+
+def backfill_ranking_scores(apps, schema_editor):
+    ProfessionalProfile = apps.get_model('users', 'ProfessionalProfile')
+    Review = apps.get_model('analytics', 'Review')
+    Transaction = apps.get_model('transactions', 'Transaction')
+
+    now = timezone.now()
+    prior = Review.objects.filter(is_professional_review=False).aggregate(avg=Avg('rating'))['avg']
+    prior = float(prior) if prior is not None else DEFAULT_PRIOR_RATING
+    transactions = {
+        row['professional_id']: row
+        for row in Transaction.objects.values('professional_id').annotate(
+            completed=Count('id', filter=Q(status='completed')),
+            settled=Count('id', filter=Q(status__in=SETTLED_STATUSES)),
+            last_release=Max('released_at'),
+        )
+    }
+    last_reviews = dict(
+        Review.objects.filter(is_professional_review=False)
+        .values('reviewee_id').annotate(last=Max('created_at')).values_list('reviewee_id', 'last')
+    )
+
+    profiles = list(ProfessionalProfile.objects.only('id', 'user_id', 'average_rating', 'total_reviews'))
+    for profile in profiles:
+        stats = transactions.get(profile.user_id, {})
+        activity = [value for value in (stats.get('last_release'), last_reviews.get(profile.user_id)) if value]
+        profile.ranking_score = ranking_score(
+            profile.average_rating, profile.total_reviews,
+            stats.get('completed', 0), stats.get('settled', 0),
+            max(activity) if activity else None, prior, now
+        )
+    ProfessionalProfile.objects.bulk_update(profiles, ['ranking_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_migrate_experience_data'),
+        ('analytics', '0006_funnelmetric'),
+        ('transactions', '0003_remove_dispute_client_files_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professionalprofile',
+            name='ranking_score',
+            field=models.FloatField(db_index=True, default=0, editable=False, help_text='Default directory sort, maintained by users/ranking.py'),
+        ),
+        migrations.RunPython(backfill_ranking_scores, migrations.RunPython.noop),
+    ]
@@ -42,10 +42,25 @@ class CustomUser(AbstractUser):
             size: Size of the avatar image in pixels (default: 200)
         """
         if self.profile_picture:
-            return self.profile_picture
-        # Return a default profile picture URL (UI Avatars generates initials)
-        initials = f"{self.first_name[0] if self.first_name else 'U'}{self.last_name[0] if self.last_name else 'U'}"
-        return f"https://ui-avatars.com/api/?name={initials}&background=90EE90&color=000&size={size}"
+            # Uploads are stored as resized derivatives (users.avatars);
+            # older uploads are single originals and returned as-is
+            from .avatars import derivative_url
+            return derivative_url(self.profile_picture, size) or self.profile_picture
+        # Default: locally rendered initials avatar (users.views.initials_avatar)
+        from django.urls import reverse
+        from .avatars import initials_for, pick_size
+        initials = initials_for(self.first_name, self.last_name)
+        return reverse('initials_avatar', args=[initials, pick_size(size), 'svg'])
+    
+    @property
+    def profile_picture_small(self):
+        """Avatar for 40px slots (navbar, message lists)"""
+        return self.get_profile_picture(40)
+    
+    @property
+    def profile_picture_medium(self):
+        """Avatar for 80px slots (cards, conversation headers)"""
+        return self.get_profile_picture(80)
     
     def __str__(self):
         return f"{self.username} ({self.get_user_role_display()})"
@@ -112,6 +127,8 @@ class ProfessionalProfile(models.Model):
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00, 
                                         validators=[MinValueValidator(0), MaxValueValidator(5)])
     total_reviews = models.IntegerField(default=0)
+    ranking_score = models.FloatField(default=0, db_index=True, editable=False,
+                                      help_text="Default directory sort, maintained by users/ranking.py")
     
     # Portfolio & Links
     portfolio_url = models.URLField(blank=True, null=True)
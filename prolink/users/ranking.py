@@ -0,0 +1,145 @@
+"""
+Professional ranking score
+
+ProfessionalProfile.ranking_score is the default sort of the professional
+directory. It is precomputed so listing is a scan of one indexed column:
+
+- rating: Bayesian average of the client reviews, pulled toward the
+  platform-wide mean by RANKING_PRIOR_REVIEWS phantom reviews, so one
+  5-star review doesn't outrank two hundred at 4.9
+- completion: share of the professional's settled transactions that were
+  released rather than refunded, smoothed the same way
+- recency: halves every RANKING_RECENCY_HALF_LIFE_DAYS since the last
+  review or released payment
+
+The blend lies between 0 and 1. One professional is rescored when one of
+their reviews or transactions is saved (see Review.update_professional_rating
+and users/signals.py); `python manage.py update_ranking_scores` rescores
+everyone so recency keeps decaying for professionals without new activity.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+RATING_WEIGHT = 0.75
+COMPLETION_WEIGHT = 0.15
+RECENCY_WEIGHT = 0.10
+
+# Completion rate assumed for professionals without settled transactions
+COMPLETION_PRIOR = 0.8
+COMPLETION_PRIOR_WEIGHT = 5
+
+PRIOR_RATING_CACHE_KEY = 'ranking:prior_rating'
+PRIOR_RATING_CACHE_TTL = 60 * 60
+DEFAULT_PRIOR_RATING = 3.5
+
+# Transaction outcomes that count toward the completion rate
+SETTLED_STATUSES = ('completed', 'refunded')
+
+
+def ranking_score(average_rating, total_reviews, completed, settled, last_activity, prior_rating, now=None):
+    """Blend of the three signals for one professional, between 0 and 1"""
+    now = now or timezone.now()
+    prior_reviews = settings.RANKING_PRIOR_REVIEWS
+
+    rating = (prior_reviews * prior_rating + total_reviews * float(average_rating or 0)) / (
+        (prior_reviews + total_reviews) or 1
+    )
+    completion = (completed + COMPLETION_PRIOR_WEIGHT * COMPLETION_PRIOR) / (settled + COMPLETION_PRIOR_WEIGHT)
+    if last_activity is None:
+        recency = 0.0
+    else:
+        age_days = max((now - last_activity).total_seconds(), 0) / 86400
+        recency = 0.5 ** (age_days / settings.RANKING_RECENCY_HALF_LIFE_DAYS)
+
+    return round(
+        RATING_WEIGHT * rating / 5 + COMPLETION_WEIGHT * completion + RECENCY_WEIGHT * recency,
+        6
+    )
+
+
+def prior_rating():
+    """Platform-wide mean client rating, cached since it moves slowly"""
+    from analytics.models import Review
+
+    value = cache.get(PRIOR_RATING_CACHE_KEY)
+    if value is None:
+        value = Review.objects.filter(is_professional_review=False).aggregate(avg=Avg('rating'))['avg']
+        value = float(value) if value is not None else DEFAULT_PRIOR_RATING
+        cache.set(PRIOR_RATING_CACHE_KEY, value, PRIOR_RATING_CACHE_TTL)
+    return value
+
+
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def update_ranking_score(profile, now=None, save=True):
+    """
+    Recompute one professional's score from their denormalized rating
+    fields plus their transaction and review history. Saves only
+    ranking_score, unless save=False leaves writing the row to the caller.
+    """
+    from analytics.models import Review
+    from transactions.models import Transaction
+
+    stats = Transaction.objects.filter(professional_id=profile.user_id).aggregate(
+        completed=Count('id', filter=Q(status='completed')),
+        settled=Count('id', filter=Q(status__in=SETTLED_STATUSES)),
+        last_release=Max('released_at'),
+    )
+    last_review = Review.objects.filter(
+        reviewee_id=profile.user_id, is_professional_review=False
+    ).aggregate(last=Max('created_at'))['last']
+
+    profile.ranking_score = ranking_score(
+        profile.average_rating, profile.total_reviews,
+        stats['completed'], stats['settled'], _latest(stats['last_release'], last_review),
+        prior_rating(), now
+    )
+    if save:
+        profile.save(update_fields=['ranking_score'])
+    return profile.ranking_score
+
+
+def refresh_ranking_scores(now=None, batch_size=500):
+    """Rescore every professional with one aggregate query per signal. Returns the count updated."""
+    from analytics.models import Review
+    from transactions.models import Transaction
+
+    from .models import ProfessionalProfile
+
+    now = now or timezone.now()
+    cache.delete(PRIOR_RATING_CACHE_KEY)
+    prior = prior_rating()
+
+    transactions = {
+        row['professional_id']: row
+        for row in Transaction.objects.values('professional_id').annotate(
+            completed=Count('id', filter=Q(status='completed')),
+            settled=Count('id', filter=Q(status__in=SETTLED_STATUSES)),
+            last_release=Max('released_at'),
+        )
+    }
+    last_reviews = dict(
+        Review.objects.filter(is_professional_review=False)
+        .values('reviewee_id').annotate(last=Max('created_at')).values_list('reviewee_id', 'last')
+    )
+
+    profiles = list(ProfessionalProfile.objects.only('id', 'user_id', 'average_rating', 'total_reviews', 'ranking_score'))
+    changed = []
+    for profile in profiles:
+        stats = transactions.get(profile.user_id, {})
+        score = ranking_score(
+            profile.average_rating, profile.total_reviews,
+            stats.get('completed', 0), stats.get('settled', 0),
+            _latest(stats.get('last_release'), last_reviews.get(profile.user_id)),
+            prior, now
+        )
+        if score != profile.ranking_score:
+            profile.ranking_score = score
+            changed.append(profile)
+    ProfessionalProfile.objects.bulk_update(changed, ['ranking_score'], batch_size=batch_size)
+    return len(changed)
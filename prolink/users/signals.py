@@ -0,0 +1,35 @@
+"""
+Signal handlers keeping professional ranking scores current
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from transactions.models import Transaction
+
+from .models import ProfessionalProfile
+from .ranking import SETTLED_STATUSES, update_ranking_score
+
+
+@receiver(post_save, sender=ProfessionalProfile)
+def score_new_professional(sender, instance, created, raw=False, **kwargs):
+    """
+    Give new profiles their prior-based score right away; the column
+    default of 0 would sort every new signup below existing professionals
+    """
+    if created and not raw:
+        update_ranking_score(instance)
+
+
+@receiver(post_save, sender=Transaction)
+def rescore_professional(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Rescore the professional when a transaction settles (payment released
+    or refunded); other transaction updates don't move the score
+    """
+    if instance.status not in SETTLED_STATUSES:
+        return
+    if update_fields is not None and not {'status', 'released_at'} & set(update_fields):
+        return
+    profile = ProfessionalProfile.objects.filter(user_id=instance.professional_id).first()
+    if profile is not None:
+        update_ranking_score(profile)
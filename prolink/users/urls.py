@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
@@ -16,6 +16,7 @@ urlpatterns = [
     path('transactions/', views.transactions, name='transactions'),
     path('edit-profile-picture/', views.edit_profile_picture, name='edit_profile_picture'),
     path('check-profile-picture/', views.check_profile_picture, name='check_profile_picture'),  # Diagnostic
+    re_path(r'^avatars/initials/(?P<initials>[A-Z0-9]{1,2})-(?P<size>\d+)\.(?P<fmt>svg|png)$', views.initials_avatar, name='initials_avatar'),
     
     
     # Professional URLs
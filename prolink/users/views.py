@@ -5,6 +5,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
 import json
+import logging
 from decimal import Decimal
 from requests.models import Request as ServiceRequest
 from users.models import CustomUser
@@ -20,6 +21,8 @@ from analytics.utils import (
     format_activity_for_display
 )
 
+logger = logging.getLogger(__name__)
+
 def landing(request):
 	return render(request, "landing.html")
 
@@ -457,58 +460,91 @@ def privacy(request):
 
 # ========== PROFESSIONALS VIEWS ==========
 
+import hashlib
+from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.http import JsonResponse
 from .models import ProfessionalProfile, Specialization, SavedProfessional, CustomUser
 
 
-@login_required
-def professionals_api(request):
+# Typeahead lookups repeat the same few prefixes, so results are cached per
+# query for a short while (ratings and availability may lag by this much)
+PROFESSIONAL_SEARCH_CACHE_TTL = 60
+PROFESSIONAL_SEARCH_MAX_PER_PAGE = 50
+
+
+def search_professionals(q):
     """
-    Lightweight JSON endpoint to list professionals for selection modals.
-    Supports ?q=, ?page=, and returns minimal fields.
+    Active professionals matching a typeahead query, highest ranking score
+    first (see users/ranking.py).
+    Every word must be the start of the first name, last name or email, or
+    part of a specialization name.
     """
-    q = request.GET.get('q', '').strip()
-    page = int(request.GET.get('page', 1) or 1)
-    per_page = int(request.GET.get('per_page', 12) or 12)
-
     qs = ProfessionalProfile.objects.filter(
         user__is_active=True
     ).select_related('user')
 
-    if q:
+    terms = q.split()
+    for term in terms:
         qs = qs.filter(
-            Q(user__first_name__icontains=q) |
-            Q(user__last_name__icontains=q) |
-            Q(user__email__icontains=q) |
-            Q(specializations__name__icontains=q)
-        ).distinct()
+            Q(user__first_name__istartswith=term) |
+            Q(user__last_name__istartswith=term) |
+            Q(user__email__istartswith=term) |
+            Q(specializations__name__icontains=term)
+        )
+    if terms:
+        qs = qs.distinct()
 
-    paginator = Paginator(qs.order_by('-average_rating', '-total_reviews'), per_page)
-    page_obj = paginator.get_page(page)
+    return qs.order_by('-ranking_score', 'id')
 
-    data = [{
-        'id': prof.id,
-        'email': prof.user.email,
-        'name': prof.user.get_full_name() or prof.user.username or prof.user.email,
-        'avatar': prof.user.get_profile_picture(),
-        'average_rating': float(prof.average_rating or 0),
-        'total_reviews': prof.total_reviews,
-        'hourly_rate': float(prof.hourly_rate or 0),
-        'consultation_fee': float(prof.consultation_fee or 0),
-        'is_available': prof.is_available,
-    } for prof in page_obj]
 
-    return JsonResponse({
-        'results': data,
-        'page': page_obj.number,
-        'num_pages': paginator.num_pages,
-        'total': paginator.count,
-        'per_page': per_page,
-        'has_next': page_obj.has_next(),
-        'has_previous': page_obj.has_previous(),
-    })
+@login_required
+def professionals_api(request):
+    """
+    Lightweight JSON endpoint backing the professional typeahead and
+    selection modals. Supports ?q=, ?page=, ?per_page= and returns minimal
+    fields; responses are cached per (query, page, per_page).
+    """
+    q = ' '.join(request.GET.get('q', '').lower().split())[:100]
+    try:
+        page = max(1, int(request.GET.get('page', 1) or 1))
+        per_page = int(request.GET.get('per_page', 12) or 12)
+    except ValueError:
+        return JsonResponse({'error': 'page and per_page must be numbers'}, status=400)
+    per_page = min(max(1, per_page), PROFESSIONAL_SEARCH_MAX_PER_PAGE)
+
+    digest = hashlib.md5(q.encode()).hexdigest()
+    cache_key = f'professionals_api:{digest}:{page}:{per_page}'
+    payload = cache.get(cache_key)
+    if payload is None:
+        paginator = Paginator(search_professionals(q), per_page)
+        page_obj = paginator.get_page(page)
+
+        data = [{
+            'id': prof.id,
+            'email': prof.user.email,
+            'name': prof.user.get_full_name() or prof.user.username or prof.user.email,
+            'avatar': prof.user.get_profile_picture(80),
+            'average_rating': float(prof.average_rating or 0),
+            'total_reviews': prof.total_reviews,
+            'hourly_rate': float(prof.hourly_rate or 0),
+            'consultation_fee': float(prof.consultation_fee or 0),
+            'is_available': prof.is_available,
+        } for prof in page_obj]
+
+        payload = {
+            'results': data,
+            'page': page_obj.number,
+            'num_pages': paginator.num_pages,
+            'total': paginator.count,
+            'per_page': per_page,
+            'has_next': page_obj.has_next(),
+            'has_previous': page_obj.has_previous(),
+        }
+        cache.set(cache_key, payload, PROFESSIONAL_SEARCH_CACHE_TTL)
+
+    return JsonResponse(payload)
 
 @login_required
 def find_professionals(request):
@@ -575,8 +611,10 @@ def find_professionals(request):
         professionals = professionals.filter(is_available=True)
     
     # Sorting
-    sort_by = request.GET.get('sort_by', 'rating')
-    if sort_by == 'rating':
+    sort_by = request.GET.get('sort_by', 'recommended')
+    if sort_by == 'recommended':
+        professionals = professionals.order_by('-ranking_score', 'id')
+    elif sort_by == 'rating':
         professionals = professionals.order_by('-average_rating', '-total_reviews')
     elif sort_by == 'reviews':
         professionals = professionals.order_by('-total_reviews', '-average_rating')
@@ -649,11 +687,21 @@ def professional_detail(request, pk):
         is_professional_review=False  # Only show reviews from clients
     ).select_related('reviewer', 'request').order_by('-created_at')[:10]
     
+    # Turnaround stats, precomputed by the compute_funnel_metrics command
+    from analytics.models import FunnelMetric
+    funnel = {
+        metric.stage: metric
+        for metric in FunnelMetric.objects.filter(
+            scope=FunnelMetric.SCOPE_PROFESSIONAL, professional=professional.user
+        )
+    }
+    
     context = {
         'professional': professional,
         'is_saved': is_saved,
         'similar_professionals': similar_professionals,
         'reviews': reviews,
+        'funnel': funnel,
     }
     
     return render(request, 'professionals/professional_detail.html', context)
@@ -828,6 +876,27 @@ def check_profile_picture(request):
         'is_empty': not bool(user.profile_picture),
     })
 
+def initials_avatar(request, initials, size, fmt):
+    """
+    Serve a generated initials avatar (default profile picture).
+    The URL fully determines the image, so browsers and CDNs may cache it
+    for a year without revalidating.
+    """
+    from django.http import FileResponse, Http404
+    from .avatars import AVATAR_SIZES, INITIALS_FORMATS, INITIALS_RE, initials_avatar_path
+    
+    size = int(size)
+    if size not in AVATAR_SIZES or not INITIALS_RE.match(initials):
+        raise Http404("Unknown avatar")
+    
+    response = FileResponse(
+        open(initials_avatar_path(initials, size, fmt), 'rb'),
+        content_type=INITIALS_FORMATS[fmt]
+    )
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 @login_required
 def edit_profile_picture(request):
     from django.http import JsonResponse
@@ -835,8 +904,7 @@ def edit_profile_picture(request):
     from supabase import create_client
     import uuid
     from datetime import datetime
-    
-    print("🔵 NEW SUPABASE VERSION RUNNING!")
+
     
     if request.method != 'POST':
         return JsonResponse({'error': 'Invalid request method'}, status=400)
@@ -857,30 +925,37 @@ def edit_profile_picture(request):
         if file.size > 5 * 1024 * 1024:
             return JsonResponse({'error': 'File too large. Maximum size is 5MB.'}, status=400)
         
+        # Resize to the fixed avatar sizes before uploading anything
+        from .avatars import AVATAR_CONTENT_TYPE, AVATAR_SIZES, derivative_name, generate_derivatives
+        try:
+            derivatives = generate_derivatives(file)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
         print("☁️ Attempting Supabase upload...")
         
         # Initialize Supabase client with SERVICE_ROLE_KEY to bypass RLS
         supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
         
-        # Generate unique filename
-        file_extension = file.name.split('.')[-1] if '.' in file.name else 'jpg'
+        # Generate unique base filename; each derivative gets a _<size> suffix
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{request.user.id}_{timestamp}_{uuid.uuid4().hex[:8]}.{file_extension}"
-        file_path = f"profile_pictures/{unique_filename}"
-        
-        # Read file content
-        file_content = file.read()
-        
-        print(f"📤 Uploading to Supabase: {file_path}")
-        
-        # Upload to Supabase Storage
-        storage_response = supabase.storage.from_('avatars').upload(
-            file_path,
-            file_content,
-            file_options={"content-type": file.content_type}
-        )
-        
-        print(f"📥 Upload response: {storage_response}")
+        base_name = f"profile_pictures/{request.user.id}_{timestamp}_{uuid.uuid4().hex[:8]}"
+        
+        # Upload every derivative; the largest one is stored on the user
+        for size in AVATAR_SIZES:
+            file_path = derivative_name(base_name, size)
+            logger.debug('Uploading avatar to Supabase: %s', file_path)
+            storage_response = supabase.storage.from_('avatars').upload(
+                file_path,
+                derivatives[size],
+                file_options={
+                    "content-type": AVATAR_CONTENT_TYPE,
+                    # Names are unique per upload, so derivatives never change
+                    "cache-control": "31536000"
+                }
+            )
+            logger.debug('Avatar upload response: %s', storage_response)
+        file_path = derivative_name(base_name, AVATAR_SIZES[-1])
         
         # Get public URL - extract the actual URL string
         public_url_response = supabase.storage.from_('avatars').get_public_url(file_path)
@@ -973,10 +1048,12 @@ def accept_request(request, request_id):
         from messaging.models import Conversation
         from transactions.models import Transaction
         from decimal import Decimal
+        from requests.scheduler import payment_due_date_from
         
         # Update request with price and set status to 'awaiting_payment' so client sees Pay Now
         service_request.price = Decimal(str(price))
         service_request.status = 'awaiting_payment'  # Client needs to pay
+        service_request.payment_due_date = payment_due_date_from()  # Cancelled if left unpaid
         service_request.save()
         
         # Get client user
@@ -1164,11 +1241,10 @@ def reviews_page(request):
     # Get reviews given (where user is the reviewer)
     reviews_given = Review.objects.filter(reviewer=user).order_by('-created_at')
     
-    # Get completed requests that can still be reviewed (within 30 days)
+    # Get completed requests that can still be reviewed (review window open)
     from django.utils import timezone
-    from datetime import timedelta
     
-    thirty_days_ago = timezone.now() - timedelta(days=30)
+    now = timezone.now()
     
     # For students: completed requests where they haven't reviewed the professional
     if user.user_role != 'professional':
@@ -1176,7 +1252,7 @@ def reviews_page(request):
             client=user.email,
             status='completed',
             completed_at__isnull=False,  # Only include requests with completion date
-            completed_at__gte=thirty_days_ago
+            review_deadline__gt=now
         )
         
         reviewable_requests = []
@@ -1205,7 +1281,7 @@ def reviews_page(request):
             professional=user.email,
             status='completed',
             completed_at__isnull=False,  # Only include requests with completion date
-            completed_at__gte=thirty_days_ago
+            review_deadline__gt=now
         )
         
         reviewable_requests = []
@@ -1246,7 +1322,7 @@ def submit_review(request, request_id):
     Submit a review for a completed request
     Only allowed if:
     - Request is completed
-    - Within 30 days of completion
+    - Within the review window (REVIEW_WINDOW_DAYS after completion)
     - User hasn't already reviewed
     - User is either client or professional for this request
     """
@@ -1277,7 +1353,7 @@ def submit_review(request, request_id):
         else:
             return redirect('professional_request_detail', request_id=request_id)
     
-    # Validate within 30 days - show message if no completion date
+    # Validate review window - show message if no completion date
     if not req.completed_at:
         messages.warning(request, "This request doesn't have a completion date set. Please contact support if you believe this is an error.")
         if user.email == req.client:
@@ -1285,9 +1361,8 @@ def submit_review(request, request_id):
         else:
             return redirect('professional_request_detail', request_id=request_id)
     
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    if req.completed_at < thirty_days_ago:
-        messages.error(request, "Review period has expired. Reviews must be submitted within 30 days of completion.")
+    if not req.review_window_open():
+        messages.error(request, f"Review period has expired. Reviews must be submitted within {settings.REVIEW_WINDOW_DAYS} days of completion.")
         if user.email == req.client:
             return redirect('request_detail', request_id=request_id)
         else: